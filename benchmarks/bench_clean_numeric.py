@@ -0,0 +1,52 @@
+"""
+Benchmark clean_numeric_value (one Python call per cell) against the vectorized
+clean_numeric_series over a large synthetic column of DripInvesting/Yahoo style
+values, and check both give the same numbers.
+
+Usage (from the repo root): python -m benchmarks.bench_clean_numeric [number_of_cells]
+"""
+import sys
+import time
+
+import numpy as np
+
+from divifilter_data_updater.helper_functions import clean_numeric_value, clean_numeric_series
+
+
+def synthetic_column(size, seed=42):
+    rng = np.random.default_rng(seed)
+    numbers = rng.uniform(-1e4, 1e5, size)
+    decimals = rng.integers(0, 4, size)
+    prefixes = rng.choice(["", "$", "-$"], size)
+    suffixes = rng.choice(["", "", "%", "x", "K", "M", "B", "T"], size)
+    values = [f"{prefix}{abs(number):,.{places}f}{suffix}"
+              for prefix, number, places, suffix in zip(prefixes, numbers, decimals, suffixes)]
+    # Sprinkle in the placeholders the site uses for missing data
+    for index in rng.choice(size, size // 20, replace=False):
+        values[index] = rng.choice(["", "-", "N/A", None])
+    return np.array(values, dtype=object)
+
+
+def main(size):
+    column = synthetic_column(size)
+
+    start = time.perf_counter()
+    scalar = [clean_numeric_value(value) for value in column]
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = clean_numeric_series(column)
+    vectorized_seconds = time.perf_counter() - start
+
+    expected = np.array([np.nan if value is None else value for value in scalar], dtype="float64")
+    if not np.array_equal(expected, vectorized, equal_nan=True):
+        raise SystemExit("vectorized results differ from clean_numeric_value")
+
+    print(f"cells:            {size:,}")
+    print(f"per-cell:         {scalar_seconds:.3f}s")
+    print(f"vectorized:       {vectorized_seconds:.3f}s")
+    print(f"speedup:          {scalar_seconds / vectorized_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
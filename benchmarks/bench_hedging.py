@@ -0,0 +1,67 @@
+"""
+Measure what hedged stock page requests do to a scrape with a slow tail: most
+pages answer quickly but a few hang until their timeout, and the scrape can't
+finish before them. Page latencies are simulated with a sleep; a hedge of a
+hanging page gets a normal latency, as a retry on a fresh connection would.
+
+Usage (from the repo root): python -m benchmarks.bench_hedging [number_of_tickers] [stuck_every_nth] [stuck_seconds]
+"""
+import logging
+import random
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from divifilter_data_updater.drip_investing_scraper import DripInvestingScraper
+from divifilter_data_updater.hedging import HedgePolicy
+
+PAGE_SECONDS = (0.01, 0.04)
+
+
+def fake_session(stuck_every, stuck_seconds):
+    """A session whose first request for every stuck_every-th page hangs for stuck_seconds."""
+    seen = set()
+    lock = threading.Lock()
+
+    def get(url, timeout):
+        with lock:
+            first_try = url not in seen
+            seen.add(url)
+        index = int(url.rsplit("/", 1)[1])
+        if first_try and index % stuck_every == stuck_every - 1:
+            time.sleep(min(stuck_seconds, timeout))
+        else:
+            time.sleep(random.uniform(*PAGE_SECONDS))
+        return MagicMock(status_code=200, content=b"<html></html>")
+
+    session = MagicMock()
+    session.get.side_effect = get
+    return session
+
+
+def measure(tickers, hedge_policy, stuck_every, stuck_seconds):
+    scraper = DripInvestingScraper(max_workers=4, hedge_policy=hedge_policy)
+    session = fake_session(stuck_every, stuck_seconds)
+    with patch.object(scraper, "get_tickers", return_value=tickers), \
+            patch.object(scraper, "_get_session", return_value=session):
+        started = time.monotonic()
+        scraper.scrape_all_data()
+        elapsed = time.monotonic() - started
+    return elapsed, session.get.call_count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    stuck_every = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    stuck_seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    logging.getLogger("divifilter_data_updater").setLevel(logging.ERROR)
+    tickers = [{"symbol": f"T{i:04d}", "url": f"https://example.com/{i}"} for i in range(count)]
+
+    for label, policy in (("no hedging (before)", None), ("hedged p95, 5% budget", HedgePolicy())):
+        elapsed, requests_made = measure(tickers, policy, stuck_every, stuck_seconds)
+        print(f"{label:24s} {elapsed:6.2f}s for {count} pages, {requests_made} requests")
+
+
+if __name__ == "__main__":
+    main()
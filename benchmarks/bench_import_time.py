@@ -0,0 +1,58 @@
+"""
+Profile the startup imports of update_divifilter_data.py with `python -X importtime`
+and enforce a budget: exits non-zero if importing the entry point takes longer
+than the budget (best of a few runs) or pulls in a dependency that should only
+load behind the feature using it.
+
+Usage (from the repo root): python -m benchmarks.bench_import_time [budget_ms] [runs]
+"""
+import subprocess
+import sys
+
+ENTRY_MODULE = "update_divifilter_data"
+DEFAULT_BUDGET_MS = 250
+# Loaded on first use by the scraper, DB layer and Yahoo enrichment, never at startup
+LAZY_DEPENDENCIES = ("pandas", "numpy", "yfinance", "bs4", "sqlalchemy", "requests")
+TOP_MODULES = 10
+
+
+def profile_imports():
+    """Run one fresh interpreter and return {module: (self_us, cumulative_us)} from its -X importtime log."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULE}"],
+                            capture_output=True, text=True, check=True).stderr
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    profiles = [profile_imports() for _ in range(runs)]
+    best = min(profiles, key=lambda timings: timings[ENTRY_MODULE][1])
+    startup_ms = best[ENTRY_MODULE][1] / 1000
+
+    print("Slowest imports at startup (cumulative):")
+    slowest = sorted(best.items(), key=lambda item: item[1][1], reverse=True)[:TOP_MODULES]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+    failures = []
+    eager = [name for name in LAZY_DEPENDENCIES if name in best]
+    if eager:
+        failures.append(f"imported at startup but should be lazy: {', '.join(eager)}")
+    if startup_ms > budget_ms:
+        failures.append(f"startup import took {startup_ms:.1f} ms, over the {budget_ms:.0f} ms budget")
+
+    print(f"{ENTRY_MODULE}: {startup_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
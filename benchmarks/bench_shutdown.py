@@ -0,0 +1,67 @@
+"""
+Measure how long a scrape takes to return after shutdown is requested: the
+cancellable pool in scrape_all_data versus waiting on executor.map for every
+queued ticker, as the scraper used to. Stock pages are simulated with a sleep.
+
+Usage (from the repo root): python -m benchmarks.bench_shutdown [number_of_tickers] [seconds_per_page]
+"""
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from divifilter_data_updater.deadline import Deadline
+from divifilter_data_updater.drip_investing_scraper import DripInvestingScraper
+
+STOP_AFTER_SECONDS = 1.0
+
+
+def fake_page(seconds_per_page):
+    def get_stock_data(stock_info, deadline=None):
+        time.sleep(seconds_per_page)
+        return {"Symbol": stock_info["symbol"]}
+    return get_stock_data
+
+
+def measure(scrape, tickers, seconds_per_page):
+    """Seconds from the stop request until scrape() returns."""
+    stop_event = threading.Event()
+    stopped_at = []
+
+    def request_stop():
+        stopped_at.append(time.monotonic())
+        stop_event.set()
+
+    scraper = DripInvestingScraper(max_workers=4, stop_event=stop_event)
+    timer = threading.Timer(STOP_AFTER_SECONDS, request_stop)
+    with patch.object(scraper, "get_tickers", return_value=tickers), \
+            patch.object(scraper, "get_stock_data", side_effect=fake_page(seconds_per_page)):
+        timer.start()
+        scrape(scraper, stop_event)
+        returned_at = time.monotonic()
+    timer.join()
+    return returned_at - stopped_at[0]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    seconds_per_page = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    logging.getLogger("divifilter_data_updater").setLevel(logging.ERROR)
+    tickers = [{"symbol": f"T{i:04d}", "url": f"https://example.com/{i}"} for i in range(count)]
+
+    def cancellable(scraper, stop_event):
+        scraper.scrape_all_data(deadline=Deadline(cancel_event=stop_event))
+
+    def wait_for_all(scraper, stop_event):
+        with ThreadPoolExecutor(max_workers=scraper.max_workers) as executor:
+            list(executor.map(scraper.get_stock_data, tickers))
+
+    for label, scrape in (("executor.map (before)", wait_for_all), ("cancellable pool", cancellable)):
+        latency = measure(scrape, tickers, seconds_per_page)
+        print(f"{label:24s} returned {latency:6.2f}s after the stop request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measure the cost of starting the updater: wall time and peak RSS of a fresh
+interpreter importing the runner, with and without pandas/yfinance loaded on
+top (what the process paid before the records ingestion path made them lazy),
+and its steady state after publishing a scrape-sized batch of records to an
+in-memory SQLite DB (the summary refresh that follows loads pandas lazily, so
+it isn't part of this scenario).
+
+Usage (from the repo root): python -m benchmarks.bench_startup [repeats]
+"""
+import statistics
+import subprocess
+import sys
+
+RUNNER = "divifilter_data_updater.divifilter_data_updater_runner"
+
+PUBLISH = f"""
+import {RUNNER}
+from divifilter_data_updater.db_functions import connect_database
+records = [{{"Symbol": f"S{{n}}", "Sector": f"Sector {{n % 11}}", "Industry": f"Industry {{n % 97}}",
+            "No Years": n % 70, "Div Yield": n % 900 / 100, "DGR 5Y": n % 1500 / 100}} for n in range(3000)]
+with connect_database("sqlite://") as db:
+    db.update_data_table_from_records(records)
+"""
+
+SCENARIOS = {
+    "runner (records path)": f"import {RUNNER}",
+    "runner + pandas + yfinance": f"import {RUNNER}, pandas, yfinance",
+    "runner after a publish": PUBLISH,
+}
+
+PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pandas' in sys.modules)
+"""
+
+
+def measure(statement):
+    output = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement)],
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), int(output[1]), output[2] == "True"
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, statement in SCENARIOS.items():
+        runs = [measure(statement) for _ in range(repeats)]
+        import_time = statistics.median(run[0] for run in runs)
+        max_rss = statistics.median(run[1] for run in runs)
+        print(f"{label:28s} time {import_time * 1000:7.1f} ms  "
+              f"max RSS {max_rss / 1024:6.1f} MiB  pandas loaded: {runs[0][2]}")
+
+
+if __name__ == "__main__":
+    main()
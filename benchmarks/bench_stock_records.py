@@ -0,0 +1,62 @@
+"""
+Measure the memory held by scraped stocks as plain dicts versus StockRecords,
+and the time to turn each into the typed dataframe that gets published.
+
+Usage (from the repo root): python -m benchmarks.bench_stock_records [number_of_tickers]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from divifilter_data_updater.helper_functions import radar_dict_to_table
+from divifilter_data_updater.schema import ESSENTIAL_COLUMNS, NUMERIC_COLUMNS
+from divifilter_data_updater.stock_record import StockRecord
+
+
+def scraped_fields(index):
+    """What get_stock_data produces for one stock: cleaned numbers, text and a few extra labels."""
+    fields = {"Symbol": f"T{index:05d}"}
+    for position, column in enumerate(ESSENTIAL_COLUMNS):
+        fields[column] = float(index % 997 + position) if column in NUMERIC_COLUMNS else f"{column} {index % 50}"
+    fields.update({"Website": f"https://example.com/{index}", "EPS 1Y": f"{index % 13}.5%",
+                   "Ex-date": "2026-01-15", "Dividend Pay Date": "2026-02-01"})
+    return fields
+
+
+def build(record_type, size):
+    radar_dict = {}
+    for index in range(size):
+        # Filled one label at a time, as get_stock_data does while parsing the page
+        record = record_type()
+        for column, value in scraped_fields(index).items():
+            record[column] = value
+        radar_dict[record["Symbol"]] = record
+    return radar_dict
+
+
+def measure(record_type, size):
+    gc.collect()
+    tracemalloc.start()
+    radar_dict = build(record_type, size)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    radar_dict_to_table(radar_dict)
+    return held, time.perf_counter() - start
+
+
+def main(size):
+    dict_bytes, dict_seconds = measure(dict, size)
+    record_bytes, record_seconds = measure(StockRecord, size)
+
+    print(f"tickers:                 {size:,}")
+    print(f"dict records:            {dict_bytes / 2 ** 20:.1f} MiB, to dataframe {dict_seconds:.3f}s")
+    print(f"StockRecords:            {record_bytes / 2 ** 20:.1f} MiB, to dataframe {record_seconds:.3f}s")
+    print(f"memory saved:            {(dict_bytes - record_bytes) / 2 ** 20:.1f} MiB "
+          f"({1 - record_bytes / dict_bytes:.0%})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
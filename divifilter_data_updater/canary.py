@@ -0,0 +1,53 @@
+from divifilter_data_updater.schema import ESSENTIAL_COLUMNS
+
+# Only fields filled for at least this fraction of stocks in the last good run are checked
+CANARY_MIN_BASELINE_COVERAGE = 0.5
+# A checked field may be filled for this much less of the sample than of the last good run
+# (samples are small, so this is about broken parsing, not drift)
+CANARY_COVERAGE_TOLERANCE = 0.3
+# Fewer parsed sample pages than this fraction means the site or the parser is broken
+CANARY_MIN_PARSED_FRACTION = 0.5
+
+
+def _filled(value):
+    return value is not None and value != "" and value == value
+
+
+def field_coverage(records):
+    """
+    Fraction of records that have a value (not None/NaN/empty) in each field.
+
+    :param records: iterable of {column: value} mappings
+    :return coverage: {column: fraction between 0 and 1}; {} for no records
+    """
+    records = list(records)
+    counts = {}
+    for record in records:
+        for column, value in record.items():
+            if column != "Symbol":
+                counts[column] = counts.get(column, 0) + _filled(value)
+    return {column: count / len(records) for column, count in counts.items()}
+
+
+def canary_problems(sample_records, sample_size, baseline):
+    """
+    Check a canary sample of freshly parsed stocks against the last good run.
+
+    :param sample_records: the records parsed from the sample's pages
+    :param sample_size: how many pages the sample tried to fetch
+    :param baseline: field_coverage of the last published full scrape; {} if there is none,
+        in which case every essential column just has to show up somewhere in the sample
+
+    :return problems: human-readable reasons the parser looks broken; empty if the sample looks fine
+    """
+    if sample_size and len(sample_records) < CANARY_MIN_PARSED_FRACTION * sample_size:
+        return [f"only {len(sample_records)}/{sample_size} sample pages parsed"]
+    coverage = field_coverage(sample_records)
+    if not baseline:
+        return [f"{column}: empty in every sample page" for column in ESSENTIAL_COLUMNS
+                if not coverage.get(column)]
+    return [
+        f"{column}: {coverage.get(column, 0):.0%} filled, {expected:.0%} in the last good run"
+        for column, expected in sorted(baseline.items())
+        if expected >= CANARY_MIN_BASELINE_COVERAGE and coverage.get(column, 0) < expected - CANARY_COVERAGE_TOLERANCE
+    ]
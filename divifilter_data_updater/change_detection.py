@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+# Never drop more than this fraction of the published stocks because they went
+# missing from the index: a pagination error looks just like mass delisting.
+MAX_REMOVED_FRACTION = 0.1
+
+ChangeSet = namedtuple("ChangeSet", ["to_fetch", "added", "removed", "unchanged"])
+ChangeSet.__doc__ = """
+What an incremental scrape has to do.
+
+to_fetch: tickers ({'symbol', 'url'}) that are new or whose page changed
+added: symbols on the index that aren't published yet (also in to_fetch)
+removed: published symbols no longer on the index
+unchanged: how many listed pages kept the version they were last scraped at
+"""
+
+
+def detect_changes(tickers, page_versions, known_versions, published_symbols):
+    """
+    Diff the stocks index and the pages' modification signals against what was
+    last scraped. A page counts as changed when its version differs from the one
+    recorded at its last successful scrape, or when either is unknown.
+
+    :param tickers: the index's tickers now, [{'symbol', 'url'}]
+    :param page_versions: {url: version} from the sitemap / HEAD validators; None or absent if unknown
+    :param known_versions: {symbol: version} recorded when each page was last scraped
+    :param published_symbols: symbols currently in dividend_data_table
+
+    :return changes: a ChangeSet
+    """
+    published = set(published_symbols)
+    listed = set()
+    to_fetch = []
+    added = []
+    for ticker_info in tickers:
+        symbol = ticker_info["symbol"]
+        listed.add(symbol)
+        version = page_versions.get(ticker_info["url"])
+        if symbol not in published:
+            added.append(symbol)
+            to_fetch.append(ticker_info)
+        elif version is None or known_versions.get(symbol) != version:
+            to_fetch.append(ticker_info)
+    removed = sorted(published - listed)
+    return ChangeSet(to_fetch, added, removed, len(listed) - len(to_fetch))
+
+
+def removal_looks_safe(removed, published_count):
+    """
+    True when dropping `removed` symbols is plausible delisting rather than a
+    partially read index (see MAX_REMOVED_FRACTION).
+    """
+    return len(removed) <= MAX_REMOVED_FRACTION * published_count
@@ -0,0 +1,81 @@
+import json
+import logging
+import socket
+
+logger = logging.getLogger(__name__)
+
+# Per-row freshness stamps change on every publish; feeding them would list every row every time
+IGNORED_COLUMNS = frozenset({"Symbol", "Drip Updated", "Yahoo Updated"})
+# Sink targets starting with this are Unix socket paths; anything else is an NDJSON file
+UNIX_SOCKET_PREFIX = "unix:"
+SOCKET_TIMEOUT_SECONDS = 2
+
+
+def _normalized(value):
+    return None if value is None or value != value else value
+
+
+def diff_rows(before, after):
+    """
+    Cell-level changes between two snapshots of dividend_data_table rows.
+
+    A row only in after is an insert listing its non-null cells, a row only in
+    before a delete listing the cells it had; NaN counts as null and the
+    IGNORED_COLUMNS never show up.
+
+    :param before: {Symbol: {column: value}} read before a write
+    :param after: {Symbol: {column: value}} read after it, for the same symbols
+
+    :return changes: [{'Symbol', 'column', 'op', 'old', 'new'}] ordered by symbol, then column;
+        op is 'insert', 'update' or 'delete'
+    """
+    changes = []
+    for symbol in sorted(set(before) | set(after), key=str):
+        old_row, new_row = before.get(symbol), after.get(symbol)
+        op = "insert" if old_row is None else "delete" if new_row is None else "update"
+        old_row, new_row = old_row or {}, new_row or {}
+        for column in sorted((set(old_row) | set(new_row)) - IGNORED_COLUMNS):
+            old, new = _normalized(old_row.get(column)), _normalized(new_row.get(column))
+            if old != new:
+                changes.append({"Symbol": symbol, "column": column, "op": op, "old": old, "new": new})
+    return changes
+
+
+class NdjsonFileSink:
+    """Appends change feed entries to a local file, one JSON object per line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, entries):
+        with open(self.path, "a", encoding="utf-8") as feed_file:
+            feed_file.writelines(json.dumps(entry, default=str) + "\n" for entry in entries)
+
+
+class UnixSocketSink:
+    """
+    Sends change feed entries as NDJSON to whoever listens on a Unix stream
+    socket, one connection per published version.
+    """
+
+    def __init__(self, path, timeout=SOCKET_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+
+    def emit(self, entries):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as feed_socket:
+            feed_socket.settimeout(self.timeout)
+            feed_socket.connect(self.path)
+            feed_socket.sendall("".join(json.dumps(entry, default=str) + "\n" for entry in entries).encode("utf-8"))
+
+
+def open_sink(target):
+    """
+    The change feed sink for a changefeed_sink setting: 'unix:/path' for a Unix
+    socket, any other non-empty value for an NDJSON file; None for no sink.
+    """
+    if not target:
+        return None
+    if target.startswith(UNIX_SOCKET_PREFIX):
+        return UnixSocketSink(target[len(UNIX_SOCKET_PREFIX):])
+    return NdjsonFileSink(target)
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+from divifilter_data_updater.refresh_planner import FRESHNESS_FORMAT
+
+# When more than this fraction of the symbols queried fail at once, the source
+# itself is having trouble; nobody's failure count goes up for that.
+OUTAGE_FAILURE_FRACTION = 0.5
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class SymbolCircuitBreaker:
+    """
+    Per-symbol failure tracker for one data source (e.g. Yahoo Finance), persisted
+    in the database so it survives restarts.
+
+    A symbol the source returned nothing for is skipped for base_seconds, then
+    twice that after its next failure and so on up to max_seconds; one success
+    resets it. Delisted tickers and odd share classes thereby stop costing a
+    lookup (and a fallback chain) every cycle, while a symbol that comes back is
+    picked up again within max_seconds.
+    """
+
+    def __init__(self, store, source, base_seconds=3600, max_seconds=7 * 86400, now=_utc_now):
+        """
+        :param store: DatabaseConnection (load_symbol_failures / save_symbol_failures / clear_symbol_failures)
+        :param source: the data source's name, e.g. 'yahoo'
+        :param base_seconds: how long a symbol is skipped after its first failure
+        :param max_seconds: cap on the skip interval
+        :param now: returns the current naive UTC datetime, injectable for tests
+        """
+        self.store = store
+        self.source = source
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self._now = now
+        self._failures = None
+        self.suppressed_count = 0
+
+    def _load(self):
+        if self._failures is None:
+            self._failures = self.store.load_symbol_failures(self.source)
+        return self._failures
+
+    def backoff_seconds(self, failures):
+        return min(self.max_seconds, self.base_seconds * 2 ** (failures - 1))
+
+    def allowed(self, symbols):
+        """
+        The symbols not currently suppressed, in their original order; how many
+        were held back is left in suppressed_count.
+        """
+        failures = self._load()
+        now = self._now().strftime(FRESHNESS_FORMAT)
+        allowed = [symbol for symbol in symbols
+                   if symbol not in failures or (failures[symbol][1] or "") <= now]
+        self.suppressed_count = len(symbols) - len(allowed)
+        return allowed
+
+    def record(self, failed, succeeded):
+        """
+        Count a failure for each symbol in failed (suppressing it for its next
+        backoff interval) and reset those in succeeded. Skipped as a source-wide
+        outage when most of the symbols queried failed.
+
+        :return outage: True if the failures were put down to an outage and not recorded
+        """
+        failed, succeeded = list(failed), list(succeeded)
+        if len(failed) > OUTAGE_FAILURE_FRACTION * (len(failed) + len(succeeded)):
+            return True
+        failures = self._load()
+        now = self._now()
+        updates = {}
+        for symbol in failed:
+            count = failures.get(symbol, (0, None))[0] + 1
+            until = (now + timedelta(seconds=self.backoff_seconds(count))).strftime(FRESHNESS_FORMAT)
+            updates[symbol] = (count, until)
+        recovered = [symbol for symbol in succeeded if symbol in failures]
+        self.store.save_symbol_failures(self.source, updates)
+        self.store.clear_symbol_failures(self.source, recovered)
+        failures.update(updates)
+        for symbol in recovered:
+            failures.pop(symbol)
+        return False
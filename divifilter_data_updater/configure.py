@@ -32,4 +32,49 @@ def read_configurations(config_folder: str = "config") -> dict:
     config["scrape_max_workers"] = parser.read_configuration_variable("scrape_max_workers", default_value=4)
     config["scrape_min_expected_tickers"] = \
         parser.read_configuration_variable("scrape_min_expected_tickers", default_value=100)
+    config["yahoo_refresh_budget"] = parser.read_configuration_variable("yahoo_refresh_budget", default_value=0)
+    config["yahoo_popular_symbols"] = parser.read_configuration_variable("yahoo_popular_symbols", default_value=100)
+    config["yahoo_popular_max_age_seconds"] = \
+        parser.read_configuration_variable("yahoo_popular_max_age_seconds", default_value=3600)
+    config["yahoo_failure_backoff_seconds"] = \
+        parser.read_configuration_variable("yahoo_failure_backoff_seconds", default_value=3600)
+    config["yahoo_failure_max_backoff_seconds"] = \
+        parser.read_configuration_variable("yahoo_failure_max_backoff_seconds", default_value=604800)
+    config["scrape_canary_size"] = parser.read_configuration_variable("scrape_canary_size", default_value=20)
+    config["scrape_incremental"] = parser.read_configuration_variable("scrape_incremental", default_value=False)
+    config["scrape_hedge_requests"] = parser.read_configuration_variable("scrape_hedge_requests", default_value=False)
+    config["scrape_hedge_percentile"] = \
+        parser.read_configuration_variable("scrape_hedge_percentile", default_value=95)
+    config["scrape_hedge_budget_fraction"] = \
+        parser.read_configuration_variable("scrape_hedge_budget_fraction", default_value=0.05)
+    config["changefeed_enabled"] = parser.read_configuration_variable("changefeed_enabled", default_value=True)
+    config["changefeed_sink"] = parser.read_configuration_variable("changefeed_sink", default_value="")
+    config["changefeed_keep_versions"] = \
+        parser.read_configuration_variable("changefeed_keep_versions", default_value=1000)
+    config["journal_dir"] = parser.read_configuration_variable("journal_dir", default_value="journal")
+    config["journal_max_attempts"] = parser.read_configuration_variable("journal_max_attempts", default_value=5)
+    config["db_writer_enabled"] = parser.read_configuration_variable("db_writer_enabled", default_value=True)
+    config["db_writer_batch_size"] = parser.read_configuration_variable("db_writer_batch_size", default_value=500)
+    config["db_writer_flush_seconds"] = parser.read_configuration_variable("db_writer_flush_seconds", default_value=2)
+    config["db_writer_queue_size"] = parser.read_configuration_variable("db_writer_queue_size", default_value=5000)
+    config["store_history"] = parser.read_configuration_variable("store_history", default_value=True)
+    config["history_retention_days"] = \
+        parser.read_configuration_variable("history_retention_days", default_value=1825)
+    config["history_downsample_after_days"] = \
+        parser.read_configuration_variable("history_downsample_after_days", default_value=365)
+    config["cycle_time_budget_seconds"] = \
+        parser.read_configuration_variable("cycle_time_budget_seconds", default_value=540)
+    config["scheduler_enabled"] = parser.read_configuration_variable("scheduler_enabled", default_value=False)
+    config["drip_version_check_interval_seconds"] = \
+        parser.read_configuration_variable("drip_version_check_interval_seconds", default_value=1800)
+    config["drip_scrape_interval_seconds"] = \
+        parser.read_configuration_variable("drip_scrape_interval_seconds", default_value=300)
+    config["drip_full_scrape_max_age_seconds"] = \
+        parser.read_configuration_variable("drip_full_scrape_max_age_seconds", default_value=7 * 86400)
+    config["yahoo_enrichment_interval_seconds"] = \
+        parser.read_configuration_variable("yahoo_enrichment_interval_seconds", default_value=3600)
+    config["yahoo_market_hours_only"] = \
+        parser.read_configuration_variable("yahoo_market_hours_only", default_value=True)
+    config["scheduler_jitter_fraction"] = \
+        parser.read_configuration_variable("scheduler_jitter_fraction", default_value=0.1)
     return config
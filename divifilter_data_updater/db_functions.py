@@ -1,25 +1,100 @@
-from sqlalchemy import create_engine, MetaData, Table, Column, String, Integer, Float, text, select, inspect
-from datetime import datetime
-import pandas as pd
+from __future__ import annotations
+
+from sqlalchemy import create_engine, MetaData, Table, Column, String, Integer, Float, Text, text, select, inspect, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import StaticPool
+from contextlib import nullcontext
+from datetime import datetime, date, timedelta
+from divifilter_data_updater.schema import COLUMN_TYPES, HISTORY_COLUMNS, is_numeric, python_converter
+from divifilter_data_updater.stock_record import StockRecord, records_to_columns
+from divifilter_data_updater.derived_fields import derived_fields_update, required_columns
+from divifilter_data_updater.summaries import (
+    SUMMARY_SOURCE_COLUMNS, SUMMARY_PRIMARY_KEYS, compute_summary_tables
+)
+import json
+import logging
 import math
 import re
+from divifilter_data_updater.lazy_imports import LazyModule
+
+# Needed for dataframe loads and summary refreshes only; records publish without it
+pd = LazyModule("pandas")
+
+logger = logging.getLogger(__name__)
+
+# Secondary indexes backing the divifilter frontend's filter workload: equality
+# on Sector/Industry first, then the range-filtered numeric columns.
+DIVIDEND_DATA_INDEXES = {
+    'ix_sector_years_yield': ('Sector', 'No Years', 'Div Yield'),
+    'ix_industry_yield': ('Industry', 'Div Yield'),
+    'ix_years_yield': ('No Years', 'Div Yield'),
+    'ix_div_yield': ('Div Yield',),
+    'ix_payout_ratio': ('Payout Ratio',),
+    'ix_chowder_number': ('Chowder Number',),
+}
+
+# Canonical frontend filter queries and the index each is expected to use,
+# checked with EXPLAIN by check_filter_query_indexes().
+CANONICAL_FILTER_QUERIES = {
+    'sector_streak_yield': (
+        'ix_sector_years_yield',
+        "SELECT `Symbol` FROM dividend_data_table "
+        "WHERE `Sector` = 'Utilities' AND `No Years` >= 25 AND `Div Yield` >= 3"
+    ),
+    'industry_yield': (
+        'ix_industry_yield',
+        "SELECT `Symbol` FROM dividend_data_table WHERE `Industry` = 'Banks' AND `Div Yield` >= 3"
+    ),
+    'streak_yield': (
+        'ix_years_yield',
+        "SELECT `Symbol` FROM dividend_data_table WHERE `No Years` >= 50 AND `Div Yield` >= 2"
+    ),
+    'payout_ratio': (
+        'ix_payout_ratio',
+        "SELECT `Symbol` FROM dividend_data_table WHERE `Payout Ratio` BETWEEN 0 AND 40"
+    ),
+    'chowder_number': (
+        'ix_chowder_number',
+        "SELECT `Symbol` FROM dividend_data_table WHERE `Chowder Number` >= 15"
+    ),
+}
+
+HISTORY_TABLE = "dividend_history_table"
+# Stocks parsed so far by an unfinished full scrape, per dataset version (see ScrapeCheckpoint)
+SCRAPE_CHECKPOINT_TABLE = "dividend_scrape_checkpoint"
+# Tickers that failed both passes of the last scrape, with their last response
+DEAD_LETTER_TABLE = "dividend_scrape_dead_letter"
+DEAD_LETTER_COLUMNS = ("Symbol", "url", "status", "error", "body", "failed_at")
+# Each stock page's modification signal (sitemap lastmod or HEAD validator) at its last successful scrape
+PAGE_VERSION_TABLE = "dividend_page_versions"
+# Per-field fill rate of the last published full scrape, the canary's baseline
+FIELD_COVERAGE_TABLE = "dividend_field_coverage"
+# Symbols a data source keeps failing for, and until when they're skipped (see SymbolCircuitBreaker)
+SOURCE_FAILURE_TABLE = "dividend_source_failures"
+# Cell-level changes of dividend_data_table, one version per publish (see changefeed.diff_rows)
+CHANGELOG_TABLE = "dividend_changelog"
+# Times append_changelog re-reads the next version after another writer took it first
+CHANGELOG_VERSION_ATTEMPTS = 5
+# Monthly history partitions (MySQL) are created this many months ahead of today.
+HISTORY_PARTITION_MONTHS_AHEAD = 2
 
 
-class MysqlConnection:
+class DatabaseConnection:
+    """
+    Storage backend for the updater. Every operation the runner needs is
+    implemented here with portable SQL (double-quoted identifiers, ON CONFLICT
+    upserts, ALTER TABLE ... RENAME TO, transactional DDL), which SQLite runs
+    as-is. Engine-specific subclasses override the small dialect hooks (the
+    _-prefixed methods below) with their own syntax and fastest bulk path.
+    """
+
+    IDENTIFIER_QUOTE = '"'
 
     def __init__(self, uri_string: str):
-        # check due to pymsql requiring changes to the URI string that are often forgetten
         if not uri_string:
-            raise ValueError("MYSQL_URI must be set in configurations or environment variables")
-            
-        if "pymysql" not in uri_string:
-            uri_string = uri_string.replace("mysql", "mysql+pymysql", 1)
-            
-        connect_args = {}
-        if "aivencloud.com" in uri_string:
-            connect_args['ssl'] = {'ssl_mode': 'REQUIRED'}
-            
-        self.engine = create_engine(uri_string, connect_args=connect_args, echo=False)
+            raise ValueError("A database URI (mysql_uri) must be set in configurations or environment variables")
+
+        self.engine = create_engine(self._engine_uri(uri_string), **self._engine_kwargs(uri_string))
         self.conn = self.engine.connect()
         self.meta = MetaData()
         self.dividend_update_times = Table(
@@ -27,6 +102,51 @@ class MysqlConnection:
             Column('name', String(32), primary_key=True, unique=True),
             Column('last_update_time', String(32))
         )
+        self.scrape_checkpoint = Table(
+            SCRAPE_CHECKPOINT_TABLE, self.meta,
+            Column('dataset_version', String(64), primary_key=True),
+            Column('Symbol', String(16), primary_key=True),
+            Column('record', Text)
+        )
+        self.dead_letters = Table(
+            DEAD_LETTER_TABLE, self.meta,
+            Column('Symbol', String(16), primary_key=True),
+            Column('url', String(512)),
+            Column('status', Integer),
+            Column('error', String(512)),
+            Column('body', Text),
+            Column('failed_at', String(32))
+        )
+        self.page_versions = Table(
+            PAGE_VERSION_TABLE, self.meta,
+            Column('Symbol', String(16), primary_key=True),
+            Column('page_version', String(128)),
+            Column('scraped_at', String(32))
+        )
+        self.source_failures = Table(
+            SOURCE_FAILURE_TABLE, self.meta,
+            Column('source', String(32), primary_key=True),
+            Column('Symbol', String(32), primary_key=True),
+            Column('failures', Integer),
+            Column('suppressed_until', String(32))
+        )
+        self.changelog = Table(
+            CHANGELOG_TABLE, self.meta,
+            Column('version', Integer, primary_key=True, autoincrement=False),
+            Column('seq', Integer, primary_key=True, autoincrement=False),
+            Column('source', String(32)),
+            Column('Symbol', String(32)),
+            Column('column_name', String(64)),
+            Column('op', String(8)),
+            Column('old_value', Text),
+            Column('new_value', Text),
+            Column('changed_at', String(32))
+        )
+        self.field_coverage = Table(
+            FIELD_COVERAGE_TABLE, self.meta,
+            Column('column_name', String(64), primary_key=True),
+            Column('coverage', Float)
+        )
 
     def close(self):
         self.conn.close()
@@ -39,98 +159,235 @@ class MysqlConnection:
         self.close()
         return False
 
+    # ---- dialect hooks ---------------------------------------------------
+
+    @staticmethod
+    def _engine_uri(uri_string):
+        return uri_string
+
+    @staticmethod
+    def _engine_kwargs(uri_string):
+        return {"echo": False}
+
+    def _q(self, identifier):
+        """Quote an identifier (column names contain spaces, % and /)."""
+        return f"{self.IDENTIFIER_QUOTE}{identifier}{self.IDENTIFIER_QUOTE}"
+
+    def _merge_connection(self):
+        """Connection the staging load and merge run on, as a context manager."""
+        return nullcontext(self.conn)
+
+    def _load_keyed_table(self, conn, table_name, data_frame, key_columns, dtype_map):
+        """
+        (Re)create table_name with a primary key on key_columns and bulk load
+        data_frame into it with a single executemany.
+        """
+        column_types = {col: dtype_map.get(col) or self._frame_column_type(data_frame[col])
+                        for col in data_frame.columns}
+        self._load_keyed_rows(conn, table_name, column_types, self._frame_records(data_frame), key_columns)
+
+    def _load_keyed_rows(self, conn, table_name, column_types, rows, key_columns):
+        """
+        (Re)create table_name with the given {column: type} and a primary key on
+        key_columns, then insert rows (dicts keyed by column) in one executemany.
+        """
+        conn.execute(text(f"DROP TABLE IF EXISTS {self._q(table_name)}"))
+        table = self._keyed_table(table_name, column_types, key_columns)
+        table.create(conn)
+        if rows:
+            conn.execute(table.insert(), rows)
+
+    @staticmethod
+    def _keyed_table(table_name, column_types, key_columns):
+        return Table(table_name, MetaData(), *(
+            Column(name, col_type, primary_key=(name in key_columns)) for name, col_type in column_types.items()
+        ))
+
+    @staticmethod
+    def _frame_column_type(series):
+        if pd.api.types.is_integer_dtype(series):
+            return Integer
+        if pd.api.types.is_float_dtype(series):
+            return Float
+        return String(255)
+
+    @staticmethod
+    def _frame_records(data_frame):
+        """DataFrame rows as dicts with every NaN/NA turned into None."""
+        return data_frame.astype(object).where(data_frame.notna(), None).to_dict("records")
+
+    def _rename_table_sql(self, old_name, new_name):
+        return f"ALTER TABLE {self._q(old_name)} RENAME TO {self._q(new_name)}"
+
+    def _has_primary_key(self, conn, table_name):
+        return bool(inspect(conn).get_pk_constraint(table_name).get('constrained_columns'))
+
+    def _upsert_sql(self, table_name, columns, key_columns, rows_sql, coalesce=False):
+        """
+        INSERT rows_sql (a VALUES clause or a SELECT) into table_name, updating
+        the non-key columns of rows whose key already exists. With coalesce, a
+        NULL incoming value keeps the stored one.
+        """
+        col_list = ", ".join(self._q(c) for c in columns)
+        key_list = ", ".join(self._q(c) for c in key_columns)
+        assignments = []
+        for c in columns:
+            if c in key_columns:
+                continue
+            new_value = f"excluded.{self._q(c)}"
+            if coalesce:
+                new_value = f"COALESCE({new_value}, {self._q(c)})"
+            assignments.append(f"{self._q(c)} = {new_value}")
+        action = f"DO UPDATE SET {', '.join(assignments)}" if assignments else "DO NOTHING"
+        return f"INSERT INTO {self._q(table_name)} ({col_list}) {rows_sql} ON CONFLICT ({key_list}) {action}"
+
+    def _delete_missing_sql(self, table_name, staging_table):
+        return (f"DELETE FROM {self._q(table_name)} WHERE {self._q('Symbol')} NOT IN "
+                f"(SELECT {self._q('Symbol')} FROM {self._q(staging_table)})")
+
+    def _retype_column_sql(self, table_name, column_name, ddl_type):
+        """SQL to change a column's type, or None where the engine can't (SQLite)."""
+        return None
+
+    def _existing_index_names(self, table_name):
+        return {index['name'] for index in inspect(self.conn).get_indexes(table_name)}
+
+    def _create_index_sql(self, index_name, table_name, columns):
+        col_list = ", ".join(self._q(c) for c in columns)
+        return f"CREATE INDEX IF NOT EXISTS {self._q(index_name)} ON {self._q(table_name)} ({col_list})"
+
+    def _explain_index_names(self, query):
+        """Names of the indexes the engine's plan for query uses."""
+        rows = self.conn.execute(text(f"EXPLAIN QUERY PLAN {query}")).fetchall()
+        return {match for row in rows for match in re.findall(r"USING (?:COVERING )?INDEX (\w+)", str(row[-1]))}
+
+    def _history_table_options(self):
+        return ""
+
+    def _week_sql(self, date_sql):
+        return f"strftime('%Y-%W', {date_sql})"
+
+    def _swap_in_tables(self, conn, table_names):
+        """
+        Replace each table in table_names with its freshly built '<name>_staging'
+        copy in one transaction (DDL is transactional on this engine).
+        """
+        for table_name in table_names:
+            conn.execute(text(f"DROP TABLE IF EXISTS {self._q(table_name)}"))
+            conn.execute(text(self._rename_table_sql(f"{table_name}_staging", table_name)))
+        conn.commit()
+
+    def _apply_enrichment_updates(self, updates):
+        """
+        Write {symbol: {column: value}} with COALESCE semantics. Symbols sharing
+        the same set of columns are sent as one executemany batch.
+        """
+        batches = {}
+        for symbol, data in updates.items():
+            batches.setdefault(tuple(data), []).append((symbol, data))
+
+        for columns, rows in batches.items():
+            set_clauses = ", ".join(
+                f"{self._q(col)} = COALESCE(:{self._safe_param_name(col)}, {self._q(col)})"
+                for col in columns
+            )
+            params = []
+            for symbol, data in rows:
+                row_params = {self._safe_param_name(col): val for col, val in data.items()}
+                row_params["symbol"] = symbol
+                params.append(row_params)
+            query = text(f"UPDATE dividend_data_table SET {set_clauses} WHERE Symbol = :symbol")
+            self.conn.execute(query, params if len(params) > 1 else params[0])
+
+    # ---- dividend_data_table ---------------------------------------------
+
     def update_data_table_from_data_frame(self, data_table_to_update: pd.DataFrame):
-        dtype_map = {
-            'Symbol': String(32),
-            'No Years': Integer,
-            'Price': Float,
-            'Div Yield': Float,
-            '5Y Avg Yield': Float,
-            'Current Div': Float,
-            'Annualized': Float,
-            'Low': Float,
-            'High': Float,
-            'DGR 1Y': Float,
-            'DGR 3Y': Float,
-            'DGR 5Y': Float,
-            'DGR 10Y': Float,
-            'TTR 1Y': Float,
-            'TTR 3Y': Float,
-            'FV %': Float,
-            'Fair Value': Float,
-            'Chowder Number': Float,
-            'Revenue 1Y': Float,
-            'NPM': Float,
-            'CF/Share': Float,
-            'ROE': Float,
-            'Debt/Capital': Float,
-            'ROTC': Float,
-            'P/E': Float,
-            'P/BV': Float,
-            'PEG': Float,
-            'Market Cap': Float,
-            'Payout Ratio': Float
-        }
+        dtype_map = dict(COLUMN_TYPES)
+        self._publish_data_table(lambda conn, staging_table: self._load_keyed_table(
+            conn, staging_table, data_table_to_update, ('Symbol',), dtype_map))
+
+    def update_data_table_from_records(self, records: list, prune: bool = True):
+        """
+        Publish scraped records (StockRecords or dicts, one per symbol) the same
+        way as update_data_table_from_data_frame, without pandas: the staging
+        table is typed from COLUMN_TYPES (extra columns are inferred) and loaded
+        with one executemany of values converted to each column's Python type.
+
+        Args:
+            records (list): mappings of column -> value, each with a 'Symbol'.
+            prune (bool): drop symbols missing from records. Pass False to only
+                upsert a partial scrape (e.g. one cut short by its time budget).
+        """
+        columns = records_to_columns(records)
+        column_types = {}
+        for col, values in columns.items():
+            column_types[col] = COLUMN_TYPES.get(col) or self._infer_column_type(col, values)
+            converter = python_converter(column_types[col])
+            columns[col] = [converter(value) for value in values]
+        rows = [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+        self._publish_data_table(lambda conn, staging_table: self._load_keyed_rows(
+            conn, staging_table, column_types, rows, ('Symbol',)), prune=prune)
+
+    def _publish_data_table(self, load_staging, prune=True):
+        """
+        Build dividend_data_table_staging with load_staging(conn, staging_table),
+        then publish it: renamed into place on the first run, merged after that
+        (without deleting missing symbols when prune is False).
+        """
         staging_table = "dividend_data_table_staging"
-        data_table_to_update.to_sql(staging_table, con=self.engine, if_exists="replace", index=False, dtype=dtype_map)
 
-        with self.engine.connect() as conn:
-            # Ensure staging table has a primary key on Symbol for ON DUPLICATE KEY UPDATE
-            conn.execute(text(f"ALTER TABLE `{staging_table}` ADD PRIMARY KEY (`Symbol`)"))
+        with self._merge_connection() as conn:
+            load_staging(conn, staging_table)
 
             if not self.engine.dialect.has_table(conn, "dividend_data_table"):
                 # First run: rename (nothing reading yet)
-                conn.execute(text(f"RENAME TABLE {staging_table} TO dividend_data_table"))
+                conn.execute(text(self._rename_table_sql(staging_table, "dividend_data_table")))
             else:
-                self._merge_staging_into_main(conn, staging_table)
+                self._merge_staging_into_main(conn, staging_table, prune=prune)
             conn.commit()
 
-    def _merge_staging_into_main(self, conn, staging_table):
+    def _merge_staging_into_main(self, conn, staging_table, prune=True):
         """
         Merge the freshly-built staging table into the existing main table:
-        upsert rows, drop rows no longer present, and add any new columns first.
+        upsert rows, drop rows no longer present (if prune), and add any new columns first.
         Handles the legacy case of a main table created without a primary key.
         """
         # Ensure main table has a primary key on Symbol (fix for tables created without one)
-        result = conn.execute(text("SHOW KEYS FROM `dividend_data_table` WHERE Key_name = 'PRIMARY'"))
-        if not result.fetchone():
+        if not self._has_primary_key(conn, "dividend_data_table"):
             # Table has no PK, likely has duplicates. Drop and replace with staging.
-            conn.execute(text("DROP TABLE `dividend_data_table`"))
-            conn.execute(text(f"RENAME TABLE `{staging_table}` TO `dividend_data_table`"))
+            conn.execute(text(f"DROP TABLE {self._q('dividend_data_table')}"))
+            conn.execute(text(self._rename_table_sql(staging_table, "dividend_data_table")))
             return
 
-        staging_cols = [col['name'] for col in inspect(self.engine).get_columns(staging_table)]
-        main_cols = {col['name'] for col in inspect(self.engine).get_columns("dividend_data_table")}
+        staging_col_info = inspect(conn).get_columns(staging_table)
+        staging_cols = [col['name'] for col in staging_col_info]
+        main_cols = {col['name'] for col in inspect(conn).get_columns("dividend_data_table")}
 
-        # Add any new columns to main (rare; ALTER is brief)
-        for col in staging_cols:
-            if col not in main_cols:
-                conn.execute(text(f"ALTER TABLE `dividend_data_table` ADD COLUMN `{col}` TEXT"))
+        # Add any new columns to main (rare; ALTER is brief), typed like staging
+        for col in staging_col_info:
+            if col['name'] not in main_cols:
+                col_type = self._column_ddl_type(col['name'], col.get('type'))
+                conn.execute(text(
+                    f"ALTER TABLE {self._q('dividend_data_table')} ADD COLUMN {self._q(col['name'])} {col_type}"
+                ))
 
-        col_list = ", ".join(f"`{c}`" for c in staging_cols)
-        update_clause = ", ".join(
-            f"`{c}` = VALUES(`{c}`)" for c in staging_cols if c != 'Symbol'
-        )
-        conn.execute(text(
-            f"INSERT INTO `dividend_data_table` ({col_list}) "
-            f"SELECT {col_list} FROM `{staging_table}` "
-            f"ON DUPLICATE KEY UPDATE {update_clause}"
-        ))
-        conn.execute(text(
-            f"DELETE m FROM `dividend_data_table` m "
-            f"LEFT JOIN `{staging_table}` s ON m.Symbol = s.Symbol "
-            f"WHERE s.Symbol IS NULL"
-        ))
-        conn.execute(text(f"DROP TABLE `{staging_table}`"))
+        col_list = ", ".join(self._q(c) for c in staging_cols)
+        # The WHERE lets SQLite tell the upsert's ON CONFLICT apart from a join constraint
+        conn.execute(text(self._upsert_sql(
+            "dividend_data_table", staging_cols, ('Symbol',),
+            f"SELECT {col_list} FROM {self._q(staging_table)} WHERE 1 = 1"
+        )))
+        if prune:
+            conn.execute(text(self._delete_missing_sql("dividend_data_table", staging_table)))
+        conn.execute(text(f"DROP TABLE {self._q(staging_table)}"))
 
     def update_metadata_table(self, time_dict_to_update: dict):
         self.meta.create_all(self.conn, tables=[self.dividend_update_times])
+        query = text(self._upsert_sql(
+            "dividend_update_times", ("name", "last_update_time"), ("name",), "VALUES (:name, :update_time)"
+        ))
         for timestamp_key, timestamp_value in time_dict_to_update.items():
-            query = text(
-                "INSERT INTO dividend_update_times (name, last_update_time) "
-                "VALUES (:name, :update_time) "
-                "ON DUPLICATE KEY UPDATE last_update_time = :update_time"
-            )
             self.conn.execute(query, {"name": timestamp_key, "update_time": timestamp_value})
             self.conn.commit()
 
@@ -165,6 +422,336 @@ class MysqlConnection:
             return None
         return (datetime.now() - last).total_seconds()
 
+    # ---- scrape checkpoint -----------------------------------------------
+
+    def load_scrape_checkpoint(self, dataset_version):
+        """
+        Return the stocks checkpointed for dataset_version as {Symbol: StockRecord}.
+        Checkpoints of any other version are stale and are dropped.
+
+        Args:
+            dataset_version (str): the DripInvesting.org updated_gmt being scraped.
+        """
+        self.meta.create_all(self.conn, tables=[self.scrape_checkpoint])
+        checkpoint = self.scrape_checkpoint
+        self.conn.execute(checkpoint.delete().where(checkpoint.c.dataset_version != dataset_version))
+        rows = self.conn.execute(
+            select(checkpoint.c.Symbol, checkpoint.c.record).where(checkpoint.c.dataset_version == dataset_version)
+        ).fetchall()
+        self.conn.commit()
+        return {symbol: StockRecord(json.loads(record)) for symbol, record in rows}
+
+    def save_scrape_checkpoint(self, dataset_version, records):
+        """
+        Upsert scraped (not yet published) records into the checkpoint of dataset_version.
+
+        Args:
+            dataset_version (str): the DripInvesting.org updated_gmt being scraped.
+            records (list): StockRecords (or dicts) with a 'Symbol'; values must be JSON-serializable or str()-able.
+        """
+        if not records:
+            return
+        self.meta.create_all(self.conn, tables=[self.scrape_checkpoint])
+        query = text(self._upsert_sql(
+            SCRAPE_CHECKPOINT_TABLE, ("dataset_version", "Symbol", "record"), ("dataset_version", "Symbol"),
+            "VALUES (:dataset_version, :symbol, :record)"
+        ))
+        self.conn.execute(query, [
+            {"dataset_version": dataset_version, "symbol": record["Symbol"],
+             "record": json.dumps(dict(record), default=str)}
+            for record in records
+        ])
+        self.conn.commit()
+
+    def clear_scrape_checkpoint(self):
+        """Drop every checkpointed record, once a scrape has been published."""
+        if self.engine.dialect.has_table(self.conn, SCRAPE_CHECKPOINT_TABLE):
+            self.conn.execute(self.scrape_checkpoint.delete())
+            self.conn.commit()
+
+    # ---- dead letters ----------------------------------------------------
+
+    def save_dead_letters(self, entries):
+        """
+        Upsert tickers that failed to scrape, replacing any earlier entry of the same Symbol.
+
+        Args:
+            entries (list): dicts with a 'Symbol' and optionally 'url', 'status', 'error' and 'body'
+                (see DripInvestingScraper.dead_letters).
+        """
+        if not entries:
+            return
+        self.meta.create_all(self.conn, tables=[self.dead_letters])
+        failed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        query = text(self._upsert_sql(
+            DEAD_LETTER_TABLE, DEAD_LETTER_COLUMNS, ("Symbol",),
+            "VALUES (:Symbol, :url, :status, :error, :body, :failed_at)"
+        ))
+        self.conn.execute(query, [
+            {**{column: entry.get(column) for column in DEAD_LETTER_COLUMNS}, "failed_at": failed_at}
+            for entry in entries
+        ])
+        self.conn.commit()
+
+    def get_dead_letters(self):
+        """Return the dead-lettered tickers as dicts of DEAD_LETTER_COLUMNS, oldest failure first."""
+        if not self.engine.dialect.has_table(self.conn, DEAD_LETTER_TABLE):
+            return []
+        rows = self.conn.execute(
+            select(self.dead_letters).order_by(self.dead_letters.c.failed_at, self.dead_letters.c.Symbol)
+        ).mappings().fetchall()
+        return [dict(row) for row in rows]
+
+    def remove_dead_letters(self, symbols=None):
+        """
+        Drop the dead letters of the given symbols (they scraped fine since), or all of them.
+
+        Args:
+            symbols (iterable): the Symbols to drop; None drops every entry.
+        """
+        if not self.engine.dialect.has_table(self.conn, DEAD_LETTER_TABLE):
+            return
+        query = self.dead_letters.delete()
+        if symbols is not None:
+            symbols = list(symbols)
+            if not symbols:
+                return
+            query = query.where(self.dead_letters.c.Symbol.in_(symbols))
+        self.conn.execute(query)
+        self.conn.commit()
+
+    # ---- per-symbol source failures --------------------------------------
+
+    def load_symbol_failures(self, source):
+        """
+        Return {Symbol: (consecutive failures, suppressed until)} for one data source.
+
+        Args:
+            source (str): the data source, e.g. 'yahoo'.
+        """
+        if not self.engine.dialect.has_table(self.conn, SOURCE_FAILURE_TABLE):
+            return {}
+        failures = self.source_failures
+        rows = self.conn.execute(
+            select(failures.c.Symbol, failures.c.failures, failures.c.suppressed_until)
+            .where(failures.c.source == source)
+        ).fetchall()
+        return {symbol: (count, until) for symbol, count, until in rows}
+
+    def save_symbol_failures(self, source, failures):
+        """
+        Upsert failure counts and suppression times for one data source.
+
+        Args:
+            source (str): the data source, e.g. 'yahoo'.
+            failures (dict): {Symbol: (consecutive failures, suppressed until as UTC text)}.
+        """
+        if not failures:
+            return
+        self.meta.create_all(self.conn, tables=[self.source_failures])
+        query = text(self._upsert_sql(
+            SOURCE_FAILURE_TABLE, ("source", "Symbol", "failures", "suppressed_until"), ("source", "Symbol"),
+            "VALUES (:source, :symbol, :failures, :suppressed_until)"
+        ))
+        self.conn.execute(query, [
+            {"source": source, "symbol": symbol, "failures": count, "suppressed_until": until}
+            for symbol, (count, until) in failures.items()
+        ])
+        self.conn.commit()
+
+    def clear_symbol_failures(self, source, symbols):
+        """
+        Forget the failures of symbols the data source answered for again.
+
+        Args:
+            source (str): the data source, e.g. 'yahoo'.
+            symbols (iterable): the Symbols to reset.
+        """
+        symbols = list(symbols)
+        if not symbols or not self.engine.dialect.has_table(self.conn, SOURCE_FAILURE_TABLE):
+            return
+        failures = self.source_failures
+        self.conn.execute(failures.delete().where(failures.c.source == source, failures.c.Symbol.in_(symbols)))
+        self.conn.commit()
+
+    # ---- change feed -----------------------------------------------------
+
+    def get_data_rows(self, symbols=None):
+        """
+        Return {Symbol: {column: value}} of dividend_data_table, for every stock or only some.
+
+        Args:
+            symbols (iterable): the Symbols to read; None reads the whole table.
+        """
+        if not self.engine.dialect.has_table(self.conn, "dividend_data_table"):
+            return {}
+        query = "SELECT * FROM dividend_data_table"
+        params = {}
+        if symbols is not None:
+            symbols = list(symbols)
+            if not symbols:
+                return {}
+            params = {f"s{i}": symbol for i, symbol in enumerate(symbols)}
+            query += f" WHERE {self._q('Symbol')} IN ({', '.join(':' + name for name in params)})"
+        rows = self.conn.execute(text(query), params).mappings().fetchall()
+        return {row["Symbol"]: dict(row) for row in rows}
+
+    def append_changelog(self, source, changes, changed_at):
+        """
+        Record one publish's changes under the next changelog version.
+
+        The version is max(version) + 1, inserted in the same transaction as the
+        entries; (version, seq) is the primary key, so if another writer (a second
+        updater process, say) commits that version first the insert fails on the
+        duplicate key and is retried under the version after theirs. Two publishes
+        never share a version, so get_changelog(after_version) doesn't skip any.
+
+        Args:
+            source (str): what published them, e.g. 'drip_scrape' or 'yahoo'.
+            changes (list): {'Symbol', 'column', 'op', 'old', 'new'} dicts, see changefeed.diff_rows;
+                old and new are stored as JSON text.
+            changed_at (str): UTC time of the publish.
+
+        Returns:
+            list: the stored entries as get_changelog returns them; empty (and no version used) without changes.
+        """
+        if not changes:
+            return []
+        self.meta.create_all(self.conn, tables=[self.changelog])
+        # Committed on its own, so a retry's rollback doesn't undo the table creation
+        self.conn.commit()
+        rows = [
+            {"seq": seq, "source": source, "Symbol": change["Symbol"], "column_name": change["column"],
+             "op": change["op"], "old_value": json.dumps(change["old"], default=str),
+             "new_value": json.dumps(change["new"], default=str), "changed_at": changed_at}
+            for seq, change in enumerate(changes, start=1)
+        ]
+        for attempt in range(1, CHANGELOG_VERSION_ATTEMPTS + 1):
+            version = (self.conn.execute(select(func.max(self.changelog.c.version))).scalar() or 0) + 1
+            try:
+                self.conn.execute(self.changelog.insert(), [{"version": version, **row} for row in rows])
+                self.conn.commit()
+                break
+            except IntegrityError:
+                self.conn.rollback()
+                if attempt == CHANGELOG_VERSION_ATTEMPTS:
+                    raise
+                logger.info("Changelog version %s was taken by another writer, retrying", version)
+        return [
+            {"version": version, "seq": seq, "source": source, "Symbol": change["Symbol"],
+             "column": change["column"], "op": change["op"], "old": change["old"], "new": change["new"],
+             "changed_at": changed_at}
+            for seq, change in enumerate(changes, start=1)
+        ]
+
+    def get_changelog(self, after_version=0):
+        """
+        Return the changes recorded after a changelog version, oldest first, so a
+        consumer that has applied up to after_version can catch up.
+
+        Args:
+            after_version (int): the last version already applied; 0 for everything kept.
+        """
+        if not self.engine.dialect.has_table(self.conn, CHANGELOG_TABLE):
+            return []
+        changelog = self.changelog
+        rows = self.conn.execute(
+            select(changelog).where(changelog.c.version > after_version).order_by(changelog.c.version, changelog.c.seq)
+        ).mappings().fetchall()
+        return [
+            {"version": row["version"], "seq": row["seq"], "source": row["source"], "Symbol": row["Symbol"],
+             "column": row["column_name"], "op": row["op"], "old": json.loads(row["old_value"]),
+             "new": json.loads(row["new_value"]), "changed_at": row["changed_at"]}
+            for row in rows
+        ]
+
+    def prune_changelog(self, keep_versions):
+        """
+        Drop all but the newest keep_versions changelog versions.
+
+        Args:
+            keep_versions (int): how many versions to keep; 0 keeps everything.
+        """
+        if not keep_versions or not self.engine.dialect.has_table(self.conn, CHANGELOG_TABLE):
+            return
+        newest = self.conn.execute(select(func.max(self.changelog.c.version))).scalar() or 0
+        self.conn.execute(self.changelog.delete().where(self.changelog.c.version <= newest - keep_versions))
+        self.conn.commit()
+
+    # ---- field coverage --------------------------------------------------
+
+    def get_field_coverage(self):
+        """Return {column: fraction of stocks with a value} of the last published full scrape; {} if none yet."""
+        if not self.engine.dialect.has_table(self.conn, FIELD_COVERAGE_TABLE):
+            return {}
+        rows = self.conn.execute(select(self.field_coverage.c.column_name, self.field_coverage.c.coverage)).fetchall()
+        return {column_name: coverage for column_name, coverage in rows}
+
+    def save_field_coverage(self, coverage):
+        """
+        Replace the stored field coverage with that of a newly published full scrape.
+
+        Args:
+            coverage (dict): {column: fraction between 0 and 1}, see canary.field_coverage.
+        """
+        self.meta.create_all(self.conn, tables=[self.field_coverage])
+        self.conn.execute(self.field_coverage.delete())
+        if coverage:
+            self.conn.execute(self.field_coverage.insert(), [
+                {"column_name": column_name, "coverage": value} for column_name, value in coverage.items()
+            ])
+        self.conn.commit()
+
+    # ---- page versions ---------------------------------------------------
+
+    def get_page_versions(self):
+        """Return {Symbol: page_version} as recorded at each page's last successful scrape."""
+        if not self.engine.dialect.has_table(self.conn, PAGE_VERSION_TABLE):
+            return {}
+        rows = self.conn.execute(select(self.page_versions.c.Symbol, self.page_versions.c.page_version)).fetchall()
+        return {symbol: version for symbol, version in rows}
+
+    def save_page_versions(self, versions):
+        """
+        Upsert the page versions of freshly scraped stocks.
+
+        Args:
+            versions (dict): {Symbol: page_version}; None versions are stored as NULL (always rescraped).
+        """
+        if not versions:
+            return
+        self.meta.create_all(self.conn, tables=[self.page_versions])
+        scraped_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        query = text(self._upsert_sql(
+            PAGE_VERSION_TABLE, ("Symbol", "page_version", "scraped_at"), ("Symbol",),
+            "VALUES (:symbol, :page_version, :scraped_at)"
+        ))
+        self.conn.execute(query, [
+            {"symbol": symbol, "page_version": version, "scraped_at": scraped_at}
+            for symbol, version in versions.items()
+        ])
+        self.conn.commit()
+
+    def remove_stocks(self, symbols):
+        """
+        Delete stocks that are no longer listed from dividend_data_table, along
+        with their page versions.
+
+        Args:
+            symbols (iterable): the Symbols to delete.
+        """
+        symbols = list(symbols)
+        if not symbols:
+            return
+        for table_name in ("dividend_data_table", PAGE_VERSION_TABLE):
+            if self.engine.dialect.has_table(self.conn, table_name):
+                placeholders = ", ".join(f":s{i}" for i in range(len(symbols)))
+                self.conn.execute(
+                    text(f"DELETE FROM {self._q(table_name)} WHERE {self._q('Symbol')} IN ({placeholders})"),
+                    {f"s{i}": symbol for i, symbol in enumerate(symbols)}
+                )
+        self.conn.commit()
+
     @staticmethod
     def _safe_param_name(column_name):
         """Convert column name to a safe SQL parameter name."""
@@ -195,33 +782,26 @@ class MysqlConnection:
         for data in ticker_data.values():
             all_columns.update(data.keys())
 
-        existing_columns = {col['name'] for col in inspect(self.engine).get_columns("dividend_data_table")}
+        existing_columns = {col['name'] for col in inspect(self.conn).get_columns("dividend_data_table")}
         for col in all_columns - existing_columns:
-            self.add_column_to_table("dividend_data_table", col)
+            values = [data.get(col) for data in ticker_data.values()]
+            self.add_column_to_table("dividend_data_table", col, self._infer_column_type(col, values))
 
-        # 2. Batch update: one UPDATE per ticker instead of per cell
+        # 2. Drop null/NaN cells; what's left is written in batches
+        updates = {}
         for symbol, data in ticker_data.items():
-            updates = {}
+            row = {}
             for col, val in data.items():
                 if val is None:
                     continue
                 if isinstance(val, (int, float)) and math.isnan(val):
                     continue
-                updates[col] = val
-
-            if not updates:
-                continue
-
-            set_clauses = ", ".join(
-                f"`{col}` = COALESCE(:{self._safe_param_name(col)}, `{col}`)"
-                for col in updates
-            )
-            params = {self._safe_param_name(col): val for col, val in updates.items()}
-            params["symbol"] = symbol
-
-            query = text(f"UPDATE dividend_data_table SET {set_clauses} WHERE Symbol = :symbol")
-            self.conn.execute(query, params)
+                row[col] = val
+            if row:
+                updates[symbol] = row
 
+        if updates:
+            self._apply_enrichment_updates(updates)
         self.conn.commit()
 
     def create_dividend_data_table(self):
@@ -233,56 +813,7 @@ class MysqlConnection:
         """
         dividend_data_table = Table(
             'dividend_data_table', self.meta,
-            Column('Symbol', String(32), primary_key=True),
-            Column('Company', String(255)),
-            Column('Sector', String(255)),
-            Column('No Years', Integer),
-            Column('Price', Float),
-            Column('Div Yield', Float),
-            Column('5Y Avg Yield', Float),
-            Column('Current Div', Float),
-            Column('Payouts/ Year', String(32)),
-            Column('Annualized', Float),
-            Column('Low', Float),
-            Column('High', Float),
-            Column('DGR 1Y', Float),
-            Column('DGR 3Y', Float),
-            Column('DGR 5Y', Float),
-            Column('DGR 10Y', Float),
-            Column('TTR 1Y', Float),
-            Column('TTR 3Y', Float),
-            Column('Fair Value', Float),
-            Column('FV %', Float),
-            Column('Chowder Number', Float),
-            Column('Revenue 1Y', Float),
-            Column('NPM', Float),
-            Column('CF/Share', Float),
-            Column('ROE', Float),
-            Column('Debt/Capital', Float),
-            Column('ROTC', Float),
-            Column('P/E', Float),
-            Column('P/BV', Float),
-            Column('PEG', Float),
-            Column('Industry', String(255)),
-            Column('Market Cap', Float),
-            Column('Payout Ratio', Float),
-            Column('Price Change', String(32)),
-            Column('Price Change %', String(32)),
-            Column('Next Earnings Report', String(64)),
-            Column('Previous Div', String(32)),
-            Column('Ex-date', String(32)),
-            Column('Dividend Pay Date', String(32)),
-            Column('TTR 1Y - With Specials', String(32)),
-            Column('TTR 3Y - With Specials', String(32)),
-            Column('TTR 1Y - No Specials', String(32)),
-            Column('TTR 3Y - No Specials', String(32)),
-            Column('Fair Value (P/E 10)', String(32)),
-            Column('FV (P/E 10) %', String(32)),
-            Column('Fair Value (Peter Lynch)', String(32)),
-            Column('FV (Peter Lynch) %', String(32)),
-            Column('Current R', String(32)),
-            Column('TTR 1Y', String(32)),
-            Column('TTR 3Y', String(32))
+            *(Column(name, col_type, primary_key=(name == 'Symbol')) for name, col_type in COLUMN_TYPES.items())
         )
 
         if not inspect(self.conn).has_table("dividend_data_table"):
@@ -310,12 +841,574 @@ class MysqlConnection:
 
         return tickers
 
+    def get_refresh_candidates(self, freshness_column):
+        """
+        Every stock with its per-row freshness for one source and its market cap,
+        for refresh_planner.plan_refresh.
+
+        Args:
+            freshness_column (str): the source's freshness column, e.g. 'Yahoo Updated'.
+
+        Returns:
+            list: (Symbol, freshness timestamp or None, Market Cap or None) tuples.
+        """
+        if not self.engine.dialect.has_table(self.conn, "dividend_data_table"):
+            return []
+        existing = {col['name'] for col in inspect(self.conn).get_columns("dividend_data_table")}
+        columns = [self._q(col) if col in existing else "NULL" for col in (freshness_column, "Market Cap")]
+        selected = ", ".join([self._q("Symbol")] + columns)
+        rows = self.conn.execute(text(f"SELECT {selected} FROM dividend_data_table")).fetchall()
+        return [tuple(row) for row in rows]
+
     def column_exists(self, table_name, column_name):
         inspector = inspect(self.engine)
         return column_name in [col['name'] for col in inspector.get_columns(table_name)]
 
-    def add_column_to_table(self, table_name, column_name):
-        # Enclose column name with backticks to handle spaces
-        column_name_with_backticks = f"`{column_name}`"
-        self.run_sql_query(f'ALTER TABLE {table_name} ADD COLUMN {column_name_with_backticks} VARCHAR(255);')
+    def add_column_to_table(self, table_name, column_name, column_type=None):
+        """
+        Add a column, typed from COLUMN_TYPES when declared there,
+        else from column_type, else as VARCHAR(255).
+        """
+        ddl_type = self._column_ddl_type(column_name, column_type, default="VARCHAR(255)")
+        self.run_sql_query(f'ALTER TABLE {table_name} ADD COLUMN {self._q(column_name)} {ddl_type};')
+
+    def _column_ddl_type(self, column_name, fallback_type=None, default="TEXT"):
+        """
+        Render the DDL type for a column: the declared type if it has one, else
+        fallback_type (e.g. reflected from the staging table), else default.
+        """
+        column_type = COLUMN_TYPES.get(column_name, fallback_type)
+        if column_type is None:
+            return default
+        if isinstance(column_type, type):
+            column_type = column_type()
+        return column_type.compile(dialect=self.engine.dialect)
+
+    @staticmethod
+    def _infer_column_type(column_name, values):
+        """Declared type if known, Float if every non-null value is numeric, else String(255)."""
+        if column_name in COLUMN_TYPES:
+            return COLUMN_TYPES[column_name]
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+            return Float
+        return String(255)
+
+    @staticmethod
+    def _needs_retype(declared_type, reflected_type):
+        """
+        True when a reflected column can't serve the declared type's index: a
+        numeric column stored as text, or a string column stored as unbounded TEXT.
+        """
+        if isinstance(declared_type, type):
+            declared_type = declared_type()
+        if is_numeric(declared_type):
+            return isinstance(reflected_type, String)
+        if isinstance(declared_type, String):
+            return isinstance(reflected_type, Text)
+        return False
+
+    def apply_schema_spec(self, table_name="dividend_data_table"):
+        """
+        Idempotently bring the published table in line with the declared column
+        types and DIVIDEND_DATA_INDEXES. Safe to call after every publish: only
+        mismatched columns are altered and only missing indexes are created.
+        """
+        inspector = inspect(self.conn)
+        if not inspector.has_table(table_name):
+            return
+
+        reflected = {col['name']: col.get('type') for col in inspector.get_columns(table_name)}
+        for col, declared_type in COLUMN_TYPES.items():
+            if col == 'Symbol' or col not in reflected:
+                continue
+            if self._needs_retype(declared_type, reflected[col]):
+                ddl_type = self._column_ddl_type(col)
+                retype_sql = self._retype_column_sql(table_name, col, ddl_type)
+                if retype_sql is None:
+                    continue
+                logger.info("Retyping %s.%s to %s", table_name, col, ddl_type)
+                try:
+                    self.run_sql_query(retype_sql)
+                except Exception as e:
+                    logger.warning("Could not retype %s.%s: %s", table_name, col, e)
+                    self.conn.rollback()
+
+        existing_indexes = self._existing_index_names(table_name)
+        for index_name, index_cols in DIVIDEND_DATA_INDEXES.items():
+            if index_name in existing_indexes or not all(c in reflected for c in index_cols):
+                continue
+            logger.info("Creating index %s on %s %s", index_name, table_name, index_cols)
+            try:
+                self.run_sql_query(self._create_index_sql(index_name, table_name, index_cols))
+            except Exception as e:
+                # e.g. MySQL 1170 when a retype above failed and left the column TEXT
+                logger.warning("Could not create index %s on %s: %s", index_name, table_name, e)
+                self.conn.rollback()
+
+    def check_filter_query_indexes(self):
+        """
+        EXPLAIN each of CANONICAL_FILTER_QUERIES and report whether it uses its
+        expected index. Logs a warning for every query that does not.
+
+        Returns:
+            dict: query name -> True/False (expected index used or not).
+        """
+        report = {}
+        for query_name, (index_name, query) in CANONICAL_FILTER_QUERIES.items():
+            # The canonical queries are written with MySQL backtick quoting
+            used_keys = self._explain_index_names(query.replace("`", self.IDENTIFIER_QUOTE))
+            report[query_name] = index_name in used_keys
+            if not report[query_name]:
+                logger.warning("Filter query %s does not use %s (used: %s)", query_name, index_name, used_keys)
+        return report
+
+    # ---- dividend_history_table ------------------------------------------
+
+    def create_history_table(self, months_ahead=HISTORY_PARTITION_MONTHS_AHEAD):
+        """
+        Create 'dividend_history_table' if missing: one compact row per
+        (Symbol, snapshot_date). The (Symbol, snapshot_date) primary key makes a
+        symbol's history one contiguous index range scan.
+        """
+        if inspect(self.conn).has_table(HISTORY_TABLE):
+            return
+        value_cols = ", ".join(
+            f"{self._q(col)} {self._column_ddl_type(col)} NULL" for col in HISTORY_COLUMNS
+        )
+        self.run_sql_query(
+            f"CREATE TABLE {self._q(HISTORY_TABLE)} ("
+            f"{self._q('snapshot_date')} DATE NOT NULL, {self._q('Symbol')} VARCHAR(32) NOT NULL, {value_cols}, "
+            f"PRIMARY KEY ({self._q('Symbol')}, {self._q('snapshot_date')})"
+            f"){self._history_table_options()}"
+        )
+        self.ensure_history_partitions(months_ahead)
+
+    def ensure_history_partitions(self, months_ahead=HISTORY_PARTITION_MONTHS_AHEAD):
+        """Partition upkeep; a no-op for engines without table partitioning."""
+        return None
+
+    def write_history_snapshot(self, ticker_data: dict, snapshot_date=None):
+        """
+        Append today's values for every symbol in ticker_data to the history
+        table in one bulk (executemany) insert. Re-running on the same day merges
+        into that day's row, keeping existing values where the new one is null,
+        so the Drip dataset and the later Yahoo enrichment share a row.
+
+        Args:
+            ticker_data (dict): symbol -> {column: value}; only HISTORY_COLUMNS are kept.
+            snapshot_date (date): defaults to today.
+        """
+        if not ticker_data:
+            return
+        self.create_history_table()
+
+        snapshot_date = snapshot_date or date.today()
+        params = {col: self._safe_param_name(col) for col in HISTORY_COLUMNS}
+        rows = []
+        for symbol, data in ticker_data.items():
+            row = {"snapshot_date": snapshot_date, "symbol": symbol}
+            for col, param in params.items():
+                value = data.get(col)
+                if isinstance(value, float) and math.isnan(value):
+                    value = None
+                row[param] = value
+            rows.append(row)
+
+        value_list = ", ".join(f":{param}" for param in params.values())
+        self.conn.execute(text(self._upsert_sql(
+            HISTORY_TABLE, ("snapshot_date", "Symbol") + HISTORY_COLUMNS, ("Symbol", "snapshot_date"),
+            f"VALUES (:snapshot_date, :symbol, {value_list})", coalesce=True
+        )), rows)
+        self.conn.commit()
+
+    def prune_history(self, retention_days):
+        """Enforce the retention policy: delete snapshots older than retention_days."""
+        cutoff = date.today() - timedelta(days=retention_days)
+        self.conn.execute(text(f"DELETE FROM {self._q(HISTORY_TABLE)} WHERE {self._q('snapshot_date')} < :cutoff"),
+                          {"cutoff": cutoff})
+        self.conn.commit()
+
+    def downsample_history(self, after_days):
+        """
+        Downsampling policy: snapshots older than after_days are thinned to one
+        per symbol per week (the last one taken that week).
+        """
+        cutoff = date.today() - timedelta(days=after_days)
+        history, snapshot = self._q(HISTORY_TABLE), self._q('snapshot_date')
+        self.conn.execute(text(
+            f"DELETE FROM {history} WHERE {snapshot} < :cutoff AND EXISTS ("
+            f"SELECT 1 FROM {history} later WHERE later.{self._q('Symbol')} = {history}.{self._q('Symbol')} "
+            f"AND later.{snapshot} < :cutoff AND later.{snapshot} > {history}.{snapshot} "
+            f"AND {self._week_sql(f'later.{snapshot}')} = {self._week_sql(f'{history}.{snapshot}')})"
+        ), {"cutoff": cutoff})
+        self.conn.commit()
+
+    def maintain_history(self, retention_days, downsample_after_days):
+        """Run partition upkeep plus the retention and downsampling policies."""
+        if not inspect(self.conn).has_table(HISTORY_TABLE):
+            return
+        self.ensure_history_partitions()
+        if retention_days:
+            self.prune_history(retention_days)
+        if downsample_after_days:
+            self.downsample_history(downsample_after_days)
+
+    def get_symbol_history(self, symbol, start_date=None, end_date=None):
+        """
+        Return a symbol's snapshots between start_date and end_date (inclusive,
+        both optional) ordered by date, served by a primary-key range scan.
+
+        Returns:
+            list: row mappings with snapshot_date and HISTORY_COLUMNS.
+        """
+        if not inspect(self.conn).has_table(HISTORY_TABLE):
+            return []
+        snapshot = self._q('snapshot_date')
+        clauses = [f"{self._q('Symbol')} = :symbol"]
+        params = {"symbol": symbol}
+        if start_date is not None:
+            clauses.append(f"{snapshot} >= :start_date")
+            params["start_date"] = start_date
+        if end_date is not None:
+            clauses.append(f"{snapshot} <= :end_date")
+            params["end_date"] = end_date
+        col_list = ", ".join(self._q(col) for col in HISTORY_COLUMNS)
+        result = self.conn.execute(text(
+            f"SELECT {snapshot}, {col_list} FROM {self._q(HISTORY_TABLE)} "
+            f"WHERE {' AND '.join(clauses)} ORDER BY {snapshot}"
+        ), params)
+        return [dict(row) for row in result.mappings().fetchall()]
+
+    # ---- summaries and derived fields ------------------------------------
+
+    def refresh_summary_tables(self):
+        """
+        Recompute the materialized per-sector/industry/streak summary tables from
+        dividend_data_table and publish them atomically: each is built in a
+        staging table, then all are swapped in together so readers never see a
+        partial or mixed set.
+        """
+        if not inspect(self.conn).has_table("dividend_data_table"):
+            return
+        present = {col['name'] for col in inspect(self.conn).get_columns("dividend_data_table")}
+        col_list = ", ".join(self._q(col) for col in SUMMARY_SOURCE_COLUMNS if col in present)
+        data_frame = pd.read_sql(text(f"SELECT {col_list} FROM dividend_data_table"), self.conn)
+        summaries = compute_summary_tables(data_frame)
+
+        for table_name, summary in summaries.items():
+            key_columns = SUMMARY_PRIMARY_KEYS[table_name]
+            self._load_keyed_table(self.conn, f"{table_name}_staging", summary, key_columns,
+                                   {col: String(255) for col in key_columns})
+        self._swap_in_tables(self.conn, list(summaries))
+
+    def recompute_derived_fields(self):
+        """
+        Recompute the price-derived columns (see derived_fields.DERIVED_FIELDS)
+        for every row in one set-based UPDATE, so Div Yield, FV % and Chowder
+        Number agree with the freshly enriched Price.
+        """
+        if not inspect(self.conn).has_table("dividend_data_table"):
+            return
+        present = {col['name'] for col in inspect(self.conn).get_columns("dividend_data_table")}
+        missing = required_columns() - present
+        if missing:
+            logger.warning("Skipping derived field recompute; missing columns: %s", sorted(missing))
+            return
+        self.conn.execute(derived_fields_update())
+        self.conn.commit()
+
+
+class MysqlConnection(DatabaseConnection):
+    """MySQL/MariaDB backend (the production store)."""
+
+    IDENTIFIER_QUOTE = '`'
+
+    @staticmethod
+    def _engine_uri(uri_string):
+        # check due to pymsql requiring changes to the URI string that are often forgetten
+        if "pymysql" not in uri_string:
+            uri_string = uri_string.replace("mysql", "mysql+pymysql", 1)
+        return uri_string
+
+    @staticmethod
+    def _engine_kwargs(uri_string):
+        connect_args = {}
+        if "aivencloud.com" in uri_string:
+            connect_args['ssl'] = {'ssl_mode': 'REQUIRED'}
+        return {"connect_args": connect_args, "echo": False}
+
+    def _merge_connection(self):
+        return self.engine.connect()
+
+    def _load_keyed_table(self, conn, table_name, data_frame, key_columns, dtype_map):
+        # to_sql's executemany is rewritten by PyMySQL into multi-row INSERTs
+        data_frame.to_sql(table_name, con=self.engine, if_exists="replace", index=False, dtype=dtype_map)
+        key_list = ", ".join(self._q(c) for c in key_columns)
+        conn.execute(text(f"ALTER TABLE {self._q(table_name)} ADD PRIMARY KEY ({key_list})"))
+
+    def _rename_table_sql(self, old_name, new_name):
+        return f"RENAME TABLE {self._q(old_name)} TO {self._q(new_name)}"
+
+    def _has_primary_key(self, conn, table_name):
+        result = conn.execute(text(f"SHOW KEYS FROM {self._q(table_name)} WHERE Key_name = 'PRIMARY'"))
+        return bool(result.fetchone())
+
+    def _upsert_sql(self, table_name, columns, key_columns, rows_sql, coalesce=False):
+        col_list = ", ".join(self._q(c) for c in columns)
+        assignments = []
+        for c in columns:
+            if c in key_columns:
+                continue
+            new_value = f"VALUES({self._q(c)})"
+            if coalesce:
+                new_value = f"COALESCE({new_value}, {self._q(c)})"
+            assignments.append(f"{self._q(c)} = {new_value}")
+        if not assignments:
+            assignments = [f"{self._q(key_columns[0])} = {self._q(key_columns[0])}"]
+        return (f"INSERT INTO {self._q(table_name)} ({col_list}) {rows_sql} "
+                f"ON DUPLICATE KEY UPDATE {', '.join(assignments)}")
+
+    def _delete_missing_sql(self, table_name, staging_table):
+        return (f"DELETE m FROM {self._q(table_name)} m "
+                f"LEFT JOIN {self._q(staging_table)} s ON m.Symbol = s.Symbol "
+                f"WHERE s.Symbol IS NULL")
+
+    def _retype_column_sql(self, table_name, column_name, ddl_type):
+        return f"ALTER TABLE {self._q(table_name)} MODIFY COLUMN {self._q(column_name)} {ddl_type}"
+
+    def _existing_index_names(self, table_name):
+        return {index['name'] for index in inspect(self.engine).get_indexes(table_name)}
+
+    def _create_index_sql(self, index_name, table_name, columns):
+        col_list = ", ".join(self._q(c) for c in columns)
+        return f"CREATE INDEX {self._q(index_name)} ON {self._q(table_name)} ({col_list})"
+
+    def _explain_index_names(self, query):
+        rows = self.conn.execute(text(f"EXPLAIN {query}")).mappings().fetchall()
+        return {row.get('key') for row in rows}
+
+    # History: monthly RANGE partitions on snapshot_date, so retention drops
+    # whole partitions and range queries prune to the months they cover.
+
+    def _history_table_options(self):
+        return f" PARTITION BY RANGE COLUMNS({self._q('snapshot_date')}) (PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+
+    @staticmethod
+    def _history_partition_name(month_start):
+        return f"p{month_start:%Y%m}"
+
+    @staticmethod
+    def _next_month(month_start):
+        return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def _history_partitions(self):
+        """Return {partition_name: upper_bound_expression} for the history table."""
+        rows = self.conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL"
+        ), {"table": HISTORY_TABLE}).fetchall()
+        return dict(rows)
+
+    def ensure_history_partitions(self, months_ahead=HISTORY_PARTITION_MONTHS_AHEAD):
+        """
+        Split p_future so that monthly partitions exist for the current month and
+        the next months_ahead months. Idempotent; only missing months are added.
+        """
+        existing = self._history_partitions()
+        month = date.today().replace(day=1)
+        new_partitions = []
+        for _ in range(months_ahead + 1):
+            next_month = self._next_month(month)
+            name = self._history_partition_name(month)
+            if name not in existing:
+                new_partitions.append(f"PARTITION {name} VALUES LESS THAN ('{next_month.isoformat()}')")
+            month = next_month
+        if not new_partitions:
+            return
+        new_partitions.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        self.run_sql_query(
+            f"ALTER TABLE `{HISTORY_TABLE}` REORGANIZE PARTITION p_future INTO ({', '.join(new_partitions)})"
+        )
+
+    def prune_history(self, retention_days):
+        """
+        Enforce the retention policy: drop every monthly partition that ends on
+        or before the cutoff (instant, no row-by-row delete), then delete the
+        few remaining rows older than the cutoff from the boundary partition.
+        """
+        cutoff = date.today() - timedelta(days=retention_days)
+        expired = []
+        for name, upper_bound in self._history_partitions().items():
+            if name == "p_future" or not upper_bound:
+                continue
+            if upper_bound.strip("'") <= cutoff.isoformat():
+                expired.append(name)
+        if expired:
+            logger.info("Dropping expired history partitions: %s", expired)
+            self.run_sql_query(f"ALTER TABLE `{HISTORY_TABLE}` DROP PARTITION {', '.join(expired)}")
+        super().prune_history(retention_days)
+
+    def downsample_history(self, after_days):
+        # MySQL can't reference the DELETE target in a subquery, so join instead
+        cutoff = date.today() - timedelta(days=after_days)
+        self.conn.execute(text(
+            f"DELETE h FROM `{HISTORY_TABLE}` h "
+            f"JOIN (SELECT `Symbol`, YEARWEEK(`snapshot_date`, 3) AS wk, MAX(`snapshot_date`) AS keep_date "
+            f"FROM `{HISTORY_TABLE}` WHERE `snapshot_date` < :cutoff GROUP BY `Symbol`, wk) k "
+            f"ON h.`Symbol` = k.`Symbol` AND YEARWEEK(h.`snapshot_date`, 3) = k.wk "
+            f"WHERE h.`snapshot_date` < :cutoff AND h.`snapshot_date` <> k.keep_date"
+        ), {"cutoff": cutoff})
+        self.conn.commit()
+
+    def _swap_in_tables(self, conn, table_names):
+        # MySQL DDL auto-commits, but a single multi-table RENAME is atomic
+        renames = []
+        stale_tables = []
+        for table_name in table_names:
+            if inspect(conn).has_table(table_name):
+                renames.append(f"`{table_name}` TO `{table_name}_old`")
+                stale_tables.append(f"`{table_name}_old`")
+            renames.append(f"`{table_name}_staging` TO `{table_name}`")
+        if stale_tables:
+            # A refresh that died between the RENAME and the DROP leaves its _old tables behind
+            self.run_sql_query(f"DROP TABLE IF EXISTS {', '.join(stale_tables)}")
+        self.run_sql_query(f"RENAME TABLE {', '.join(renames)}")
+        if stale_tables:
+            self.run_sql_query(f"DROP TABLE {', '.join(stale_tables)}")
+
+
+class SqliteConnection(DatabaseConnection):
+    """
+    Embedded SQLite backend (staging, benchmarks, edge caches). The portable
+    base implementation is SQLite's dialect; only engine setup differs.
+    """
+
+    @staticmethod
+    def _engine_kwargs(uri_string):
+        kwargs = {"echo": False}
+        if uri_string.rstrip("/") in ("sqlite:", "sqlite:/", "sqlite://") or ":memory:" in uri_string:
+            # Share the single in-memory database across every connection
+            kwargs.update(poolclass=StaticPool, connect_args={"check_same_thread": False})
+        return kwargs
+
+
+class DuckdbConnection(DatabaseConnection):
+    """
+    Embedded DuckDB backend. Requires the optional duckdb and duckdb_engine
+    packages. Bulk loads go through DuckDB's zero-copy DataFrame scan.
+    """
+
+    @staticmethod
+    def _engine_kwargs(uri_string):
+        try:
+            import duckdb_engine  # noqa: F401
+        except ImportError as e:
+            raise ImportError("duckdb:// URIs require the duckdb and duckdb_engine packages") from e
+        return {"echo": False}
+
+    def _register_frame(self, conn, view_name, data_frame):
+        conn.connection.dbapi_connection.register(view_name, data_frame)
+
+    def _unregister_frame(self, conn, view_name):
+        conn.connection.dbapi_connection.unregister(view_name)
+
+    def _load_keyed_table(self, conn, table_name, data_frame, key_columns, dtype_map):
+        conn.execute(text(f"DROP TABLE IF EXISTS {self._q(table_name)}"))
+        column_types = {col: dtype_map.get(col) or self._frame_column_type(data_frame[col])
+                        for col in data_frame.columns}
+        self._keyed_table(table_name, column_types, key_columns).create(conn)
+        if data_frame.empty:
+            return
+        view_name = f"{table_name}_frame"
+        col_list = ", ".join(self._q(c) for c in data_frame.columns)
+        self._register_frame(conn, view_name, data_frame)
+        try:
+            conn.execute(text(f"INSERT INTO {self._q(table_name)} ({col_list}) SELECT {col_list} FROM {view_name}"))
+        finally:
+            self._unregister_frame(conn, view_name)
+
+    def _has_primary_key(self, conn, table_name):
+        return conn.execute(text(
+            "SELECT 1 FROM duckdb_constraints() WHERE table_name = :table AND constraint_type = 'PRIMARY KEY'"
+        ), {"table": table_name}).fetchone() is not None
+
+    def _retype_column_sql(self, table_name, column_name, ddl_type):
+        return f"ALTER TABLE {self._q(table_name)} ALTER COLUMN {self._q(column_name)} TYPE {ddl_type}"
+
+    def _existing_index_names(self, table_name):
+        rows = self.conn.execute(text("SELECT index_name FROM duckdb_indexes() WHERE table_name = :table"),
+                                 {"table": table_name}).fetchall()
+        return {row[0] for row in rows}
+
+    def _explain_index_names(self, query):
+        plan = " ".join(str(row[-1]) for row in self.conn.execute(text(f"EXPLAIN {query}")).fetchall())
+        return {name for name in DIVIDEND_DATA_INDEXES if name in plan}
+
+    def _week_sql(self, date_sql):
+        return f"strftime({date_sql}, '%G-%V')"
+
+    def _apply_enrichment_updates(self, updates):
+        # One UPDATE ... FROM over a registered DataFrame instead of a row per symbol
+        frame = pd.DataFrame.from_dict(updates, orient='index')
+        frame.index.name = 'Symbol'
+        frame = frame.reset_index()
+        view_name = "dividend_enrichment_frame"
+        set_clauses = ", ".join(
+            f"{self._q(col)} = COALESCE(u.{self._q(col)}, dividend_data_table.{self._q(col)})"
+            for col in frame.columns if col != 'Symbol'
+        )
+        self._register_frame(self.conn, view_name, frame)
+        try:
+            self.conn.execute(text(
+                f"UPDATE dividend_data_table SET {set_clauses} FROM {view_name} u "
+                f"WHERE dividend_data_table.{self._q('Symbol')} = u.{self._q('Symbol')}"
+            ))
+        finally:
+            self._unregister_frame(self.conn, view_name)
+
+
+class ScrapeCheckpoint:
+    """
+    The progress of one full scrape, kept in the database so a crashed or
+    redeployed updater can resume it: DripInvestingScraper.scrape_all_data
+    loads the stocks already parsed for this dataset version, fetches only the
+    missing ones, and saves new ones in batches as it goes.
+
+    With a writer (a started db_writer.BatchedWriter whose write_batch saves to
+    this dataset_version's checkpoint), save() only queues the records and the
+    scrape doesn't wait on the DB; load() flushes the writer first, so records
+    saved earlier in the same process (like the canary sample) are read back.
+    """
+
+    def __init__(self, connection: DatabaseConnection, dataset_version: str, writer=None):
+        self.connection = connection
+        self.dataset_version = dataset_version
+        self.writer = writer
+
+    def load(self) -> dict:
+        if self.writer is not None:
+            self.writer.flush()
+        return self.connection.load_scrape_checkpoint(self.dataset_version)
+
+    def save(self, records: list):
+        if self.writer is not None:
+            self.writer.submit_many(records)
+            return
+        self.connection.save_scrape_checkpoint(self.dataset_version, records)
+
+    def clear(self):
+        self.connection.clear_scrape_checkpoint()
+
 
+def connect_database(uri_string: str) -> DatabaseConnection:
+    """
+    Open the storage backend matching the URI's scheme: sqlite:// and
+    duckdb:// get the embedded backends, anything else is treated as MySQL.
+    """
+    scheme = (uri_string or "").split(":", 1)[0].split("+", 1)[0].lower()
+    if scheme == "sqlite":
+        return SqliteConnection(uri_string)
+    if scheme == "duckdb":
+        return DuckdbConnection(uri_string)
+    return MysqlConnection(uri_string)
@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# How often a producer blocked on a full queue checks the writer thread is still running,
+# and the writer checks for a flush() or stop_event while a batch fills
+_POLL_SECONDS = 0.5
+_CLOSE = object()
+
+
+class WriterClosed(Exception):
+    """Raised by BatchedWriter.submit once the writer has been closed."""
+
+
+class BatchedWriter:
+    """
+    Background DB writer: producers submit() items to a bounded queue and carry on
+    with their network work while one thread takes them off in batches and hands
+    each batch to write_batch, which writes and commits it in one go.
+
+    A batch is written once batch_size items are waiting or flush_seconds after
+    its first item arrived, whichever comes first. Items with the same key() in a
+    batch are coalesced, the last one winning. A full queue blocks submit(), so
+    producers slow down to the speed the DB takes the writes at. Once stop_event
+    is set, or while someone waits in flush(), the writer stops waiting for
+    batches to fill and writes what's queued straight away; close() returns after
+    everything submitted is written.
+
+    write_batch runs on the writer thread, so it must use a DB connection nobody
+    else uses. A batch that fails to write is logged and dropped.
+    """
+
+    def __init__(self, write_batch, batch_size=500, flush_seconds=2.0, queue_size=5000, key=None,
+                 stop_event=None, name="db-writer"):
+        """
+        :param write_batch: callable taking a list of items, writing and committing them
+        :param batch_size: most items per write_batch call
+        :param flush_seconds: longest an item waits for its batch to fill
+        :param queue_size: most items waiting to be written before submit() blocks
+        :param key: optional callable; items with equal keys in one batch are coalesced
+        :param stop_event: threading.Event signalling shutdown; queued items are then written immediately
+        :param name: the writer thread's name, for logs
+        """
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.key = key
+        self.stop_event = stop_event or threading.Event()
+        self.name = name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = 0
+        self._flushing = 0
+        self._idle = threading.Condition()
+        self._closed = False
+        self._thread = None
+        self.batches = 0
+        self.written = 0
+        self.failed = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, item):
+        """Queue item for writing, blocking while the queue is full."""
+        if self._closed:
+            raise WriterClosed(f"{self.name} is closed")
+        with self._idle:
+            self._pending += 1
+        while True:
+            try:
+                self._queue.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                if not self._thread.is_alive():
+                    with self._idle:
+                        self._pending -= 1
+                    raise WriterClosed(f"{self.name} stopped")
+
+    def submit_many(self, items):
+        for item in items:
+            self.submit(item)
+
+    def flush(self, timeout=None):
+        """
+        Write everything submitted so far without waiting for batches to fill, and
+        wait until it has been written (or failed to be); False on timeout.
+        """
+        with self._idle:
+            self._flushing += 1
+            try:
+                return self._idle.wait_for(lambda: self._pending == 0, timeout)
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=None):
+        """Write whatever is still queued, then stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+        if self.batches:
+            logger.info("%s wrote %s items in %s batches (%s failed)", self.name, self.written, self.batches,
+                        self.failed)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _next_batch(self):
+        """The next batch to write and whether the writer was closed; waits for its first item."""
+        batch = []
+        flush_at = None
+        while len(batch) < self.batch_size:
+            if not batch:
+                timeout = _POLL_SECONDS
+            elif self.stop_event.is_set() or self._flushing:
+                timeout = 0
+            else:
+                # Capped so a flush() or stop_event arriving meanwhile is noticed promptly
+                timeout = min(flush_at - time.monotonic(), _POLL_SECONDS)
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                if batch and (timeout <= 0 or time.monotonic() >= flush_at):
+                    break
+                continue
+            if item is _CLOSE:
+                return batch, True
+            batch.append(item)
+            if flush_at is None:
+                flush_at = time.monotonic() + self.flush_seconds
+        return batch, False
+
+    def _coalesce(self, batch):
+        if self.key is None:
+            return batch
+        return list({self.key(item): item for item in batch}.values())
+
+    def _write(self, batch):
+        items = self._coalesce(batch)
+        try:
+            self.write_batch(items)
+            self.written += len(items)
+        except Exception as e:
+            self.failed += len(items)
+            logger.warning("%s could not write %s items: %s", self.name, len(items), e)
+        finally:
+            self.batches += 1
+            with self._idle:
+                self._pending -= len(batch)
+                self._idle.notify_all()
+
+    def _run(self):
+        closed = False
+        while not closed:
+            batch, closed = self._next_batch()
+            if batch:
+                self._write(batch)
@@ -0,0 +1,80 @@
+import time
+
+
+class DeadlineExceeded(Exception):
+    """Raised by Deadline.check when a stage has run out of time."""
+
+
+class Deadline:
+    """
+    Point in (monotonic) time by which a cycle, or one stage of it, has to be done.
+
+    The runner creates one per cycle and passes it down to the scraper, the Yahoo
+    fetch and the DB writes. Each stage caps its request timeouts with timeout(),
+    stops starting new work once expired(), and keeps what it already has instead
+    of being killed mid-write. Deadline(None) never expires, which is what every
+    stage defaults to, so callers that don't care about time budgets are unaffected.
+
+    A deadline can also carry a cancel event (the runner's shutdown event): once
+    it is set the deadline counts as expired, so SIGTERM stops every stage the
+    same cooperative way running out of time does.
+    """
+
+    def __init__(self, seconds=None, clock=time.monotonic, cancel_event=None):
+        """
+        :param seconds: time budget from now, None (or 0) for no limit
+        :param clock: monotonic clock, injectable for tests
+        :param cancel_event: optional threading.Event that expires the deadline early when set
+        """
+        self._clock = clock
+        self._expires_at = clock() + seconds if seconds else None
+        self.cancel_event = cancel_event
+
+    def cancelled(self):
+        """True once the cancel event is set (shutdown requested), as opposed to running out of time."""
+        return self.cancel_event is not None and self.cancel_event.is_set()
+
+    def remaining(self):
+        """Seconds left, never negative; infinite without a limit, zero once cancelled."""
+        if self.cancelled():
+            return 0.0
+        if self._expires_at is None:
+            return float("inf")
+        return max(0.0, self._expires_at - self._clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if the deadline has passed (naming the stage that noticed)."""
+        if self.cancelled():
+            raise DeadlineExceeded(f"shutdown requested during {stage}")
+        if self.expired():
+            raise DeadlineExceeded(f"time budget exhausted during {stage}")
+
+    def timeout(self, default, attempts=1, minimum=1.0):
+        """
+        Per-request timeout so `attempts` tries (the first plus retries) still fit in
+        what's left: `default` while there's plenty of time, less near the end.
+
+        :param default: the timeout to use when time isn't short
+        :param attempts: how many times the request may be tried in total
+        :param minimum: floor, so a nearly expired deadline doesn't produce a zero timeout
+        """
+        return max(minimum, min(default, self.remaining() / attempts))
+
+    def reserve(self, seconds):
+        """
+        Child deadline ending `seconds` earlier, leaving that much of this one for
+        the stages after it (e.g. the scrape stops in time for the DB publish).
+        """
+        child = Deadline(clock=self._clock, cancel_event=self.cancel_event)
+        if self._expires_at is not None:
+            child._expires_at = self._expires_at - seconds
+        return child
+
+    def __repr__(self):
+        if self.cancelled():
+            return "<Deadline cancelled>"
+        remaining = self.remaining()
+        return "<Deadline unlimited>" if remaining == float("inf") else f"<Deadline {remaining:.1f}s left>"
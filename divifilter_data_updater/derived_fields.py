@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from sqlalchemy import column, func, table, update
+
+from divifilter_data_updater.lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+# Price-derived columns, recomputed after Yahoo enrichment refreshes Price.
+# Each formula is written once against an "ops" object and evaluated either as
+# a set-based SQL UPDATE (_SqlOps) or vectorized over a DataFrame (_FrameOps).
+# Order matters: a formula may use a column derived earlier in the tuple.
+DERIVED_FIELDS = (
+    # Forward yield in percent from the annualized dividend
+    ("Div Yield", lambda ops: ops.div(ops.col("Annualized"), ops.col("Price")) * 100),
+    # Premium (+) or discount (-) of the price to fair value, in percent
+    ("FV %", lambda ops: (ops.div(ops.col("Price"), ops.col("Fair Value")) - 1) * 100),
+    ("Chowder Number", lambda ops: ops.col("Div Yield") + ops.col("DGR 5Y")),
+)
+
+DERIVED_FIELDS_DECIMALS = 2
+
+
+class _SqlOps:
+    """Evaluate formulas to SQL expressions; earlier derived columns are inlined."""
+
+    def __init__(self):
+        self.assigned = {}
+
+    def col(self, name):
+        return self.assigned.get(name, column(name))
+
+    @staticmethod
+    def div(numerator, denominator):
+        # NULLIF keeps strict-mode MySQL from erroring on a zero price/fair value
+        return numerator / func.nullif(denominator, 0)
+
+    def finish(self, name, expression):
+        self.assigned[name] = func.coalesce(func.round(expression, DERIVED_FIELDS_DECIMALS), column(name))
+        return self.assigned[name]
+
+
+class _ColumnRecorder:
+    """Evaluate formulas with dummy values, only recording the columns they read."""
+
+    def __init__(self):
+        self.names = set()
+
+    def col(self, name):
+        self.names.add(name)
+        return 0
+
+    @staticmethod
+    def div(numerator, denominator):
+        return 0
+
+
+class _FrameOps:
+    """Evaluate formulas column-wise over a DataFrame, updating it as it goes."""
+
+    def __init__(self, data_frame):
+        self.data_frame = data_frame
+
+    def col(self, name):
+        return pd.to_numeric(self.data_frame[name], errors="coerce").astype("float64")
+
+    @staticmethod
+    def div(numerator, denominator):
+        return numerator / denominator.where(denominator != 0)
+
+    def finish(self, name, expression):
+        self.data_frame[name] = expression.round(DERIVED_FIELDS_DECIMALS).fillna(self.col(name))
+        return self.data_frame[name]
+
+
+def required_columns():
+    """Every column the derived-field formulas read or write."""
+    recorder = _ColumnRecorder()
+    for name, formula in DERIVED_FIELDS:
+        recorder.names.add(name)
+        formula(recorder)
+    return recorder.names
+
+
+def apply_derived_fields(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Recompute DERIVED_FIELDS in place over a DataFrame. Rows whose inputs are
+    missing (or whose divisor is zero) keep their current value.
+
+    :param data_frame: dividend data with at least required_columns()
+
+    :return data_frame: the same dataframe with derived columns refreshed
+    """
+    ops = _FrameOps(data_frame)
+    for name, formula in DERIVED_FIELDS:
+        ops.finish(name, formula(ops))
+    return data_frame
+
+
+def derived_fields_update(table_name="dividend_data_table"):
+    """
+    Build the single set-based UPDATE that recomputes DERIVED_FIELDS for every
+    row, with the same keep-current-value-on-null semantics as apply_derived_fields.
+    """
+    ops = _SqlOps()
+    target = table(table_name, *(column(name) for name in sorted(required_columns())))
+    assignments = [(target.c[name], ops.finish(name, formula(ops))) for name, formula in DERIVED_FIELDS]
+    return update(target).ordered_values(*assignments)
@@ -1,36 +1,100 @@
+import functools
 import logging
+import os
 import signal
 import threading
 import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
-from divifilter_data_updater.drip_investing_scraper import DripInvestingScraper
+from divifilter_data_updater.change_detection import detect_changes, removal_looks_safe
+from divifilter_data_updater.changefeed import diff_rows, open_sink
+from divifilter_data_updater.circuit_breaker import SymbolCircuitBreaker
 from divifilter_data_updater.configure import read_configurations
-from divifilter_data_updater.helper_functions import (
-    remove_unneeded_columns,
-    radar_dict_to_table,
-    get_current_datetime_string,
-    random_delay,
-    validate_radar_data,
-)
-from divifilter_data_updater.db_functions import MysqlConnection
-from divifilter_data_updater.yahoo_finance import (
-    get_yahoo_finance_data_for_tickers_list,
-    disable_yahoo_logs,
-)
+from divifilter_data_updater.db_writer import BatchedWriter
+from divifilter_data_updater.deadline import Deadline, DeadlineExceeded
+from divifilter_data_updater.hedging import HedgePolicy
+from divifilter_data_updater.journal import Journal
 from divifilter_data_updater.health import write_heartbeat
+from divifilter_data_updater.lazy_imports import LazyModule, lazy_callable
+from divifilter_data_updater.market_calendar import MarketCalendar
+from divifilter_data_updater.refresh_planner import FRESHNESS_FORMAT, plan_refresh
+from divifilter_data_updater.scheduler import ScheduledJob, Scheduler
+
+# The scraper (requests, bs4), the DB layer (SQLAlchemy, numpy) and Yahoo (yfinance,
+# pandas) are imported on first use, so a restart reads its config and writes the
+# heartbeat without paying for them, and yfinance only loads if Yahoo is enabled.
+DripInvestingScraper = lazy_callable("divifilter_data_updater.drip_investing_scraper", "DripInvestingScraper")
+connect_database = lazy_callable("divifilter_data_updater.db_functions", "connect_database")
+ScrapeCheckpoint = lazy_callable("divifilter_data_updater.db_functions", "ScrapeCheckpoint")
+canary_problems = lazy_callable("divifilter_data_updater.canary", "canary_problems")
+field_coverage = lazy_callable("divifilter_data_updater.canary", "field_coverage")
+schema = LazyModule("divifilter_data_updater.schema")
+clean_numeric_records = lazy_callable("divifilter_data_updater.helper_functions", "clean_numeric_records")
+remove_unneeded_columns = lazy_callable("divifilter_data_updater.helper_functions", "remove_unneeded_columns")
+get_current_datetime_string = lazy_callable("divifilter_data_updater.helper_functions", "get_current_datetime_string")
+random_delay = lazy_callable("divifilter_data_updater.helper_functions", "random_delay")
+validate_radar_data = lazy_callable("divifilter_data_updater.helper_functions", "validate_radar_data")
+get_yahoo_finance_data_for_tickers_list = lazy_callable("divifilter_data_updater.yahoo_finance",
+                                                        "get_yahoo_finance_data_for_tickers_list")
+disable_yahoo_logs = lazy_callable("divifilter_data_updater.yahoo_finance", "disable_yahoo_logs")
 
 logger = logging.getLogger(__name__)
 
-# Set when SIGTERM/SIGINT is received so the loop finishes the current cycle and
-# exits cleanly instead of being SIGKILLed mid-update.
+# Set when SIGTERM/SIGINT is received. Every stage gets it through its Deadline, so
+# queued scrape work is cancelled, in-flight requests stop retrying and unpublished
+# work is discarded, letting the process exit within the orchestrator's grace period
+# instead of being SIGKILLed mid-update.
 _stop_event = threading.Event()
+# time.monotonic() of the first shutdown signal, for logging the shutdown latency
+_shutdown_requested_at = None
+
+# Held while writing the scraped dataset or Yahoo enrichment to dividend_data_table,
+# so the concurrently scheduled jobs never interleave their merges.
+_merge_lock = threading.Lock()
+
+# Set once the canonical filter queries have been EXPLAINed (see _check_filter_indexes_once)
+_filter_indexes_checked = threading.Event()
+
+# Write-ahead journals by journal_dir, shared by the scheduled jobs (see _journal)
+_journals = {}
+_journals_lock = threading.Lock()
+# Held across a journal replay and every journaled write, so a new write never
+# overtakes an older entry (nor two jobs replay the same ones)
+_journal_lock = threading.RLock()
+JOURNAL_FILE = "updates.journal"
+
+# How often the scheduler re-checks its jobs and refreshes the heartbeat
+SCHEDULER_HEARTBEAT_SECONDS = 60
+
+# Part of a cycle's time budget kept back from the scrape and the Yahoo fetch so
+# what they collected can still be written to the DB before the deadline
+DB_WRITE_RESERVE_SECONDS = 60
+
+# Scraped columns the DB doesn't keep
+UNNEEDED_COLUMNS = ["FV", "None", None, "Ex-Date", "Pay-Date", "Website", "EPS 1Y"]
 
 
 def _request_shutdown(signum, _frame):
-    logger.info("Received signal %s; will shut down after the current cycle", signum)
+    global _shutdown_requested_at
+    logger.info("Received signal %s; cancelling in-flight work and shutting down", signum)
+    if _shutdown_requested_at is None:
+        _shutdown_requested_at = time.monotonic()
     _stop_event.set()
 
 
+def _cycle_deadline(configuration):
+    """Deadline for one cycle (or scheduled run): its time budget, cut short by a shutdown."""
+    return Deadline(configuration["cycle_time_budget_seconds"], cancel_event=_stop_event)
+
+
+def _log_shutdown_latency():
+    if _shutdown_requested_at is None:
+        logger.info("Shutdown requested, exiting.")
+    else:
+        logger.info("Shutdown requested, exiting %.1fs after the signal.", time.monotonic() - _shutdown_requested_at)
+
+
 def _fmt_age(seconds):
     """Render an age-in-seconds value for logging, tolerating None/non-numeric."""
     if not isinstance(seconds, (int, float)):
@@ -40,7 +104,7 @@ def _fmt_age(seconds):
 
 def _connect_with_retry(mysql_uri, max_attempts=5, base_delay=1, max_delay=30):
     """
-    Acquire a MysqlConnection, retrying with bounded exponential backoff so a
+    Acquire a database connection (see connect_database), retrying with bounded exponential backoff so a
     transient DB outage at connect time doesn't crash the whole process.
 
     Raises the last exception if every attempt fails.
@@ -48,18 +112,670 @@ def _connect_with_retry(mysql_uri, max_attempts=5, base_delay=1, max_delay=30):
     attempt = 1
     while True:
         try:
-            return MysqlConnection(mysql_uri)
+            return connect_database(mysql_uri)
         except Exception as e:
             if attempt >= max_attempts:
                 raise
             delay = min(base_delay * (2 ** (attempt - 1)), max_delay)
             logger.warning("Database connection attempt %s/%s failed: %s; retrying in %ss",
                            attempt, max_attempts, e, delay)
-            time.sleep(delay)
+            if _stop_event.wait(delay):
+                raise
             attempt += 1
 
 
-def init():
+def _utc_now():
+    # Naive UTC, like the per-row freshness timestamps
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _changefeed_snapshot(configuration, mysql_connection, symbols):
+    """
+    The rows a write is about to touch (None for the whole table), for
+    _emit_changes to diff against; None when the change feed is off or the
+    rows couldn't be read.
+    """
+    if configuration["changefeed_enabled"] is not True:
+        return None
+    try:
+        return mysql_connection.get_data_rows(symbols)
+    except Exception as e:
+        logger.warning("Could not snapshot rows for the change feed; this write won't be in it: %s", e)
+        mysql_connection.conn.rollback()
+        return None
+
+
+def _emit_changes(configuration, mysql_connection, source, before, symbols):
+    """
+    Diff the rows snapshotted by _changefeed_snapshot against what's in the table
+    now and publish the changes as the next change feed version: into the
+    changelog table, then to the changefeed_sink if one is set. A failing sink
+    only logs; the changelog table is the feed of record.
+    """
+    if before is None:
+        return
+    try:
+        entries = mysql_connection.append_changelog(source, diff_rows(before, mysql_connection.get_data_rows(symbols)),
+                                                    _utc_now().strftime(FRESHNESS_FORMAT))
+        if entries:
+            mysql_connection.prune_changelog(configuration["changefeed_keep_versions"])
+    except Exception as e:
+        logger.warning("Could not record the %s changes in the change feed: %s", source, e)
+        mysql_connection.conn.rollback()
+        return
+    if not entries:
+        return
+    logger.info("Change feed version %s: %s changed cells from %s.", entries[0]["version"], len(entries), source)
+    sink = open_sink(configuration["changefeed_sink"])
+    if sink is not None:
+        try:
+            sink.emit(entries)
+        except OSError as e:
+            logger.warning("Could not send change feed version %s to %s: %s", entries[0]["version"],
+                           configuration["changefeed_sink"], e)
+
+
+def _journal(configuration):
+    """The write-ahead Journal in journal_dir; None when journaling is off or the directory isn't usable."""
+    journal_dir = configuration["journal_dir"]
+    if not journal_dir:
+        return None
+    with _journals_lock:
+        if journal_dir not in _journals:
+            try:
+                _journals[journal_dir] = Journal(os.path.join(journal_dir, JOURNAL_FILE))
+            except OSError as e:
+                logger.warning("Could not open the journal in %s, writing without it: %s", journal_dir, e)
+                return None
+        return _journals[journal_dir]
+
+
+def _journaled(configuration, mysql_connection, kind, make_payload, write):
+    """
+    Run write(committed) with make_payload() appended to the journal first, so if
+    the DB write fails the data stays on disk for _replay_journal; write calls
+    committed() as soon as its data is in, acknowledging the entry before any
+    post-publish maintenance. Older pending entries are replayed first, all under
+    _journal_lock; if they still can't be written this write only goes to the
+    journal, queued behind them, so an older entry never overwrites it later.
+    A journal that can't be written to only costs that protection.
+    """
+    journal = _journal(configuration)
+    with _journal_lock:
+        entry_id = None
+        if journal is not None:
+            caught_up = _replay_journal(configuration, mysql_connection)
+            try:
+                entry_id = journal.append(kind, make_payload())
+            except OSError as e:
+                logger.warning("Could not journal the %s write: %s", kind, e)
+            else:
+                if not caught_up:
+                    logger.warning("Older journaled writes are still pending; the %s write is queued behind them.",
+                                   kind)
+                    return
+        committed = functools.partial(journal.ack, entry_id) if entry_id is not None else lambda: None
+        try:
+            write(committed)
+        except Exception:
+            if entry_id is not None:
+                journal.fail(entry_id)
+            raise
+        committed()
+
+
+def _replay_journal(configuration, mysql_connection):
+    """
+    Write journaled scrapes and Yahoo refreshes whose DB write never completed,
+    oldest first, before anything new is written. Runs on every fresh connection
+    and before every journaled write, under _journal_lock; a failure leaves the
+    remaining entries for the next try, and an entry that failed
+    journal_max_attempts times is moved to the journal's .failed file.
+
+    :return caught_up: True if no entry is left pending
+    """
+    journal = _journal(configuration)
+    if journal is None:
+        return True
+    with _journal_lock:
+        if not journal.pending():
+            return True
+        logger.info("Replaying %s journaled writes.", len(journal.pending()))
+        try:
+            journal.replay({
+                "drip_scrape": lambda payload, committed: _write_scrape(
+                    configuration, mysql_connection, payload["records"], payload["version"], payload["complete"],
+                    committed),
+                "yahoo": lambda payload, committed: _write_yahoo(
+                    configuration, mysql_connection,
+                    (datetime.fromisoformat(payload["queried_at"]), payload["tickers"]), committed),
+            }, max_attempts=configuration["journal_max_attempts"])
+        except Exception as e:
+            logger.warning("Journal replay failed, will retry on the next connection: %s", e)
+            mysql_connection.conn.rollback()
+        return not journal.pending()
+
+
+def _publish_scrape(configuration, mysql_connection, radar_dict, current_version, complete):
+    """
+    Write scraped stocks to the DB, journaled (see _journaled) so a DB outage
+    doesn't cost the scrape.
+    """
+    _journaled(configuration, mysql_connection, "drip_scrape",
+               lambda: {"records": {symbol: dict(record) for symbol, record in radar_dict.items()},
+                        "version": current_version, "complete": complete},
+               lambda committed: _write_scrape(configuration, mysql_connection, radar_dict, current_version,
+                                               complete, committed))
+
+
+def _write_scrape(configuration, mysql_connection, radar_dict, current_version, complete, committed=None):
+    """
+    Write scraped stocks to the DB under _merge_lock. A complete scrape replaces the
+    dataset and records its version; a partial one (cut short by the time budget)
+    is only upserted, so stocks it didn't reach keep their previous data and the
+    next cycle scrapes again. Each written row gets its 'Drip Updated' time.
+    committed, if given, is called once the data (and version) are in, before the
+    best-effort maintenance that follows.
+    """
+    scraped_at = _utc_now().strftime(FRESHNESS_FORMAT)
+    for record in radar_dict.values():
+        record["Drip Updated"] = scraped_at
+    with _merge_lock:
+        # Write the records straight to the DB (no dataframe needed); an incremental
+        # scrape that only removed delisted stocks has nothing to write
+        if radar_dict:
+            # A complete scrape can change (and drop) any row
+            changed_symbols = None if complete else list(radar_dict)
+            before = _changefeed_snapshot(configuration, mysql_connection, changed_symbols)
+            mysql_connection.update_data_table_from_records(list(radar_dict.values()), prune=complete)
+            _emit_changes(configuration, mysql_connection, "drip_scrape", before, changed_symbols)
+
+        if complete:
+            # The dataset is in: record its version before any maintenance that
+            # could fail, so a maintenance error never forces a full re-scrape
+            metadata = {"radar_file": get_current_datetime_string()}
+            if current_version is not None:
+                metadata["drip_updated_gmt"] = current_version
+            mysql_connection.update_metadata_table(metadata)
+        if committed is not None:
+            committed()
+
+        if _stop_event.is_set():
+            # The merge is committed; indexes, history and summaries catch up next run
+            logger.warning("Shutdown requested; skipping post-publish maintenance.")
+            return
+
+        # Keep column types and the frontend's filter indexes in place
+        # (a first-run RENAME publishes a table without them).
+        _best_effort(mysql_connection, "Schema maintenance", mysql_connection.apply_schema_spec)
+
+        if configuration["store_history"] is True:
+            _best_effort(mysql_connection, "History snapshot", mysql_connection.write_history_snapshot, radar_dict)
+        _best_effort(mysql_connection, "Summary table refresh", mysql_connection.refresh_summary_tables)
+
+
+def _best_effort(mysql_connection, what, step, *args):
+    """
+    Run a post-publish step whose failure mustn't undo or block the publish
+    before it: log the error, roll back its transaction and carry on.
+    """
+    try:
+        step(*args)
+    except Exception as e:
+        logger.warning("%s failed: %s", what, e)
+        mysql_connection.conn.rollback()
+
+
+def _check_filter_indexes_once(mysql_connection):
+    """EXPLAIN the frontend's canonical filter queries once per process, logging any that miss their index."""
+    if _filter_indexes_checked.is_set():
+        return
+    _filter_indexes_checked.set()
+    _best_effort(mysql_connection, "Filter query index check", mysql_connection.check_filter_query_indexes)
+
+
+def _prepare_for_publish(radar_dict):
+    """Drop the columns the DB doesn't keep and null any obviously-bad values before they reach it."""
+    radar_dict_filtered = remove_unneeded_columns(radar_dict, UNNEEDED_COLUMNS)
+    validate_radar_data(radar_dict_filtered)
+    return radar_dict_filtered
+
+
+def _record_dead_letters(scraper, mysql_connection, scraped_symbols, complete):
+    """
+    Keep the DB's dead letters in step with the scrape that just ran: tickers it
+    got are dropped, the ones that failed both of its passes are (re)saved. A
+    complete scrape replaces the dead letters altogether, which also forgets
+    tickers DripInvesting.org no longer lists.
+    """
+    try:
+        mysql_connection.remove_dead_letters(None if complete else scraped_symbols)
+        mysql_connection.save_dead_letters(scraper.dead_letters)
+    except Exception as e:
+        logger.warning("Could not record failed tickers: %s", e)
+        mysql_connection.conn.rollback()
+        return
+    if scraper.dead_letters:
+        logger.warning("%s tickers failed both scrape passes and were dead-lettered: %s",
+                       len(scraper.dead_letters), [entry["Symbol"] for entry in scraper.dead_letters])
+
+
+def _canary_passes(configuration, scraper, mysql_connection, tickers, checkpoint, deadline):
+    """
+    Scrape a random sample of scrape_canary_size tickers and check each field's
+    fill rate against the last published full scrape (see canary_problems), so a
+    markup change fails within a few pages instead of after a full scrape.
+    Sampled stocks go into the checkpoint, if any, so the full scrape doesn't
+    fetch them again.
+    """
+    sample_size = min(configuration["scrape_canary_size"], len(tickers))
+    sample = scraper.scrape_sample(tickers, sample_size, deadline=deadline)
+    if deadline.expired():
+        return False
+    # Judged as it would be published: a value that doesn't clean to a number is empty
+    cleaned = clean_numeric_records([dict(record) for record in sample], schema.NUMERIC_COLUMNS)
+    problems = canary_problems(cleaned, sample_size, mysql_connection.get_field_coverage())
+    if problems:
+        logger.error("Canary scrape of %s stocks looks broken, skipping the full scrape. "
+                     "DripInvesting.org page structure may have changed: %s", sample_size, "; ".join(problems))
+        return False
+    if checkpoint is not None:
+        try:
+            checkpoint.save(sample)
+        except Exception as e:
+            logger.warning("Could not checkpoint the canary sample: %s", e)
+    logger.info("Canary scrape of %s stocks looks fine.", sample_size)
+    return True
+
+
+@contextmanager
+def _scrape_checkpoint(configuration, mysql_connection, current_version):
+    """
+    The ScrapeCheckpoint for a scrape of current_version; None if the version is
+    unknown. With db_writer_enabled its saves go through a BatchedWriter on a
+    connection of its own, so the scrape keeps fetching while they're written;
+    everything queued is written by the time the block exits.
+    """
+    if current_version is None:
+        yield None
+        return
+    writer_connection = None
+    if configuration["db_writer_enabled"] is True:
+        try:
+            writer_connection = _connect_with_retry(configuration["mysql_uri"])
+        except Exception as e:
+            logger.warning("Could not connect the checkpoint writer, checkpointing inline: %s", e)
+    if writer_connection is None:
+        yield ScrapeCheckpoint(mysql_connection, current_version)
+        return
+    with writer_connection:
+        writer = BatchedWriter(lambda records: writer_connection.save_scrape_checkpoint(current_version, records),
+                               batch_size=configuration["db_writer_batch_size"],
+                               flush_seconds=configuration["db_writer_flush_seconds"],
+                               queue_size=configuration["db_writer_queue_size"],
+                               key=lambda record: record["Symbol"], stop_event=_stop_event,
+                               name="checkpoint-writer")
+        with writer:
+            yield ScrapeCheckpoint(mysql_connection, current_version, writer=writer)
+
+
+def _scrape_and_publish(configuration, scraper, mysql_connection, current_version, deadline=None):
+    """
+    Full DripInvesting.org scrape, merged into the DB under _merge_lock. The scrape
+    itself runs unlocked; only the DB publish is serialized with Yahoo enrichment.
+    The scrape gets the deadline minus DB_WRITE_RESERVE_SECONDS, leaving time to
+    publish whatever it collected.
+
+    When the dataset version is known, progress is checkpointed in the DB so an
+    interrupted scrape of that version resumes where it stopped; the checkpoint
+    is cleared once the full dataset is published (or rejected as too small).
+    The checkpoint writes are off the scrape's path (see _scrape_checkpoint).
+
+    With scrape_canary_size, a random sample is scraped and checked first and
+    the full scrape only runs if it passes (see _canary_passes).
+    """
+    deadline = deadline or Deadline()
+    scrape_deadline = deadline.reserve(DB_WRITE_RESERVE_SECONDS)
+    with _scrape_checkpoint(configuration, mysql_connection, current_version) as checkpoint:
+        tickers = None
+        if configuration["scrape_canary_size"] > 0:
+            tickers = scraper.get_tickers(deadline=scrape_deadline)
+            if tickers and not _canary_passes(configuration, scraper, mysql_connection, tickers, checkpoint,
+                                              scrape_deadline):
+                return
+        logger.info("Starting scrape from DripInvesting.org...")
+        # Scrape data
+        scraped_data_list = scraper.scrape_all_data(deadline=scrape_deadline, checkpoint=checkpoint, tickers=tickers)
+    scraped_count = len(scraped_data_list)
+    min_expected = configuration["scrape_min_expected_tickers"]
+
+    # Convert list to dict format expected by helper functions (ticker -> data)
+    radar_dict = {item['Symbol']: item for item in scraped_data_list}
+
+    if deadline.cancelled():
+        # Don't start a DB merge during shutdown; nothing was written, the next run rescrapes
+        logger.warning("Shutdown requested; discarding %s scraped stocks.", scraped_count)
+    elif scrape_deadline.expired():
+        if scraped_count > 0:
+            _publish_scrape(configuration, mysql_connection, _prepare_for_publish(radar_dict), current_version,
+                            complete=False)
+        _record_dead_letters(scraper, mysql_connection, list(radar_dict), complete=False)
+        logger.warning("Scrape cut short by the cycle time budget; upserted %s stocks without pruning.",
+                       scraped_count)
+    elif scraped_count >= min_expected:
+        radar_dict_filtered = _prepare_for_publish(radar_dict)
+        # The next canary is checked against this run (before the rows get their freshness stamp)
+        coverage = field_coverage(radar_dict_filtered.values())
+        _publish_scrape(configuration, mysql_connection, radar_dict_filtered, current_version, complete=True)
+        if checkpoint is not None:
+            checkpoint.clear()
+        mysql_connection.save_field_coverage(coverage)
+        _record_dead_letters(scraper, mysql_connection, list(radar_dict), complete=True)
+        logger.info("Database updated successfully (%s stocks).", scraped_count)
+    elif scraped_count > 0:
+        # Too few stocks: the DripInvesting.org page shape likely changed.
+        # Skip the DB replace so we don't wipe good data with a broken scrape.
+        logger.error(
+            "Scrape returned only %s stocks (< %s expected); skipping DB update to "
+            "avoid wiping good data. DripInvesting.org page structure may have changed.",
+            scraped_count, min_expected)
+        # Don't resume from a scrape that looks broken
+        if checkpoint is not None:
+            checkpoint.clear()
+    else:
+        logger.warning("No data scraped.")
+
+
+def _incremental_scrape_and_publish(configuration, scraper, mysql_connection, current_version, deadline=None):
+    """
+    Scrape only the stock pages that changed since their last successful scrape
+    (by sitemap lastmod or HEAD validators, see detect_changes), plus newly
+    listed stocks, and drop published stocks the index no longer lists.
+    Unchanged pages keep their published data. Like a complete scrape, it records
+    the dataset version unless it was cut short by the time budget.
+    """
+    deadline = deadline or Deadline()
+    scrape_deadline = deadline.reserve(DB_WRITE_RESERVE_SECONDS)
+    min_expected = configuration["scrape_min_expected_tickers"]
+
+    tickers = scraper.get_tickers(deadline=scrape_deadline)
+    if len(tickers) < min_expected:
+        logger.error("Stocks index listed only %s stocks (< %s expected); skipping the incremental scrape. "
+                     "DripInvesting.org page structure may have changed.", len(tickers), min_expected)
+        return
+    page_versions = scraper.get_page_versions(tickers, deadline=scrape_deadline)
+    published = mysql_connection.get_tickers_from_db()
+    changes = detect_changes(tickers, page_versions, mysql_connection.get_page_versions(), published)
+    removed = changes.removed
+    if scrape_deadline.expired() or not removal_looks_safe(removed, len(published)):
+        if removed:
+            logger.warning("Not removing %s stocks missing from the stocks index: %s", len(removed), removed)
+        removed = []
+    logger.info("Incremental scrape: %s changed or new pages (%s new), %s unchanged, %s delisted.",
+                len(changes.to_fetch), len(changes.added), changes.unchanged, len(removed))
+
+    radar_dict = {item['Symbol']: item for item in scraper.scrape_symbols(changes.to_fetch, deadline=scrape_deadline)}
+    if deadline.cancelled():
+        logger.warning("Shutdown requested; discarding %s scraped stocks.", len(radar_dict))
+        return
+    cut_short = scrape_deadline.expired()
+
+    if removed:
+        with _merge_lock:
+            before = _changefeed_snapshot(configuration, mysql_connection, removed)
+            mysql_connection.remove_stocks(removed)
+            _emit_changes(configuration, mysql_connection, "drip_scrape", before, removed)
+    if radar_dict or removed:
+        _publish_scrape(configuration, mysql_connection, _prepare_for_publish(radar_dict), current_version,
+                        complete=False)
+    mysql_connection.save_page_versions({ticker_info['symbol']: page_versions.get(ticker_info['url'])
+                                         for ticker_info in changes.to_fetch if ticker_info['symbol'] in radar_dict})
+    _record_dead_letters(scraper, mysql_connection, list(radar_dict), complete=False)
+
+    if cut_short:
+        logger.warning("Incremental scrape cut short by the cycle time budget; upserted %s stocks.", len(radar_dict))
+        return
+    metadata = {"radar_file": get_current_datetime_string()}
+    if current_version is not None:
+        metadata["drip_updated_gmt"] = current_version
+    mysql_connection.update_metadata_table(metadata)
+    logger.info("Database updated incrementally (%s stocks).", len(radar_dict))
+
+
+def _scrape_stage(configuration):
+    """The full scrape, or with scrape_incremental only the pages that changed."""
+    if configuration["scrape_incremental"] is True:
+        return _incremental_scrape_and_publish
+    return _scrape_and_publish
+
+
+def _retry_dead_letters(configuration, scraper, mysql_connection, deadline=None):
+    """
+    Scrape just the tickers dead-lettered by earlier scrapes (no site-wide listing
+    or full scrape) and upsert the ones that now succeed; those still failing
+    stay dead-lettered with their latest response.
+    """
+    tickers = [{"symbol": entry["Symbol"], "url": entry["url"]}
+               for entry in mysql_connection.get_dead_letters() if entry.get("url")]
+    if not tickers:
+        return
+    deadline = deadline or Deadline()
+    scrape_deadline = deadline.reserve(DB_WRITE_RESERVE_SECONDS)
+    if scrape_deadline.expired():
+        return
+    logger.info("Retrying %s dead-lettered tickers...", len(tickers))
+    radar_dict = {item['Symbol']: item for item in scraper.scrape_symbols(tickers, deadline=scrape_deadline)}
+    if deadline.cancelled():
+        logger.warning("Shutdown requested; discarding %s retried stocks.", len(radar_dict))
+        return
+    if radar_dict:
+        _publish_scrape(configuration, mysql_connection, _prepare_for_publish(radar_dict), None, complete=False)
+    _record_dead_letters(scraper, mysql_connection, list(radar_dict), complete=False)
+
+
+def _run_drip_update(configuration, scraper, mysql_connection, deadline=None):
+    """Scrape and publish DripInvesting.org data unless its dataset version is unchanged."""
+    deadline = deadline or Deadline()
+    try:
+        # Surface data freshness so staleness is visible in the logs.
+        logger.info("Data freshness — radar: %s, yahoo: %s",
+                    _fmt_age(mysql_connection.get_update_age_seconds("radar_file")),
+                    _fmt_age(mysql_connection.get_update_age_seconds("yahoo_finance")))
+
+        # Only re-scrape DripInvesting.org when it has published a new dataset
+        # (its embedded updated_gmt advances). On unchanged days we skip the
+        # ~800-page scrape entirely; Yahoo price enrichment still runs.
+        current_version = scraper.get_dataset_version(deadline=deadline)
+        last_version = mysql_connection.check_db_update_dates().get("drip_updated_gmt")
+
+        if current_version is not None and current_version == last_version:
+            logger.info("DripInvesting.org dataset unchanged (updated_gmt=%s); skipping scrape.",
+                        current_version)
+            _retry_dead_letters(configuration, scraper, mysql_connection, deadline)
+        else:
+            _scrape_stage(configuration)(configuration, scraper, mysql_connection, current_version, deadline)
+
+    except Exception as e:
+        logger.exception("Error during update: %s", e)
+        mysql_connection.conn.rollback()
+
+
+def _plan_yahoo_refresh(configuration, mysql_connection):
+    """
+    The tickers to refresh from Yahoo this cycle, stalest 'Yahoo Updated' first,
+    at most yahoo_refresh_budget of them; the largest stocks by market cap jump
+    the queue once older than yahoo_popular_max_age_seconds.
+    """
+    tickers_list = plan_refresh(mysql_connection.get_refresh_candidates("Yahoo Updated"), _utc_now(),
+                                budget=configuration["yahoo_refresh_budget"],
+                                popular_count=configuration["yahoo_popular_symbols"],
+                                popular_max_age_seconds=configuration["yahoo_popular_max_age_seconds"])
+    logger.info("Refreshing %s tickers from Yahoo Finance, stalest first.", len(tickers_list))
+    return tickers_list
+
+
+def _has_yahoo_data(data):
+    return any(value is not None for value in data.values())
+
+
+def _stamp_yahoo_freshness(yahoo_data):
+    """Set 'Yahoo Updated' to the query time on every ticker Yahoo returned something for."""
+    query_time, ticker_data = yahoo_data[0], yahoo_data[1]
+    if not ticker_data:
+        return
+    refreshed_at = query_time.astimezone(timezone.utc).strftime(FRESHNESS_FORMAT)
+    for data in ticker_data.values():
+        if _has_yahoo_data(data):
+            data["Yahoo Updated"] = refreshed_at
+
+
+def _yahoo_circuit_breaker(configuration, mysql_connection):
+    return SymbolCircuitBreaker(mysql_connection, "yahoo",
+                                base_seconds=configuration["yahoo_failure_backoff_seconds"],
+                                max_seconds=configuration["yahoo_failure_max_backoff_seconds"])
+
+
+def _skip_suppressed(breaker, tickers_list, mysql_connection):
+    """Drop the tickers Yahoo keeps failing for until their backoff runs out."""
+    try:
+        allowed = breaker.allowed(tickers_list)
+    except Exception as e:
+        logger.warning("Could not read Yahoo failure history, querying every ticker: %s", e)
+        mysql_connection.conn.rollback()
+        return tickers_list
+    if breaker.suppressed_count:
+        logger.info("Skipping %s tickers Yahoo Finance keeps failing for.", breaker.suppressed_count)
+    return allowed
+
+
+def _record_yahoo_failures(breaker, ticker_data, mysql_connection):
+    """
+    Feed the outcome of a Yahoo fetch to the circuit breaker: tickers it returned
+    nothing for count a failure, the rest are reset. Tickers the deadline skipped
+    aren't in ticker_data and count as neither.
+    """
+    failed = [symbol for symbol, data in ticker_data.items() if not _has_yahoo_data(data)]
+    succeeded = [symbol for symbol, data in ticker_data.items() if _has_yahoo_data(data)]
+    try:
+        if breaker.record(failed, succeeded):
+            logger.warning("Yahoo Finance returned nothing for %s of %s tickers; treating it as an outage, "
+                           "not as failing tickers.", len(failed), len(ticker_data))
+    except Exception as e:
+        logger.warning("Could not save Yahoo failure history: %s", e)
+        mysql_connection.conn.rollback()
+
+
+def _next_yahoo_refresh(configuration, calendar=None):
+    """
+    When Yahoo enrichment should next run (naive UTC) with yahoo_market_hours_only:
+    every yahoo_enrichment_interval_seconds during the NYSE session, once after the
+    close, then not until the next open. None when it isn't limited to market hours.
+    """
+    if configuration["yahoo_market_hours_only"] is not True:
+        return None
+    calendar = calendar or MarketCalendar()
+    now = _utc_now()
+    if not calendar.covers(now.date()):
+        logger.warning("The market calendar has no holidays for %s; assuming the market is open every weekday.",
+                       now.year)
+    return calendar.next_refresh(now, configuration["yahoo_enrichment_interval_seconds"])
+
+
+def _yahoo_schedule(configuration):
+    """ScheduledJob schedule for Yahoo enrichment; None (a fixed interval) unless yahoo_market_hours_only."""
+    if configuration["yahoo_market_hours_only"] is not True:
+        return None
+    calendar = MarketCalendar()
+
+    def seconds_until_next_refresh():
+        next_refresh = _next_yahoo_refresh(configuration, calendar)
+        seconds = max(0.0, (next_refresh - _utc_now()).total_seconds())
+        logger.info("Next Yahoo Finance refresh at %s UTC.", next_refresh.strftime(FRESHNESS_FORMAT))
+        return seconds
+    return seconds_until_next_refresh
+
+
+def _run_yahoo_enrichment(configuration, mysql_connection, deadline=None):
+    """
+    Enrich the tickers picked by _plan_yahoo_refresh, less those the Yahoo circuit
+    breaker is holding back, with fresh Yahoo Finance data (prices etc.), stamping
+    each refreshed row's 'Yahoo Updated', and record when the enrichment was
+    written. Yahoo is queried unlocked; the DB writes hold _merge_lock. The fetch
+    stops DB_WRITE_RESERVE_SECONDS before the deadline and whatever it got by then
+    is still written.
+    """
+    yahoo_deadline = (deadline or Deadline()).reserve(DB_WRITE_RESERVE_SECONDS)
+    if yahoo_deadline.expired():
+        logger.warning("No time left in the cycle budget for Yahoo Finance enrichment; skipping it.")
+        return
+    breaker = _yahoo_circuit_breaker(configuration, mysql_connection)
+    tickers_list = _plan_yahoo_refresh(configuration, mysql_connection)
+    tickers_list = _skip_suppressed(breaker, tickers_list, mysql_connection)
+    try:
+        yahoo_data = get_yahoo_finance_data_for_tickers_list(tickers_list, deadline=yahoo_deadline)
+    except DeadlineExceeded as e:
+        logger.warning("Yahoo Finance enrichment stopped: %s", e)
+        return
+    if yahoo_deadline.cancelled():
+        logger.warning("Shutdown requested; discarding Yahoo Finance data for %s tickers.", len(yahoo_data[1]))
+        return
+    if yahoo_data[1]:
+        _record_yahoo_failures(breaker, yahoo_data[1], mysql_connection)
+    _stamp_yahoo_freshness(yahoo_data)
+    _journaled(configuration, mysql_connection, "yahoo",
+               lambda: {"queried_at": yahoo_data[0].isoformat(), "tickers": yahoo_data[1]},
+               lambda committed: _write_yahoo(configuration, mysql_connection, yahoo_data, committed))
+
+
+def _write_yahoo(configuration, mysql_connection, yahoo_data, committed=None):
+    """
+    Write Yahoo Finance data to the DB under _merge_lock, with everything derived
+    from it; committed, if given, is called once the data itself is in.
+    """
+    with _merge_lock:
+        refreshed = list(yahoo_data[1] or ())
+        before = _changefeed_snapshot(configuration, mysql_connection, refreshed) if refreshed else None
+        mysql_connection.update_data_table(yahoo_data)
+        # Only now is there fresh Yahoo data in the table
+        mysql_connection.update_metadata_table({"yahoo_finance": get_current_datetime_string()})
+        if committed is not None:
+            committed()
+        _best_effort(mysql_connection, "Schema maintenance", mysql_connection.apply_schema_spec)
+        # Keep price-derived fields consistent with the refreshed prices
+        _best_effort(mysql_connection, "Derived field recompute", mysql_connection.recompute_derived_fields)
+        # Derived fields only move with the refreshed rows' prices, so those rows cover them
+        _emit_changes(configuration, mysql_connection, "yahoo", before, refreshed)
+        if configuration["store_history"] is True:
+            _best_effort(mysql_connection, "History snapshot", mysql_connection.write_history_snapshot, yahoo_data[1])
+        _best_effort(mysql_connection, "Summary table refresh", mysql_connection.refresh_summary_tables)
+
+
+def _run_history_maintenance(configuration, mysql_connection, deadline=None):
+    if deadline is not None and deadline.expired():
+        logger.warning("Cycle time budget exhausted; history maintenance postponed to the next cycle.")
+        return
+    try:
+        mysql_connection.maintain_history(configuration["history_retention_days"],
+                                          configuration["history_downsample_after_days"])
+    except Exception as e:
+        logger.warning("History maintenance failed: %s", e)
+        mysql_connection.conn.rollback()
+
+
+def _make_scraper(configuration):
+    hedge_policy = None
+    if configuration["scrape_hedge_requests"] is True:
+        hedge_policy = HedgePolicy(percentile=configuration["scrape_hedge_percentile"],
+                                   budget_fraction=configuration["scrape_hedge_budget_fraction"])
+    return DripInvestingScraper(
+        max_workers=configuration["scrape_max_workers"],
+        stocks_url=configuration["dividend_radar_download_url"],
+        stop_event=_stop_event,
+        hedge_policy=hedge_policy,
+    )
+
+
+def _register_signal_handlers():
     # Register handlers so an orchestrator stop (SIGTERM) shuts us down cleanly.
     # Guarded because signals can only be registered from the main thread.
     try:
@@ -68,16 +784,25 @@ def init():
     except ValueError:
         pass
 
+
+def init():
+    _register_signal_handlers()
+    # None: due now (always the case unless yahoo_market_hours_only)
+    yahoo_due_at = None
+
     while not _stop_event.is_set():
         configuration = read_configurations()
 
+        if configuration["scheduler_enabled"] is True:
+            run_scheduled(configuration)
+            return
+
         # Liveness heartbeat for the Docker healthcheck (detects a hung loop).
         write_heartbeat(configuration["max_random_delay_seconds"])
+        # Keeps the cycle inside the healthcheck's margin; partial progress is committed
+        deadline = _cycle_deadline(configuration)
 
-        scraper = DripInvestingScraper(
-            max_workers=configuration["scrape_max_workers"],
-            stocks_url=configuration["dividend_radar_download_url"],
-        )
+        scraper = _make_scraper(configuration)
 
         # disable yahoo spammy logs if set
         if configuration["disable_yahoo_logs"] is True:
@@ -91,72 +816,111 @@ def init():
             continue
 
         with database_connection as mysql_connection:
-            try:
-                # Surface data freshness so staleness is visible in the logs.
-                logger.info("Data freshness — radar: %s, yahoo: %s",
-                            _fmt_age(mysql_connection.get_update_age_seconds("radar_file")),
-                            _fmt_age(mysql_connection.get_update_age_seconds("yahoo_finance")))
-
-                # Only re-scrape DripInvesting.org when it has published a new dataset
-                # (its embedded updated_gmt advances). On unchanged days we skip the
-                # ~800-page scrape entirely; Yahoo price enrichment below still runs.
-                current_version = scraper.get_dataset_version()
-                last_version = mysql_connection.check_db_update_dates().get("drip_updated_gmt")
-
-                if current_version is not None and current_version == last_version:
-                    logger.info("DripInvesting.org dataset unchanged (updated_gmt=%s); skipping scrape.",
-                                current_version)
-                else:
-                    logger.info("Starting scrape from DripInvesting.org...")
-                    # Scrape data
-                    scraped_data_list = scraper.scrape_all_data()
-                    scraped_count = len(scraped_data_list)
-                    min_expected = configuration["scrape_min_expected_tickers"]
-
-                    if scraped_count >= min_expected:
-                        # Convert list to dict format expected by helper functions (ticker -> data)
-                        radar_dict = {item['Symbol']: item for item in scraped_data_list}
-
-                        # Filter columns if needed (scraper already selects relevant data, but we can ensure cleanup)
-                        unneeded_columns = ["FV", "None", None, "Ex-Date", "Pay-Date", "Website", "EPS 1Y"]
-
-                        radar_dict_filtered = remove_unneeded_columns(radar_dict, unneeded_columns)
-
-                        # Null any obviously-bad values before they reach the DB
-                        validate_radar_data(radar_dict_filtered)
-
-                        # Convert to dataframe and update DB
-                        mysql_connection.update_data_table_from_data_frame(radar_dict_to_table(radar_dict_filtered))
-
-                        # Update metadata, including the dataset version we just scraped
-                        mysql_connection.update_metadata_table({"radar_file": get_current_datetime_string()})
-                        if current_version is not None:
-                            mysql_connection.update_metadata_table({"drip_updated_gmt": current_version})
-                        logger.info("Database updated successfully (%s stocks).", scraped_count)
-                    elif scraped_count > 0:
-                        # Too few stocks: the DripInvesting.org page shape likely changed.
-                        # Skip the DB replace so we don't wipe good data with a broken scrape.
-                        logger.error(
-                            "Scrape returned only %s stocks (< %s expected); skipping DB update to "
-                            "avoid wiping good data. DripInvesting.org page structure may have changed.",
-                            scraped_count, min_expected)
-                    else:
-                        logger.warning("No data scraped.")
-
-            except Exception as e:
-                logger.exception("Error during update: %s", e)
-                mysql_connection.conn.rollback()
-
-            # Enrich every ticker with fresh Yahoo Finance data (prices etc.) and
-            # record when that enrichment ran, so it stays current even on days the
+            _check_filter_indexes_once(mysql_connection)
+            _replay_journal(configuration, mysql_connection)
+            _run_drip_update(configuration, scraper, mysql_connection, deadline)
+
+            # Runs every cycle it's due so prices stay current even on days the
             # DripInvesting.org scrape is skipped.
-            if configuration["scrape_yahoo_finance"] is True:
-                tickers_list = mysql_connection.get_tickers_from_db()
-                mysql_connection.update_metadata_table({"yahoo_finance": get_current_datetime_string()})
-                yahoo_data = get_yahoo_finance_data_for_tickers_list(tickers_list)
-                mysql_connection.update_data_table(yahoo_data)
+            if configuration["scrape_yahoo_finance"] is True and (yahoo_due_at is None or _utc_now() >= yahoo_due_at):
+                try:
+                    _run_yahoo_enrichment(configuration, mysql_connection, deadline)
+                except Exception as e:
+                    logger.exception("Error during Yahoo Finance enrichment: %s", e)
+                    mysql_connection.conn.rollback()
+                yahoo_due_at = _next_yahoo_refresh(configuration)
+
+            if configuration["store_history"] is True:
+                _run_history_maintenance(configuration, mysql_connection, deadline)
 
         # add a random delay between runs, if zero there will be none
         random_delay(configuration["max_random_delay_seconds"], stop_event=_stop_event)
 
-    logger.info("Shutdown requested, exiting.")
+    _log_shutdown_latency()
+
+
+def _with_connection(configuration, step):
+    """
+    Job action running step(mysql_connection, deadline) on a connection of its own
+    (connections aren't shared), each run with its own cycle_time_budget_seconds.
+    """
+    def action():
+        deadline = _cycle_deadline(configuration)
+        with _connect_with_retry(configuration["mysql_uri"]) as mysql_connection:
+            _check_filter_indexes_once(mysql_connection)
+            _replay_journal(configuration, mysql_connection)
+            step(mysql_connection, deadline)
+    return action
+
+
+def _check_drip_version(scraper, mysql_connection, deadline=None):
+    """Record the dataset version DripInvesting.org currently publishes, for the scrape job to pick up."""
+    current_version = scraper.get_dataset_version(deadline=deadline)
+    if current_version is not None:
+        mysql_connection.update_metadata_table({"drip_available_gmt": current_version})
+
+
+def _scrape_if_due(configuration, scraper, mysql_connection, deadline=None):
+    """
+    Full scrape when the version job has seen a dataset newer than the one last
+    published, or when the published data is older than drip_full_scrape_max_age_seconds
+    (which also covers a version that could never be determined). Otherwise only
+    the dead-lettered tickers are retried.
+    """
+    update_dates = mysql_connection.check_db_update_dates()
+    available_version = update_dates.get("drip_available_gmt")
+    age = mysql_connection.get_update_age_seconds("radar_file")
+    try:
+        if available_version is not None and available_version != update_dates.get("drip_updated_gmt"):
+            logger.info("DripInvesting.org published dataset %s; scraping.", available_version)
+        elif age is None or age >= configuration["drip_full_scrape_max_age_seconds"]:
+            logger.info("DripInvesting.org data last published %s; scraping.", _fmt_age(age))
+        else:
+            _retry_dead_letters(configuration, scraper, mysql_connection, deadline)
+            return
+        _scrape_stage(configuration)(configuration, scraper, mysql_connection, available_version, deadline)
+    except Exception:
+        mysql_connection.conn.rollback()
+        raise
+
+
+def _yahoo_enrichment_step(configuration, mysql_connection, deadline=None):
+    _run_yahoo_enrichment(configuration, mysql_connection, deadline)
+    if configuration["store_history"] is True:
+        _run_history_maintenance(configuration, mysql_connection, deadline)
+
+
+def scheduled_jobs(configuration):
+    """
+    The DripInvesting.org version check, the full scrape and Yahoo enrichment as
+    independent ScheduledJobs, each with its own interval and jitter. They only
+    coordinate through the DB (dividend_update_times) and _merge_lock.
+    """
+    scraper = _make_scraper(configuration)
+    jitter = configuration["scheduler_jitter_fraction"]
+
+    def job(name, step, interval_seconds, schedule=None):
+        return ScheduledJob(name, _with_connection(configuration, step), interval_seconds,
+                            jitter_seconds=interval_seconds * jitter, schedule=schedule)
+
+    jobs = [
+        job("drip_version_check", lambda conn, deadline: _check_drip_version(scraper, conn, deadline),
+            configuration["drip_version_check_interval_seconds"]),
+        job("drip_scrape", lambda conn, deadline: _scrape_if_due(configuration, scraper, conn, deadline),
+            configuration["drip_scrape_interval_seconds"]),
+    ]
+    if configuration["scrape_yahoo_finance"] is True:
+        jobs.append(job("yahoo_enrichment", lambda conn, deadline: _yahoo_enrichment_step(configuration, conn, deadline),
+                        configuration["yahoo_enrichment_interval_seconds"], schedule=_yahoo_schedule(configuration)))
+    return jobs
+
+
+def run_scheduled(configuration):
+    """Run scheduled_jobs concurrently until _stop_event is set (SIGTERM/SIGINT)."""
+    if configuration["disable_yahoo_logs"] is True:
+        disable_yahoo_logs()
+    scheduler = Scheduler(scheduled_jobs(configuration), _stop_event,
+                          heartbeat=lambda: write_heartbeat(SCHEDULER_HEARTBEAT_SECONDS),
+                          heartbeat_interval=SCHEDULER_HEARTBEAT_SECONDS)
+    scheduler.run()
+    _log_shutdown_latency()
@@ -1,20 +1,86 @@
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
+import random
 import re
 import threading
-from concurrent.futures import ThreadPoolExecutor
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import urlparse
 import logging
+import xml.etree.ElementTree as ElementTree
+from divifilter_data_updater.deadline import Deadline
+from divifilter_data_updater.hedging import hedged_call
+from divifilter_data_updater.lazy_imports import LazyModule
 from divifilter_data_updater.helper_functions import clean_numeric_value
+from divifilter_data_updater.schema import NUMERIC_COLUMNS, ESSENTIAL_COLUMNS
+from divifilter_data_updater.stock_record import StockRecord
+
+# Only page parsing needs bs4; the dataset-version check that skips unchanged days doesn't
+bs4 = LazyModule("bs4")
+
+# Marks tickers scrape_all_data didn't get to before its deadline (as opposed to failures)
+_SKIPPED = object()
+
+
+class _CancellableRetry(Retry):
+    """urllib3 Retry that stops retrying, and skips its backoff sleep, once stop_event is set."""
+
+    stop_event = None
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.stop_event = self.stop_event
+        return retry
+
+    def _stopping(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def is_exhausted(self):
+        return self._stopping() or super().is_exhausted()
+
+    def sleep(self, response=None):
+        if not self._stopping():
+            super().sleep(response)
+
 
 class DripInvestingScraper:
     BASE_URL = "https://www.dripinvesting.org"
     STOCKS_URL = "https://www.dripinvesting.org/stocks/"
+    REQUEST_TIMEOUT = 30
+    # urllib3 retries per request; request timeouts shrink so all attempts fit a deadline
+    REQUEST_RETRIES = 3
+    # How often scrape_all_data checks its deadline (and the stop event) while waiting on the pool
+    CANCEL_POLL_SECONDS = 0.5
+    # Parsed stocks are checkpointed in batches of this size while a scrape runs
+    CHECKPOINT_BATCH_SIZE = 25
+    # Tickers that fail are retried once more, after this pause, with this many workers
+    RETRY_PASS_BACKOFF_SECONDS = 10
+    RETRY_PASS_WORKERS = 1
+    # How much of a failed response's body is kept in the dead letters
+    DEAD_LETTER_BODY_CHARS = 500
+    # Size of the hedged-request pool (see _get_page), per scrape worker
+    HEDGE_THREADS_PER_WORKER = 4
+    # Where get_page_versions reads per-page lastmod dates, relative to the site root
+    SITEMAP_PATH = "/sitemap.xml"
+    # Most nested sitemaps followed from a sitemap index
+    SITEMAP_MAX_CHILDREN = 50
 
-    def __init__(self, max_workers=4, stocks_url=None):
+    def __init__(self, max_workers=4, stocks_url=None, stop_event=None, hedge_policy=None):
+        """
+        :param max_workers: concurrent stock page fetches
+        :param stocks_url: override for the stocks index URL
+        :param stop_event: optional threading.Event set on shutdown; requests in
+            flight then give up instead of retrying
+        :param hedge_policy: optional HedgePolicy; stock page requests slower than
+            its latency percentile get a duplicate request, see _get_page
+        """
         self.max_workers = max_workers
+        self.stop_event = stop_event
+        self.hedge_policy = hedge_policy
+        # Runs hedged stock page requests (both copies), created on first use
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
         # Allow the stocks URL to be overridden via config; derive the site root
         # from it so relative ticker links still resolve correctly.
         if stocks_url:
@@ -23,8 +89,16 @@ class DripInvestingScraper:
             self.BASE_URL = f"{parsed.scheme}://{parsed.netloc}"
         self._thread_local = threading.local()
         self.logger = logging.getLogger(__name__)
+        # symbol -> why its last fetch failed, see _record_failure
+        self._failures = {}
+        self._failures_lock = threading.Lock()
+        # Tickers that still failed after the retry pass of the last scrape, with their last response
+        self.dead_letters = []
+
+    def _timeout(self, deadline):
+        return deadline.timeout(self.REQUEST_TIMEOUT, attempts=self.REQUEST_RETRIES + 1)
 
-    def get_dataset_version(self):
+    def get_dataset_version(self, deadline=None):
         """
         Return DripInvesting.org's published dataset version - the `updated_gmt`
         timestamp embedded in the stocks index page - or None if it can't be
@@ -33,8 +107,9 @@ class DripInvestingScraper:
         Returns None on any fetch/parse failure so callers fail safe toward a
         full scrape (never skip on uncertainty).
         """
+        deadline = deadline or Deadline()
         try:
-            response = self._get_session().get(self.STOCKS_URL, timeout=30)
+            response = self._get_session().get(self.STOCKS_URL, timeout=self._timeout(deadline))
             response.raise_for_status()
         except Exception as e:
             self.logger.warning(f"Could not fetch DripInvesting.org dataset version: {e}")
@@ -52,22 +127,98 @@ class DripInvestingScraper:
             session.headers.update({
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             })
-            retry_strategy = Retry(
-                total=3,
+            retry_strategy = _CancellableRetry(
+                total=self.REQUEST_RETRIES,
                 backoff_factor=1,
                 status_forcelist=[429, 500, 502, 503, 504],
             )
+            retry_strategy.stop_event = self.stop_event
             adapter = HTTPAdapter(max_retries=retry_strategy)
             session.mount("http://", adapter)
             session.mount("https://", adapter)
             self._thread_local.session = session
         return self._thread_local.session
 
-    def get_tickers(self):
+    def _get_page(self, url, deadline):
+        """
+        GET a stock page. With a hedge_policy the request runs on the hedge
+        executor and, once it takes longer than the policy's latency percentile
+        for this scrape, a second copy is sent; the first response wins.
+        """
+        if self.hedge_policy is None:
+            return self._get_session().get(url, timeout=self._timeout(deadline))
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                # A primary and a hedge per scrape worker, plus room for the slow copies
+                # that lost but are still running; threads keep their own sessions
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.HEDGE_THREADS_PER_WORKER * self.max_workers,
+                                                          thread_name_prefix="hedged-fetch")
+        return hedged_call(self._hedge_executor,
+                           lambda: self._get_session().get(url, timeout=self._timeout(deadline)),
+                           self.hedge_policy)
+
+    def _read_sitemap(self, url, deadline, lastmods, depth=0):
+        """Add {page url: lastmod} from the sitemap at url to lastmods, following a sitemap index one level."""
+        response = self._get_session().get(url, timeout=self._timeout(deadline))
+        response.raise_for_status()
+        root = ElementTree.fromstring(response.content)
+        if root.tag.endswith("sitemapindex"):
+            if depth > 0:
+                return
+            for child in root.findall("{*}sitemap")[:self.SITEMAP_MAX_CHILDREN]:
+                loc = child.findtext("{*}loc")
+                if loc and not deadline.expired():
+                    self._read_sitemap(loc.strip(), deadline, lastmods, depth + 1)
+            return
+        for entry in root.findall("{*}url"):
+            loc, lastmod = entry.findtext("{*}loc"), entry.findtext("{*}lastmod")
+            if loc and lastmod:
+                lastmods[loc.strip().rstrip("/")] = lastmod.strip()
+
+    def _head_version(self, url, deadline):
+        """The page's ETag or Last-Modified validator from a HEAD request; None if it has neither."""
+        if deadline.expired():
+            return None
+        try:
+            response = self._get_session().head(url, timeout=self._timeout(deadline), allow_redirects=True)
+        except Exception as e:
+            self.logger.debug(f"HEAD {url} failed: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        return response.headers.get("ETag") or response.headers.get("Last-Modified")
+
+    def get_page_versions(self, tickers, deadline=None):
+        """
+        Cheap per-page modification signals for the given tickers ([{'symbol', 'url'}]),
+        as {url: version}: the sitemap's lastmod where the page is listed there,
+        otherwise the ETag/Last-Modified of a HEAD request. Pages with neither get
+        None, which change detection treats as changed.
+        """
+        deadline = deadline or Deadline()
+        lastmods = {}
+        try:
+            self._read_sitemap(self.BASE_URL + self.SITEMAP_PATH, deadline, lastmods)
+        except Exception as e:
+            self.logger.warning(f"Could not read the sitemap, checking pages with HEAD requests: {e}")
+
+        versions = {ticker_info['url']: lastmods.get(ticker_info['url'].rstrip("/")) for ticker_info in tickers}
+        unlisted = [url for url, version in versions.items() if version is None]
+        if unlisted:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                versions.update(zip(unlisted, executor.map(lambda url: self._head_version(url, deadline), unlisted)))
+        self.logger.info(f"Page versions: {len(tickers) - len(unlisted)} from the sitemap, "
+                         f"{sum(versions[url] is not None for url in unlisted)}/{len(unlisted)} from HEAD requests")
+        return versions
+
+    def get_tickers(self, deadline=None):
         """
         Scrapes the main stocks page and all pagination pages to find all ticker URLs.
         Returns a list of dictionaries: [{'symbol': 'JNJ', 'url': '...'}]
+
+        Stops paginating (keeping the tickers found so far) once the optional deadline expires.
         """
+        deadline = deadline or Deadline()
         all_tickers = []
         seen_symbols = set()
         page = 1
@@ -79,10 +230,14 @@ class DripInvestingScraper:
             else:
                 url = f"{self.STOCKS_URL}?stocks_page={page}"
             
+            if deadline.expired():
+                self.logger.warning(f"Time budget exhausted before page {page}; keeping tickers found so far")
+                break
+
             self.logger.info(f"Fetching tickers from page {page}: {url}")
             
             try:
-                response = self._get_session().get(url, timeout=30)
+                response = self._get_session().get(url, timeout=self._timeout(deadline))
 
                 # If we get a 404, we might have reached the end (though usually it just returns empty or same page)
                 if response.status_code == 404:
@@ -90,7 +245,7 @@ class DripInvestingScraper:
                     break
                     
                 response.raise_for_status()
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = bs4.BeautifulSoup(response.content, 'html.parser')
                 
                 # Find links ending with -dividend-history-calculator-returns/
                 links = soup.find_all('a', href=re.compile(r'-dividend-history-calculator-returns/$'))
@@ -141,21 +296,24 @@ class DripInvestingScraper:
 
 
 
-    def get_stock_data(self, stock_info):
+    def get_stock_data(self, stock_info, deadline=None):
         """
-        Fetches and parses data for a single stock.
+        Fetches and parses data for a single stock into a StockRecord.
+        The optional deadline caps the request timeout.
         """
         symbol = stock_info["symbol"]
         url = stock_info["url"]
+        deadline = deadline or Deadline()
         
         try:
-            response = self._get_session().get(url, timeout=30)
+            response = self._get_page(url, deadline)
             if response.status_code != 200:
                 self.logger.warning(f"Failed to fetch data for {symbol}: {response.status_code}")
+                self._record_failure(stock_info, status=response.status_code, body=response.text)
                 return None
                 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            data = {"Symbol": symbol}
+            soup = bs4.BeautifulSoup(response.content, 'html.parser')
+            data = StockRecord(Symbol=symbol)
             
             # Helper to safely get text
             def get_text_safe(element):
@@ -207,26 +365,12 @@ class DripInvestingScraper:
             
             # 3. Clean numeric fields
             # These fields need to be numeric for filtering/comparison
-            numeric_fields = [
-                "No Years", "Price", "Div Yield", "5Y Avg Yield", "Current Div", "Annualized",
-                "DGR 1Y", "DGR 3Y", "DGR 5Y", "DGR 10Y", "TTR 1Y", "TTR 3Y",
-                "Chowder Number", "PEG", "P/E", "P/BV", "ROE", "NPM", "ROTC",
-                "Debt/Capital", "CF/Share", "Revenue 1Y",
-                "High", "Low", "Payout Ratio", "Market Cap", "Fair Value", "FV %"
-            ]
-            
-            for field in numeric_fields:
+            for field in NUMERIC_COLUMNS:
                 if field in data:
                     data[field] = clean_numeric_value(data[field])
-            
+
             # 4. Ensure essential columns exist (fill with None if missing)
-            essential_cols = [
-                "Company", "Sector", "Industry", "No Years", "Price", "Div Yield", "5Y Avg Yield", 
-                "Current Div", "Payouts/ Year", "Annualized", "Low", "High", "DGR 1Y", "DGR 3Y", "DGR 5Y", 
-                "DGR 10Y", "TTR 1Y", "TTR 3Y", "Fair Value", "FV %", "Chowder Number",
-                "Revenue 1Y", "NPM", "CF/Share", "ROE", "Debt/Capital", "ROTC", "P/E", "P/BV", "PEG"
-            ]
-            for col in essential_cols:
+            for col in ESSENTIAL_COLUMNS:
                 if col not in data:
                     data[col] = None
 
@@ -234,33 +378,207 @@ class DripInvestingScraper:
 
         except Exception as e:
             self.logger.error(f"Error processing {symbol}: {e}")
+            self._record_failure(stock_info, error=e)
             return None
 
+    def _record_failure(self, stock_info, status=None, body=None, error=None):
+        """Remember the last failure of a ticker, for the dead letters of scrape_tickers."""
+        failure = {
+            "Symbol": stock_info["symbol"],
+            "url": stock_info["url"],
+            "status": status,
+            "error": str(error)[:self.DEAD_LETTER_BODY_CHARS] if error is not None else None,
+            "body": body[:self.DEAD_LETTER_BODY_CHARS] if isinstance(body, str) else None,
+        }
+        with self._failures_lock:
+            self._failures[stock_info["symbol"]] = failure
+
+
+    def _fetch_before_deadline(self, stock_info, deadline):
+        """get_stock_data for the pool; tickers not started before the deadline are skipped."""
+        if deadline.expired():
+            return _SKIPPED
+        return self.get_stock_data(stock_info, deadline=deadline)
 
-    def scrape_all_data(self):
+    def _save_checkpoint(self, checkpoint, futures, saved, min_batch=1):
+        """Save the results of finished, not yet saved futures once there are at least min_batch of them."""
+        finished = [future for future in futures
+                    if future not in saved and future.done() and not future.cancelled()]
+        if len(finished) < min_batch:
+            return
+        saved.update(finished)
+        records = [future.result() for future in finished]
+        records = [record for record in records if record is not None and record is not _SKIPPED]
+        try:
+            checkpoint.save(records)
+        except Exception as e:
+            # Progress just isn't resumable; the scrape itself carries on
+            self.logger.warning(f"Could not checkpoint {len(records)} scraped stocks: {e}")
+
+    def _fetch_pool(self, tickers, deadline, workers, checkpoint=None):
+        """
+        Fetch tickers on a pool of `workers` threads until done or the deadline
+        expires, checkpointing as results come in. Returns {symbol: record, None
+        on failure or _SKIPPED if never fetched}.
+        """
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = [executor.submit(self._fetch_before_deadline, ticker_info, deadline) for ticker_info in tickers]
+        saved = set()
+        try:
+            pending = set(futures)
+            while pending and not deadline.expired():
+                _, pending = wait(pending, timeout=self.CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                if checkpoint is not None:
+                    self._save_checkpoint(checkpoint, futures, saved, min_batch=self.CHECKPOINT_BATCH_SIZE)
+        finally:
+            for future in futures:
+                future.cancel()
+            # Out of time: let in-flight fetches (capped timeouts) finish and keep them.
+            # Shutdown: don't wait; their retries are abandoned via the stop event.
+            executor.shutdown(wait=not deadline.cancelled())
+            if checkpoint is not None:
+                self._save_checkpoint(checkpoint, futures, saved)
+
+        return {
+            ticker_info['symbol']: future.result() if future.done() and not future.cancelled() else _SKIPPED
+            for ticker_info, future in zip(tickers, futures)
+        }
+
+    def scrape_tickers(self, tickers, deadline=None, checkpoint=None):
+        """
+        Fetch the given tickers ([{'symbol', 'url'}]) concurrently, then retry the
+        ones that failed in a second pass, after RETRY_PASS_BACKOFF_SECONDS and at
+        RETRY_PASS_WORKERS concurrency, so a brief burst of 5xx doesn't lose them.
+        Tickers that fail both passes are left in self.dead_letters with their last
+        status, error and (truncated) response body.
+
+        Returns {symbol: record, None if it failed, or _SKIPPED if the deadline
+        expired before it was fetched}.
+        """
+        try:
+            return self._scrape_tickers(tickers, deadline or Deadline(), checkpoint)
+        finally:
+            self._close_hedge_executor()
+
+    def _close_hedge_executor(self):
+        """Stop the hedge executor's threads once a scrape is done; the next hedged fetch starts a new one."""
+        with self._hedge_executor_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            # Slow copies that lost their race finish on their own; nothing waits for them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _scrape_tickers(self, tickers, deadline, checkpoint):
+        with self._failures_lock:
+            self._failures = {}
+        if self.hedge_policy is not None:
+            # Hedge against this scrape's latencies, with a fresh budget
+            self.hedge_policy.reset()
+        results = self._fetch_pool(tickers, deadline, self.max_workers, checkpoint)
+
+        failed = [ticker_info for ticker_info in tickers if results[ticker_info['symbol']] is None]
+        if failed and not deadline.expired():
+            self.logger.info(f"Retrying {len(failed)} failed tickers in {self.RETRY_PASS_BACKOFF_SECONDS}s "
+                             f"with {self.RETRY_PASS_WORKERS} worker(s)")
+            backoff = min(self.RETRY_PASS_BACKOFF_SECONDS, deadline.remaining())
+            stop_event = deadline.cancel_event or self.stop_event
+            if stop_event is not None:
+                stop_event.wait(backoff)
+            else:
+                time.sleep(backoff)
+            retried = self._fetch_pool(failed, deadline, self.RETRY_PASS_WORKERS, checkpoint)
+            # A retry the deadline kept from running still counts as failed
+            results.update({symbol: res for symbol, res in retried.items() if res is not _SKIPPED})
+
+        if self.hedge_policy is not None and self.hedge_policy.hedges:
+            self.logger.info(f"Hedged {self.hedge_policy.hedges} of {self.hedge_policy.calls} requests; "
+                             f"the hedge answered first {self.hedge_policy.hedges_won} times")
+        with self._failures_lock:
+            self.dead_letters = [self._failures.get(ticker_info['symbol'], {
+                "Symbol": ticker_info['symbol'], "url": ticker_info['url'],
+                "status": None, "error": None, "body": None,
+            }) for ticker_info in tickers if results[ticker_info['symbol']] is None]
+        return results
+
+    def scrape_sample(self, tickers, sample_size, deadline=None):
+        """
+        Fetch a random sample of the given tickers (e.g. as a canary before a full
+        scrape) and return the records that parsed.
+        """
+        sample = random.sample(tickers, min(sample_size, len(tickers)))
+        results = self.scrape_tickers(sample, deadline=deadline)
+        return [res for res in results.values() if res is not None and res is not _SKIPPED]
+
+    def scrape_all_data(self, deadline=None, checkpoint=None, tickers=None):
         """
         Main method to orchestrate scraping.
+
+        With a deadline, tickers not yet started when it expires are skipped and
+        the stocks scraped so far are returned; callers can tell the scrape was
+        cut short by the deadline having expired. If the deadline is cancelled
+        (shutdown), queued fetches are cancelled and requests in flight are not
+        waited for, so this returns within about CANCEL_POLL_SECONDS.
+
+        With a checkpoint (see db_functions.ScrapeCheckpoint), stocks it already
+        holds are not fetched again, and newly parsed ones are saved to it in
+        batches, so a scrape interrupted by a crash or redeploy resumes instead
+        of starting over.
+
+        Failed tickers get a second pass (see scrape_tickers); the ones still
+        failing are in self.dead_letters afterwards.
+
+        Pass tickers (as returned by get_tickers) to skip listing them again.
         """
-        tickers = self.get_tickers()
+        deadline = deadline or Deadline()
+        if tickers is None:
+            tickers = self.get_tickers(deadline=deadline)
         all_data = []
+
+        resumed = {}
+        if checkpoint is not None:
+            try:
+                resumed = checkpoint.load()
+            except Exception as e:
+                self.logger.warning(f"Could not load the scrape checkpoint, scraping everything: {e}")
+        to_fetch = [ticker_info for ticker_info in tickers if ticker_info['symbol'] not in resumed]
+        if resumed:
+            self.logger.info(f"Resuming scrape: {len(tickers) - len(to_fetch)} stocks already checkpointed")
         
-        self.logger.info(f"Starting scrape for {len(tickers)} stocks with {self.max_workers} threads...")
-        
-        failed_tickers = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            results = list(executor.map(self.get_stock_data, tickers))
+        self.logger.info(f"Starting scrape for {len(to_fetch)} stocks with {self.max_workers} threads...")
+        results = self.scrape_tickers(to_fetch, deadline=deadline, checkpoint=checkpoint)
+        results.update(resumed)
 
-            for ticker_info, res in zip(tickers, results):
-                if res is not None:
-                    all_data.append(res)
-                else:
-                    failed_tickers.append(ticker_info['symbol'])
+        failed_tickers = []
+        skipped_tickers = []
+        for ticker_info in tickers:
+            res = results[ticker_info['symbol']]
+            if res is _SKIPPED:
+                skipped_tickers.append(ticker_info['symbol'])
+            elif res is not None:
+                all_data.append(res)
+            else:
+                failed_tickers.append(ticker_info['symbol'])
 
         if failed_tickers:
             self.logger.warning(f"Failed to scrape {len(failed_tickers)} tickers: {failed_tickers}")
+        if skipped_tickers:
+            reason = "Shutdown requested" if deadline.cancelled() else "Time budget exhausted"
+            self.logger.warning(f"{reason}; skipped {len(skipped_tickers)} tickers")
         self.logger.info(f"Scraping complete. Collected data for {len(all_data)}/{len(tickers)} stocks.")
         return all_data
 
+    def scrape_symbols(self, tickers, deadline=None):
+        """
+        Scrape just the given tickers ([{'symbol', 'url'}], e.g. last cycle's dead
+        letters) without listing the whole site: same retry pass and dead letters
+        as a full scrape, numeric fields cleaned. Returns the records that succeeded.
+        """
+        results = self.scrape_tickers(tickers, deadline=deadline)
+        records = [res for res in results.values() if res is not None and res is not _SKIPPED]
+        self.logger.info(f"Targeted scrape recovered {len(records)}/{len(tickers)} stocks.")
+        return records
+
+
 if __name__ == "__main__":
     # Simple test run
     scraper = DripInvestingScraper(max_workers=4)
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class HedgePolicy:
+    """
+    When to send a duplicate ("hedged") request for a slow call, and how many.
+
+    Latencies of the calls made so far are kept in a sliding window; once a call
+    has been running longer than the window's `percentile`, hedged_call sends a
+    second copy and takes whichever answers first. Hedges are capped at
+    `budget_fraction` of the calls made, so a site that is slow across the board
+    doesn't get double the load.
+    """
+
+    def __init__(self, percentile=95, budget_fraction=0.05, min_samples=20, min_delay=1.0, window=500):
+        """
+        :param percentile: latency percentile (0-100) after which a call is hedged
+        :param budget_fraction: most hedges allowed, as a fraction of the calls made
+        :param min_samples: latencies needed before hedging starts (no hedging on a cold start)
+        :param min_delay: never hedge sooner than this many seconds into a call
+        :param window: how many recent latencies the percentile is computed over
+        """
+        self.percentile = percentile
+        self.budget_fraction = budget_fraction
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def reset(self):
+        """Forget latencies and counts, e.g. at the start of a new scrape."""
+        with self._lock:
+            self._latencies.clear()
+            self.calls = self.hedges = self.hedges_won = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def note_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def delay(self):
+        """Seconds to wait on a call before hedging it; None while there are too few samples."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return max(self.min_delay, latencies[index])
+
+    def try_acquire(self):
+        """Take one hedge from the budget; False once it's spent."""
+        with self._lock:
+            if self.hedges + 1 > self.budget_fraction * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def note_hedge_won(self):
+        with self._lock:
+            self.hedges_won += 1
+
+
+def hedged_call(executor, call, policy):
+    """
+    Run call() on executor; if it is still running after policy.delay() and the
+    budget allows, run a second call() and return whichever result comes first.
+    The slower copy is left to finish on its own and its result is dropped. An
+    exception is only raised when both copies fail (the first call's).
+
+    :param executor: concurrent.futures executor the calls run on; it needs a spare
+        worker for each hedge, or the hedge just queues behind the calls
+    :param call: no-argument callable, safe to run twice concurrently
+    :param policy: the HedgePolicy deciding when (and whether) to hedge
+    """
+    def timed():
+        started = time.monotonic()
+        try:
+            return call()
+        finally:
+            policy.record(time.monotonic() - started)
+
+    policy.note_call()
+    first = executor.submit(timed)
+    delay = policy.delay()
+    if delay is None:
+        return first.result()
+    done, _ = wait([first], timeout=delay)
+    if done or not policy.try_acquire():
+        return first.result()
+
+    second = executor.submit(timed)
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in (first, second):
+            if future in done and future.exception() is None:
+                if future is second:
+                    policy.note_hedge_won()
+                return future.result()
+    return first.result()
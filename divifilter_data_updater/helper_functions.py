@@ -1,8 +1,19 @@
-import pandas as pd
+from __future__ import annotations
+
 from datetime import datetime
+import functools
 import random
 import time
 import logging
+from divifilter_data_updater.lazy_imports import LazyModule
+from divifilter_data_updater.schema import PANDAS_DTYPES
+from divifilter_data_updater.stock_record import StockRecord, records_to_columns
+from divifilter_data_updater.validation import validate_records, log_validation_report
+
+# Only the dataframe helpers need pandas; the scrape -> DB path runs without it
+pd = LazyModule("pandas")
+# Only clean_numeric_series needs NumPy
+np = LazyModule("numpy")
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +26,34 @@ def radar_dict_to_table(radar_dict: dict) -> pd.DataFrame:
 
     :return radar_df: The dict but in table/dataframe form
     """
-    radar_df = pd.DataFrame.from_dict(radar_dict, orient='index')
-    return radar_df
+    return coerce_frame_dtypes(_radar_dict_to_frame(radar_dict))
+
+
+def _radar_dict_to_frame(radar_dict: dict) -> pd.DataFrame:
+    """Untyped dataframe of a ticker -> record mapping; StockRecords are read column-wise."""
+    if radar_dict and all(isinstance(record, StockRecord) for record in radar_dict.values()):
+        return pd.DataFrame(records_to_columns(list(radar_dict.values())), index=list(radar_dict))
+    return pd.DataFrame.from_dict(radar_dict, orient='index')
+
+
+def coerce_frame_dtypes(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast every schema-registered column of the dataframe to its declared dtype
+    (nullable ints, floats, strings as object); unregistered columns are left alone
+
+    :param data_frame: The dataframe to cast
+
+    :return data_frame: The same data with typed columns
+    """
+    for column in data_frame.columns:
+        dtype = PANDAS_DTYPES.get(column)
+        if dtype is None or dtype == "object":
+            continue
+        values = pd.to_numeric(data_frame[column], errors="coerce")
+        if dtype.startswith("Int"):
+            values = values.round()
+        data_frame[column] = values.astype(dtype)
+    return data_frame
 
 
 def remove_unneeded_columns(radar_dict: dict, unneeded_column_list: list) -> dict:
@@ -60,35 +97,18 @@ def random_delay(max_delay_time: int, stop_event=None):
 _MAGNITUDE_MULTIPLIERS = {'K': 1e3, 'M': 1e6, 'B': 1e9, 'T': 1e12}
 
 
-# Conservative sanity bounds (low, high); None means unbounded on that side.
-# Values outside these are treated as obviously-bad data and nulled before persist.
-_VALIDATION_BOUNDS = {
-    "Price": (0, None),          # a real stock price is positive
-    "Div Yield": (0, 100),       # a yield above 100% is a data glitch
-    "5Y Avg Yield": (0, 100),
-}
-
-
 def validate_radar_data(radar_dict: dict) -> dict:
     """
-    Null out implausible numeric values in-place (conservative bounds only) so
-    obviously-bad scraped data doesn't reach the DB. Logs each correction.
+    Apply the declared validation rules (see validation.VALIDATION_RULES) to the
+    scraped data in one vectorized pass: implausible values are nulled in place so
+    obviously-bad data doesn't reach the DB, and violations are logged as one
+    aggregated line per rule.
 
     :param radar_dict: ticker -> {column: value} mapping (modified in place)
     :return radar_dict: the same dict, with out-of-range values set to None
     """
-    for symbol, record in radar_dict.items():
-        for field, (low, high) in _VALIDATION_BOUNDS.items():
-            value = record.get(field)
-            if value is None:
-                continue
-            try:
-                numeric = float(value)
-            except (ValueError, TypeError):
-                continue
-            if (low is not None and numeric < low) or (high is not None and numeric > high):
-                logger.warning("Dropping out-of-range %s=%s for %s", field, value, symbol)
-                record[field] = None
+    report = validate_records(radar_dict)
+    log_validation_report(report, len(radar_dict))
     return radar_dict
 
 
@@ -122,3 +142,153 @@ def clean_numeric_value(value):
         return round(float(cleaned) * multiplier, 2)
     except (ValueError, AttributeError):
         return None
+
+
+# Character classes for clean_numeric_series' fast path, indexed by code point.
+# Anything else (whitespace, exponents, 'N/A', non-ASCII) is _CHAR_OTHER and
+# sends that cell through clean_numeric_value itself.
+# Padding and dropped characters sort first so 'class > _CHAR_DROPPED' means kept.
+_CHAR_PAD, _CHAR_DROPPED, _CHAR_DIGIT, _CHAR_POINT, _CHAR_SIGN, _CHAR_SUFFIX, _CHAR_OTHER = range(7)
+
+# Up to 15 significant digits the mantissa and 10**decimals are exact doubles, so
+# their quotient is the correctly rounded value float() would return.
+_MAX_EXACT_DIGITS = 15
+_CLEAN_CHUNK_ROWS = 16384
+
+
+@functools.cache
+def _character_tables():
+    """The code point -> character class and K/M/B/T multiplier lookup arrays, built on first use."""
+    char_classes = np.full(128, _CHAR_OTHER, dtype=np.uint8)
+    char_classes[0] = _CHAR_PAD
+    for characters, char_class in (("$,%xX", _CHAR_DROPPED), ("0123456789", _CHAR_DIGIT), (".", _CHAR_POINT),
+                                   ("-+", _CHAR_SIGN), ("KMBTkmbt", _CHAR_SUFFIX)):
+        char_classes[[ord(c) for c in characters]] = char_class
+    suffix_multipliers = np.ones(128)
+    for suffix, multiplier in _MAGNITUDE_MULTIPLIERS.items():
+        suffix_multipliers[[ord(suffix), ord(suffix.lower())]] = multiplier
+    return char_classes, suffix_multipliers
+
+
+def _parse_numeric_codes(codes: np.ndarray):
+    """
+    Parse an (n, width) matrix of code points (0-padded strings) the way
+    clean_numeric_value does, before rounding: formatting characters are
+    skipped, an optional leading sign and trailing K/M/B/T are honoured, and the
+    digits are accumulated one character position at a time across all rows.
+
+    :return values: float64 array, NaN where the text isn't a number
+    :return fallback: bool mask of rows the fast path can't decide, which need clean_numeric_value
+    """
+    char_classes, suffix_multipliers = _character_tables()
+    rows, width = codes.shape
+    # Position-major, so every step below is a contiguous 1-D op over all rows
+    positions = np.ascontiguousarray(np.minimum(codes, 127).T).astype(np.uint8)
+    classes = char_classes[positions]
+    kept = classes > _CHAR_DROPPED
+
+    first = np.full(rows, -1)
+    last = np.full(rows, -1)
+    for position in range(width):
+        last = np.where(kept[position], position, last)
+        first = np.where(kept[position] & (first < 0), position, first)
+    has_text = first >= 0
+    row_index = np.arange(rows)
+    first_class = np.where(has_text, classes[np.maximum(first, 0), row_index], _CHAR_PAD)
+    last_code = positions[np.maximum(last, 0), row_index]
+    signed = first_class == _CHAR_SIGN
+    negative = signed & (positions[np.maximum(first, 0), row_index] == ord("-"))
+    suffix = has_text & (char_classes[last_code] == _CHAR_SUFFIX)
+    multipliers = np.where(suffix, suffix_multipliers[last_code], 1.0)
+    first = np.where(signed, first, -1)
+    last = np.where(suffix, last, -1)
+
+    mantissa = np.zeros(rows, dtype=np.int64)
+    digit_count = np.zeros(rows, dtype=np.int32)
+    decimals = np.zeros(rows, dtype=np.int32)
+    point_count = np.zeros(rows, dtype=np.int32)
+    malformed = np.zeros(rows, dtype=bool)
+    fallback = np.zeros(rows, dtype=bool)
+    for position in range(width):
+        position_classes = classes[position]
+        fallback |= position_classes == _CHAR_OTHER
+        in_body = kept[position] & (first != position) & (last != position)
+        digit = in_body & (position_classes == _CHAR_DIGIT)
+        point = in_body & (position_classes == _CHAR_POINT)
+        malformed |= in_body & ~(digit | point)
+        mantissa = np.where(digit, mantissa * 10 + (positions[position].astype(np.int64) - ord("0")), mantissa)
+        decimals += digit & (point_count > 0)
+        digit_count += digit
+        point_count += point
+
+    valid = ~malformed & (point_count <= 1) & (digit_count > 0)
+    fallback |= valid & (digit_count > _MAX_EXACT_DIGITS)
+    valid &= ~fallback
+    values = np.where(negative, -1.0, 1.0) * mantissa / 10.0 ** decimals * multipliers
+    values[~valid] = np.nan
+    return values, fallback
+
+
+def clean_numeric_series(values):
+    """
+    Column-wise clean_numeric_value: strip formatting characters, scale K/M/B/T
+    suffixes and round to 2 decimals with NumPy array ops instead of a Python
+    call per cell. Opt-in for bulk columns (the scrape cleans record by record
+    with clean_numeric_value). Gives the same numbers as clean_numeric_value, with NaN where
+    it would return None. Cells outside the plain "-$1,234.5M" shape (whitespace,
+    exponents, placeholders like 'N/A') go through clean_numeric_value itself.
+
+    :param values: a pandas Series or a NumPy (object) array of raw cell values
+
+    :return cleaned: float64 Series (same index) for a Series, else a float64 array
+    """
+    # Arrays don't need pandas, so don't import it just for the isinstance check
+    is_series = not isinstance(values, np.ndarray) and isinstance(values, pd.Series)
+    if is_series and pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        array = values.to_numpy(dtype="float64", na_value=np.nan)
+    else:
+        array = values.to_numpy() if is_series else np.asarray(values)
+    if array.dtype.kind in "iuf":
+        numbers = array.astype("float64")
+    else:
+        # str() of None is 'None', which clean_numeric_value also rejects
+        raw = array.astype(object)
+        numbers = np.empty(len(raw))
+        for start in range(0, len(raw), _CLEAN_CHUNK_ROWS):
+            text = raw[start:start + _CLEAN_CHUNK_ROWS].astype(str)
+            codes = text.view(np.uint32).reshape(len(text), -1)
+            chunk, fallback = _parse_numeric_codes(codes)
+            for index in np.nonzero(fallback)[0]:
+                value = clean_numeric_value(raw[start + index])
+                chunk[index] = np.nan if value is None else value
+            numbers[start:start + len(chunk)] = chunk
+
+    rounded = np.round(numbers, 2)
+    # NumPy rounds x * 100 half-to-even while round() works from the exact decimal
+    # value; they can only disagree on ties, so redo just those the Python way.
+    with np.errstate(invalid="ignore"):
+        scaled = numbers * 100
+        ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for index in np.nonzero(ties)[0]:
+        rounded[index] = round(float(numbers[index]), 2)
+
+    if is_series:
+        return pd.Series(rounded, index=values.index, name=values.name)
+    return rounded
+
+
+def clean_numeric_records(records: list, columns) -> list:
+    """
+    clean_numeric_value the given columns of every record dict, in place. Records
+    missing a column are left without it; values that don't parse become None.
+
+    :param records: list of {column: value} dicts
+    :param columns: the columns to clean
+
+    :return records: the same list, with cleaned floats (or None) in those columns
+    """
+    for record in records:
+        for column in columns:
+            if column in record:
+                record[column] = clean_numeric_value(record[column])
+    return records
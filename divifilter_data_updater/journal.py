@@ -0,0 +1,213 @@
+import functools
+import json
+import logging
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Each record: magic, payload length and CRC-32 of the payload, then the zlib-compressed JSON payload
+_MAGIC = b"DVJ1"
+_HEADER = struct.Struct(">4sII")
+# Rewrite the file once this many acknowledged entries are kept alive by an older pending one
+COMPACT_AFTER_ACKS = 16
+# Entries that keep failing are moved to this file next to the journal
+FAILED_SUFFIX = ".failed"
+
+
+class Journal:
+    """
+    Local append-only write-ahead journal for DB writes too expensive to redo
+    (a full scrape, a Yahoo refresh): an entry is appended, fsynced, before the
+    DB write it describes and acknowledged after it, so when the DB is
+    unreachable the data survives on disk and replay() applies it later.
+
+    Every record is compressed and checksummed. A torn or corrupt tail (a crash
+    mid-append) is cut off when the journal is opened; everything before it is
+    kept. Once no entry is pending the file is truncated, and a long run of
+    acknowledged entries behind a pending one is compacted away.
+
+    Replaying an entry must be idempotent (the DB writes are upserts, or replace
+    the table with the same data), since a crash between the DB write and its
+    acknowledgement replays it again. Failed attempts are recorded too, so an
+    entry that can never be written is moved aside to '<path>.failed' after a
+    few tries instead of blocking every entry behind it.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: the journal file; its directory is created if missing
+        """
+        self.path = path
+        self.failed_path = path + FAILED_SUFFIX
+        self._lock = threading.Lock()
+        # entry id -> (kind, payload), oldest first
+        self._pending = {}
+        # entry id -> failed attempts at its write
+        self._attempts = {}
+        self._acked = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def _encode(entry):
+        blob = zlib.compress(json.dumps(entry, default=str).encode("utf-8"))
+        return _HEADER.pack(_MAGIC, len(blob), zlib.crc32(blob)) + blob
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as journal_file:
+            data = journal_file.read()
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            magic, length, checksum = _HEADER.unpack_from(data, offset)
+            blob = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if magic != _MAGIC or len(blob) != length or zlib.crc32(blob) != checksum:
+                break
+            try:
+                entry = json.loads(zlib.decompress(blob))
+            except (zlib.error, ValueError):
+                break
+            if "ack" in entry:
+                self._pending.pop(entry["ack"], None)
+                self._attempts.pop(entry["ack"], None)
+                self._acked += 1
+            elif "failed" in entry:
+                if entry["failed"] in self._pending:
+                    self._attempts[entry["failed"]] = self._attempts.get(entry["failed"], 0) + 1
+            else:
+                self._pending[entry["id"]] = (entry["kind"], entry["payload"])
+                if entry.get("attempts"):
+                    self._attempts[entry["id"]] = entry["attempts"]
+            offset += _HEADER.size + length
+        if offset < len(data):
+            logger.warning("Journal %s has %s unreadable bytes at offset %s (a torn write?); dropping them.",
+                           self.path, len(data) - offset, offset)
+            with open(self.path, "r+b") as journal_file:
+                journal_file.truncate(offset)
+
+    def _append(self, entries, path=None):
+        with open(path or self.path, "ab") as journal_file:
+            journal_file.write(b"".join(self._encode(entry) for entry in entries))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def append(self, kind, payload):
+        """
+        Durably record a write about to be made.
+
+        :param kind: what the entry is, picking its replay handler
+        :param payload: JSON-serializable data the write needs (anything else is str()-ed)
+
+        :return entry_id: to acknowledge the entry with once the write is done
+        """
+        entry_id = uuid.uuid4().hex
+        with self._lock:
+            self._append([{"id": entry_id, "kind": kind, "payload": payload}])
+            self._pending[entry_id] = (kind, payload)
+        return entry_id
+
+    def ack(self, entry_id):
+        """Mark an entry's write as done; the journal compacts itself as entries are acknowledged."""
+        with self._lock:
+            if self._pending.pop(entry_id, None) is None:
+                return
+            self._attempts.pop(entry_id, None)
+            if not self._pending:
+                # Nothing left to replay: start over with an empty file
+                open(self.path, "wb").close()
+                self._acked = 0
+                return
+            self._append([{"ack": entry_id}])
+            self._acked += 1
+            if self._acked >= COMPACT_AFTER_ACKS:
+                self._compact()
+
+    def fail(self, entry_id):
+        """
+        Record a failed attempt at an entry's write.
+
+        :return attempts: how many attempts at it have failed so far; 0 if it's no longer pending
+        """
+        with self._lock:
+            if entry_id not in self._pending:
+                return 0
+            self._append([{"failed": entry_id}])
+            self._attempts[entry_id] = self._attempts.get(entry_id, 0) + 1
+            return self._attempts[entry_id]
+
+    def set_aside(self, entry_id):
+        """Move a pending entry to failed_path, where it's kept for inspection but never replayed."""
+        with self._lock:
+            if entry_id not in self._pending:
+                return
+            self._append([self._entry(entry_id)], self.failed_path)
+        self.ack(entry_id)
+
+    def pending(self):
+        """The unacknowledged entries, oldest first, as (entry_id, kind, payload)."""
+        with self._lock:
+            return [(entry_id, kind, payload) for entry_id, (kind, payload) in self._pending.items()]
+
+    def _entry(self, entry_id):
+        kind, payload = self._pending[entry_id]
+        entry = {"id": entry_id, "kind": kind, "payload": payload}
+        if self._attempts.get(entry_id):
+            entry["attempts"] = self._attempts[entry_id]
+        return entry
+
+    def _compact(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as journal_file:
+            journal_file.write(b"".join(self._encode(self._entry(entry_id)) for entry_id in self._pending))
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(temp_path, self.path)
+        self._acked = 0
+
+    def compact(self):
+        """Rewrite the file with only the pending entries."""
+        with self._lock:
+            self._compact()
+
+    def replay(self, handlers, max_attempts=None):
+        """
+        Apply the pending entries, oldest first. Each handler gets the entry's
+        payload and an ack callable to acknowledge the entry as soon as its data
+        is committed; entries are acknowledged when their handler returns in any
+        case. Stops at the first handler that raises (re-raising it), so a later
+        entry never overtakes an earlier one, unless that was the entry's
+        max_attempts-th failed attempt: it is then set aside and replay goes on.
+        Entries of a kind without a handler are dropped with a warning.
+
+        :param handlers: {kind: callable(payload, ack)}
+        :param max_attempts: failed attempts after which an entry is set aside; None to retry forever
+
+        :return replayed: how many entries were applied
+        """
+        replayed = 0
+        for entry_id, kind, payload in self.pending():
+            handler = handlers.get(kind)
+            if handler is None:
+                logger.warning("Dropping journal entry %s of unknown kind %r.", entry_id, kind)
+                self.ack(entry_id)
+                continue
+            try:
+                handler(payload, functools.partial(self.ack, entry_id))
+            except Exception as e:
+                attempts = self.fail(entry_id)
+                if max_attempts is None or attempts < max_attempts:
+                    raise
+                logger.error("Journal entry %s (%s) failed %s times, last with %s; moving it to %s.",
+                             entry_id, kind, attempts, e, self.failed_path)
+                self.set_aside(entry_id)
+                continue
+            replayed += 1
+            self.ack(entry_id)
+        return replayed
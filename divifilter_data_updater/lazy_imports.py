@@ -0,0 +1,45 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a heavy module (pandas, yfinance) that imports it on first
+    attribute access, so importing the updater doesn't pay for libraries a run
+    may never use. `pd = LazyModule("pandas")` is then used exactly like
+    `import pandas as pd`, and unittest.mock.patch targets such as
+    "module.pd.read_sql" keep working.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not set on the proxy itself
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def lazy_callable(module_name, attribute):
+    """
+    Stand-in for `from module_name import attribute` when the attribute is a
+    function or class that is only called: the module is imported on the first
+    call. The stand-in is a plain module-level name, so it can be patched in
+    tests exactly like the eager import it replaces.
+    """
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, attribute)(*args, **kwargs)
+
+    call.__name__ = call.__qualname__ = attribute
+    call.__doc__ = f"Calls {module_name}.{attribute}, importing {module_name} on first use."
+    return call
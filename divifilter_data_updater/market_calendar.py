@@ -0,0 +1,106 @@
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# NYSE regular session, in exchange-local time
+NYSE_TIMEZONE = "America/New_York"
+NYSE_OPEN = time(9, 30)
+NYSE_CLOSE = time(16, 0)
+NYSE_EARLY_CLOSE = time(13, 0)
+
+# Full-day closures, as published by the NYSE. Extend this when the exchange
+# publishes the next year; days in years not listed here fall back to weekdays only.
+NYSE_HOLIDAYS = frozenset(date.fromisoformat(day) for day in (
+    "2025-01-01", "2025-01-09", "2025-01-20", "2025-02-17", "2025-04-18", "2025-05-26",
+    "2025-06-19", "2025-07-04", "2025-09-01", "2025-11-27", "2025-12-25",
+    "2026-01-01", "2026-01-19", "2026-02-16", "2026-04-03", "2026-05-25", "2026-06-19",
+    "2026-07-03", "2026-09-07", "2026-11-26", "2026-12-25",
+    "2027-01-01", "2027-01-18", "2027-02-15", "2027-03-26", "2027-05-31", "2027-06-18",
+    "2027-07-05", "2027-09-06", "2027-11-25", "2027-12-24",
+))
+# Sessions that close at NYSE_EARLY_CLOSE
+NYSE_EARLY_CLOSES = frozenset(date.fromisoformat(day) for day in (
+    "2025-07-03", "2025-11-28", "2025-12-24",
+    "2026-11-27", "2026-12-24",
+    "2027-11-26",
+))
+
+# Prices can still be revised for a while after the closing auction
+AFTER_CLOSE_SETTLE_SECONDS = 900
+
+
+class MarketCalendar:
+    """
+    Offline exchange calendar: trading sessions from fixed hours plus holiday and
+    early-close tables, no network lookups. Times go in and out as naive UTC
+    datetimes, like the rest of the updater's timestamps.
+    """
+
+    def __init__(self, tz=NYSE_TIMEZONE, open_time=NYSE_OPEN, close_time=NYSE_CLOSE,
+                 early_close_time=NYSE_EARLY_CLOSE, holidays=NYSE_HOLIDAYS, early_closes=NYSE_EARLY_CLOSES):
+        """
+        :param tz: the exchange's IANA time zone
+        :param open_time: regular session open, exchange-local
+        :param close_time: regular session close, exchange-local
+        :param early_close_time: close on the days in early_closes, exchange-local
+        :param holidays: dates the exchange is closed all day
+        :param early_closes: dates the exchange closes at early_close_time
+        """
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.early_close_time = early_close_time
+        self.holidays = frozenset(holidays)
+        self.early_closes = frozenset(early_closes)
+        self.years = {day.year for day in self.holidays}
+
+    def covers(self, day):
+        """True if the holiday tables include day's year."""
+        return day.year in self.years
+
+    def _to_utc(self, day, local_time):
+        return datetime.combine(day, local_time, self.tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def session(self, day):
+        """
+        The (open, close) of the trading session on the exchange-local date day,
+        as naive UTC datetimes; None if the exchange is closed that day.
+        """
+        if day.weekday() >= 5 or day in self.holidays:
+            return None
+        close_time = self.early_close_time if day in self.early_closes else self.close_time
+        return self._to_utc(day, self.open_time), self._to_utc(day, close_time)
+
+    def _local_date(self, now):
+        return now.replace(tzinfo=timezone.utc).astimezone(self.tz).date()
+
+    def is_open(self, now):
+        session = self.session(self._local_date(now))
+        return session is not None and session[0] <= now < session[1]
+
+    def next_open(self, now):
+        """The first session open after now (naive UTC)."""
+        day = self._local_date(now)
+        while True:
+            session = self.session(day)
+            if session is not None and session[0] > now:
+                return session[0]
+            day += timedelta(days=1)
+
+    def next_refresh(self, now, interval_seconds, settle_seconds=AFTER_CLOSE_SETTLE_SECONDS):
+        """
+        When prices are next worth refreshing, given a refresh just ran at now:
+        every interval_seconds during a session, once settle_seconds after its
+        close, then not again until the next session opens.
+
+        :param now: time of the refresh that just ran (naive UTC)
+        :param interval_seconds: refresh interval while the market is open
+        :param settle_seconds: delay after the close for the post-close refresh
+
+        :return next_refresh: naive UTC datetime of the next refresh
+        """
+        session = self.session(self._local_date(now))
+        if session is not None:
+            after_close = session[1] + timedelta(seconds=settle_seconds)
+            if session[0] <= now < after_close:
+                return min(now + timedelta(seconds=interval_seconds), after_close)
+        return self.next_open(now)
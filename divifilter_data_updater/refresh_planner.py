@@ -0,0 +1,49 @@
+from datetime import datetime
+
+# Per-row freshness timestamps (UTC) are stored in this format, so they also sort as text
+FRESHNESS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _age_seconds(refreshed_at, now):
+    if not refreshed_at:
+        return float("inf")
+    try:
+        return (now - datetime.strptime(refreshed_at, FRESHNESS_FORMAT)).total_seconds()
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def plan_refresh(candidates, now, budget=0, popular_count=0, popular_max_age_seconds=0):
+    """
+    Order symbols for a refresh, stalest first, within a per-cycle budget.
+
+    The popular_count largest stocks (by the popularity value, e.g. market cap)
+    that are older than popular_max_age_seconds go first, so they never wait
+    behind the long tail; everything else follows stalest first, never-refreshed
+    rows leading. A budget smaller than the table therefore works through the
+    whole table over a few cycles instead of refreshing the same head each time.
+
+    :param candidates: iterable of (symbol, refreshed_at, popularity); refreshed_at is a
+        FRESHNESS_FORMAT string or None if never refreshed, popularity None if unknown
+    :param now: the current UTC time (naive datetime, like the stored timestamps)
+    :param budget: most symbols to return; 0 for all of them
+    :param popular_count: how many of the most popular symbols get the max-age guarantee
+    :param popular_max_age_seconds: age after which a popular symbol jumps the queue
+
+    :return symbols: the symbols to refresh, in order
+    """
+    candidates = [(symbol, _age_seconds(refreshed_at, now), popularity)
+                  for symbol, refreshed_at, popularity in candidates]
+    ranked = sorted((c for c in candidates if c[2] is not None), key=lambda c: c[2], reverse=True)
+    popular = {symbol for symbol, _, _ in ranked[:popular_count]}
+
+    def stalest_first(candidate):
+        symbol, age, _ = candidate
+        return -age, symbol
+
+    due_popular = sorted((c for c in candidates if c[0] in popular and c[1] >= popular_max_age_seconds),
+                         key=stalest_first)
+    due = {symbol for symbol, _, _ in due_popular}
+    rest = sorted((c for c in candidates if c[0] not in due), key=stalest_first)
+    symbols = [symbol for symbol, _, _ in due_popular + rest]
+    return symbols[:budget] if budget else symbols
@@ -0,0 +1,111 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJob:
+    """
+    One independently scheduled unit of work: `action` runs once at start and then
+    again every `interval_seconds` plus a random 0..`jitter_seconds`, until the stop
+    event is set. A `schedule` callable, if given, replaces the fixed interval: it
+    is asked after each run for the seconds until the next one. An exception in one run is logged and the job simply waits for
+    its next run, so a failing job never takes the others down.
+    """
+
+    def __init__(self, name, action, interval_seconds, jitter_seconds=0, schedule=None):
+        self.name = name
+        self.action = action
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+        self.schedule = schedule
+        self.runs = 0
+        self.failures = 0
+        # monotonic time the current wait/run is expected to be over by; see is_overdue
+        self.due_by = None
+
+    def next_delay(self):
+        interval = self.interval_seconds if self.schedule is None else self.schedule()
+        return interval + random.uniform(0, self.jitter_seconds)
+
+    def run_once(self):
+        started = time.monotonic()
+        try:
+            self.action()
+        except Exception as e:
+            self.failures += 1
+            logger.exception("Scheduled job %s failed: %s", self.name, e)
+        finally:
+            self.runs += 1
+            logger.info("Scheduled job %s finished in %.1fs", self.name, time.monotonic() - started)
+
+    def run_forever(self, stop_event, max_run_seconds):
+        """Run until stop_event is set; a run in progress is allowed to finish first."""
+        while not stop_event.is_set():
+            self.due_by = time.monotonic() + max_run_seconds
+            self.run_once()
+            delay = self.next_delay()
+            self.due_by = time.monotonic() + delay + max_run_seconds
+            stop_event.wait(delay)
+
+    def is_overdue(self, now=None):
+        """True once the job has spent longer than expected in a run (i.e. looks hung)."""
+        now = time.monotonic() if now is None else now
+        return self.due_by is not None and now > self.due_by
+
+
+class Scheduler:
+    """
+    Run ScheduledJobs concurrently, each in its own thread, until stop_event is set.
+
+    The jobs share nothing but what they pass through the database (and whatever
+    locks their actions take); the scheduler only starts them, watches that none
+    of them is hung and reports liveness through `heartbeat`.
+    """
+
+    def __init__(self, jobs, stop_event, max_run_seconds=6 * 3600, heartbeat=None, heartbeat_interval=60):
+        """
+        :param jobs: the ScheduledJobs to run
+        :param stop_event: threading.Event; once set no new runs start and run() returns
+            after the jobs' current runs finish
+        :param max_run_seconds: how long a single run may take before the job counts as hung
+        :param heartbeat: optional callable, called every heartbeat_interval seconds while no job is hung
+        :param heartbeat_interval: seconds between heartbeat checks
+        """
+        self.jobs = list(jobs)
+        self.stop_event = stop_event
+        self.max_run_seconds = max_run_seconds
+        self.heartbeat = heartbeat
+        self.heartbeat_interval = heartbeat_interval
+        self._threads = []
+
+    def start(self):
+        for job in self.jobs:
+            thread = threading.Thread(target=job.run_forever, args=(self.stop_event, self.max_run_seconds),
+                                      name=f"job-{job.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started scheduled jobs: %s", ", ".join(
+            f"{job.name} every {job.interval_seconds}s (+{job.jitter_seconds}s jitter)" for job in self.jobs))
+
+    def overdue_jobs(self):
+        return [job.name for job in self.jobs if job.is_overdue()]
+
+    def run(self):
+        """Start the jobs, block until stop_event is set, then wait for in-flight runs to finish."""
+        self.start()
+        while not self.stop_event.is_set():
+            overdue = self.overdue_jobs()
+            if overdue:
+                # Stop refreshing the heartbeat so the healthcheck flags the hang
+                logger.error("Scheduled jobs look hung: %s", ", ".join(overdue))
+            elif self.heartbeat is not None:
+                self.heartbeat()
+            self.stop_event.wait(self.heartbeat_interval)
+        self.join()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
@@ -0,0 +1,147 @@
+import math
+from typing import NamedTuple
+
+from sqlalchemy import String, SmallInteger, Integer, BigInteger, Float, Double
+from sqlalchemy.types import TypeEngine
+
+
+class ColumnSpec(NamedTuple):
+    """
+    Declared shape of one dividend_data_table column.
+
+    :param sql_type: the SQLAlchemy type used for DDL and staging-table dtypes;
+        integer/float types also mark the column as numeric for scraper cleaning
+    :param essential: always present on a scraped record (None when the page lacks it)
+    """
+    sql_type: TypeEngine
+    essential: bool = False
+
+
+# The one place dividend_data_table's columns are defined. The scraper's numeric
+# cleaning and essential-column fill, the DataFrame dtypes, the staging table
+# dtype map and the CREATE TABLE DDL are all derived from this mapping.
+DIVIDEND_DATA_SCHEMA = {
+    "Symbol": ColumnSpec(String(32)),
+    "Company": ColumnSpec(String(255), essential=True),
+    "Sector": ColumnSpec(String(255), essential=True),
+    "Industry": ColumnSpec(String(255), essential=True),
+    "No Years": ColumnSpec(SmallInteger(), essential=True),
+    "Price": ColumnSpec(Float(), essential=True),
+    "Div Yield": ColumnSpec(Float(), essential=True),
+    "5Y Avg Yield": ColumnSpec(Float(), essential=True),
+    "Current Div": ColumnSpec(Float(), essential=True),
+    "Payouts/ Year": ColumnSpec(String(32), essential=True),
+    "Annualized": ColumnSpec(Float(), essential=True),
+    "Low": ColumnSpec(Float(), essential=True),
+    "High": ColumnSpec(Float(), essential=True),
+    "DGR 1Y": ColumnSpec(Float(), essential=True),
+    "DGR 3Y": ColumnSpec(Float(), essential=True),
+    "DGR 5Y": ColumnSpec(Float(), essential=True),
+    "DGR 10Y": ColumnSpec(Float(), essential=True),
+    "TTR 1Y": ColumnSpec(Float(), essential=True),
+    "TTR 3Y": ColumnSpec(Float(), essential=True),
+    "Fair Value": ColumnSpec(Float(), essential=True),
+    "FV %": ColumnSpec(Float(), essential=True),
+    "Chowder Number": ColumnSpec(Float(), essential=True),
+    "Revenue 1Y": ColumnSpec(Float(), essential=True),
+    "NPM": ColumnSpec(Float(), essential=True),
+    "CF/Share": ColumnSpec(Float(), essential=True),
+    "ROE": ColumnSpec(Float(), essential=True),
+    "Debt/Capital": ColumnSpec(Float(), essential=True),
+    "ROTC": ColumnSpec(Float(), essential=True),
+    "P/E": ColumnSpec(Float(), essential=True),
+    "P/BV": ColumnSpec(Float(), essential=True),
+    "PEG": ColumnSpec(Float(), essential=True),
+    # Market Cap runs into the trillions; single-precision FLOAT would lose digits.
+    "Market Cap": ColumnSpec(Double()),
+    "Payout Ratio": ColumnSpec(Float()),
+    "Price Change": ColumnSpec(String(32)),
+    "Price Change %": ColumnSpec(String(32)),
+    "Previous Div": ColumnSpec(String(32)),
+    "Fair Value (P/E 10)": ColumnSpec(String(32)),
+    "FV (P/E 10) %": ColumnSpec(String(32)),
+    "Fair Value (Peter Lynch)": ColumnSpec(String(32)),
+    "FV (Peter Lynch) %": ColumnSpec(String(32)),
+    "Current R": ColumnSpec(String(32)),
+    "Next Earnings Report": ColumnSpec(String(64)),
+    "Ex-date": ColumnSpec(String(32)),
+    "Dividend Pay Date": ColumnSpec(String(32)),
+    # When each source last refreshed the row, UTC "%Y-%m-%d %H:%M:%S" (see refresh_planner)
+    "Drip Updated": ColumnSpec(String(32)),
+    "Yahoo Updated": ColumnSpec(String(32)),
+}
+
+# Nullable pandas dtypes for each SQL type, so a NULL in an int column doesn't
+# silently widen it to float64 (or to object when mixed with strings).
+_PANDAS_DTYPES = (
+    (SmallInteger, "Int16"),
+    (BigInteger, "Int64"),
+    (Integer, "Int32"),
+    (Float, "float64"),
+    (String, "object"),
+)
+
+
+def is_numeric(sql_type: TypeEngine) -> bool:
+    return isinstance(sql_type, (Integer, Float))
+
+
+def pandas_dtype(sql_type: TypeEngine) -> str:
+    """
+    Map a SQLAlchemy type to the pandas dtype used for it in a DataFrame.
+    Double is a Float subclass and BigInteger/SmallInteger are Integer
+    subclasses, so the most specific types are checked first.
+    """
+    for type_class, dtype in _PANDAS_DTYPES:
+        if isinstance(sql_type, type_class):
+            return dtype
+    return "object"
+
+
+def _to_float(value):
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def _to_int(value):
+    number = _to_float(value)
+    return None if number is None else int(round(number))
+
+
+def _to_str(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value)
+
+
+def python_converter(sql_type: TypeEngine):
+    """
+    Return the function that turns a raw cell into the Python value bound for
+    sql_type: int or float for numeric types, str otherwise. None, NaN and values
+    that don't convert become None (like pandas' errors="coerce").
+    """
+    if isinstance(sql_type, type):
+        sql_type = sql_type()
+    if isinstance(sql_type, Integer):
+        return _to_int
+    if isinstance(sql_type, Float):
+        return _to_float
+    return _to_str
+
+
+COLUMN_TYPES = {name: spec.sql_type for name, spec in DIVIDEND_DATA_SCHEMA.items()}
+NUMERIC_COLUMNS = tuple(name for name, spec in DIVIDEND_DATA_SCHEMA.items() if is_numeric(spec.sql_type))
+ESSENTIAL_COLUMNS = tuple(name for name, spec in DIVIDEND_DATA_SCHEMA.items() if spec.essential)
+PANDAS_DTYPES = {name: pandas_dtype(spec.sql_type) for name, spec in DIVIDEND_DATA_SCHEMA.items()}
+
+# Columns kept per (snapshot_date, Symbol) in dividend_history_table: the fields
+# trend queries care about, from both the DripInvesting dataset and Yahoo.
+HISTORY_COLUMNS = (
+    "Price", "Low", "High", "Div Yield", "Current Div", "Annualized", "No Years",
+    "DGR 1Y", "DGR 3Y", "DGR 5Y", "DGR 10Y", "Chowder Number", "Payout Ratio", "P/BV",
+)
@@ -0,0 +1,124 @@
+from collections.abc import MutableMapping
+
+from divifilter_data_updater.schema import DIVIDEND_DATA_SCHEMA
+
+# Slot layout: one position per schema column, in schema order.
+RECORD_COLUMNS = tuple(DIVIDEND_DATA_SCHEMA)
+_POSITIONS = {name: position for position, name in enumerate(RECORD_COLUMNS)}
+
+# Marks a schema column the record doesn't have (distinct from a None value).
+_MISSING = object()
+
+
+class StockRecord(MutableMapping):
+    """
+    One scraped stock, stored as a fixed array of schema-column values instead of
+    a dict of ~40 string keys. Behaves as a mapping (record["Price"], "Price" in
+    record, pop, get), so the pipeline's dict-based helpers work unchanged; labels
+    outside the schema (e.g. "Website") go to a small overflow dict created on
+    first use.
+
+    Records are turned into a dataframe column-wise by records_to_frame without
+    building an intermediate dict per stock.
+    """
+    __slots__ = ("_values", "_extras")
+
+    def __init__(self, data=None, **fields):
+        self._values = [_MISSING] * len(RECORD_COLUMNS)
+        self._extras = None
+        if data:
+            self.update(data)
+        if fields:
+            self.update(fields)
+
+    def __getitem__(self, key):
+        position = _POSITIONS.get(key)
+        if position is not None:
+            value = self._values[position]
+            if value is not _MISSING:
+                return value
+        elif self._extras is not None and key in self._extras:
+            return self._extras[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        position = _POSITIONS.get(key)
+        if position is not None:
+            self._values[position] = value
+        else:
+            if self._extras is None:
+                self._extras = {}
+            self._extras[key] = value
+
+    def __delitem__(self, key):
+        position = _POSITIONS.get(key)
+        if position is not None:
+            if self._values[position] is _MISSING:
+                raise KeyError(key)
+            self._values[position] = _MISSING
+        elif self._extras is not None and key in self._extras:
+            del self._extras[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        position = _POSITIONS.get(key)
+        if position is not None:
+            return self._values[position] is not _MISSING
+        return self._extras is not None and key in self._extras
+
+    def __iter__(self):
+        for name, value in zip(RECORD_COLUMNS, self._values):
+            if value is not _MISSING:
+                yield name
+        if self._extras:
+            yield from list(self._extras)
+
+    def __len__(self):
+        return sum(value is not _MISSING for value in self._values) + len(self._extras or ())
+
+    def get(self, key, default=None):
+        position = _POSITIONS.get(key)
+        if position is not None:
+            value = self._values[position]
+            return default if value is _MISSING else value
+        return default if self._extras is None else self._extras.get(key, default)
+
+    def __reduce__(self):
+        # The _MISSING sentinel doesn't survive pickling, so rebuild from the items
+        return StockRecord, (dict(self.items()),)
+
+    def __repr__(self):
+        return f"StockRecord({dict(self.items())!r})"
+
+
+def records_to_columns(records: list) -> dict:
+    """
+    Transpose records into {column: list of values} (None where a record lacks
+    the column). StockRecords are read straight from their value arrays, schema
+    columns that no record has are left out, and other labels follow in
+    first-seen order. Plain dict records are transposed the same way.
+
+    :param records: list of StockRecord (or of dicts)
+
+    :return columns: column name -> one value per record
+    """
+    if not all(isinstance(record, StockRecord) for record in records):
+        names = {}
+        for record in records:
+            names.update(dict.fromkeys(record))
+        return {name: [record.get(name) for record in records] for name in names}
+
+    columns = {}
+    for position, name in enumerate(RECORD_COLUMNS):
+        values = [record._values[position] for record in records]
+        if any(value is not _MISSING for value in values):
+            columns[name] = [None if value is _MISSING else value for value in values]
+
+    extra_names = {}
+    for record in records:
+        if record._extras:
+            extra_names.update(dict.fromkeys(record._extras))
+    for name in extra_names:
+        columns[name] = [record._extras.get(name) if record._extras else None for record in records]
+    return columns
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from divifilter_data_updater.lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+SECTOR_SUMMARY_TABLE = "dividend_sector_summary"
+INDUSTRY_SUMMARY_TABLE = "dividend_industry_summary"
+STREAK_SUMMARY_TABLE = "dividend_streak_summary"
+
+# Primary key of each summary table, so frontend reads are single-row lookups.
+SUMMARY_PRIMARY_KEYS = {
+    SECTOR_SUMMARY_TABLE: ("Sector",),
+    INDUSTRY_SUMMARY_TABLE: ("Industry", "Sector"),
+    STREAK_SUMMARY_TABLE: ("Streak",),
+}
+
+# Columns read from dividend_data_table to build the summaries.
+SUMMARY_SOURCE_COLUMNS = ("Symbol", "Sector", "Industry", "No Years", "Div Yield", "DGR 5Y",
+                          "Payout Ratio", "Chowder Number")
+
+# Dividend streak categories as DripInvesting labels them (years of increases).
+STREAK_BUCKETS = (
+    ("Challengers", 5, 9),
+    ("Contenders", 10, 24),
+    ("Champions", 25, 49),
+    ("Kings", 50, None),
+)
+
+# Output column -> (source column, aggregation) for the sector/industry tables.
+_GROUP_AGGREGATIONS = {
+    "Stocks": ("Symbol", "count"),
+    "Median Div Yield": ("Div Yield", "median"),
+    "Mean Div Yield": ("Div Yield", "mean"),
+    "Median No Years": ("No Years", "median"),
+    "Median DGR 5Y": ("DGR 5Y", "median"),
+    "DGR 5Y P25": ("DGR 5Y", lambda values: values.quantile(0.25)),
+    "DGR 5Y P75": ("DGR 5Y", lambda values: values.quantile(0.75)),
+    "Median Payout Ratio": ("Payout Ratio", "median"),
+    "Median Chowder Number": ("Chowder Number", "median"),
+}
+
+
+def _group_summary(data_frame: pd.DataFrame, group_columns: list) -> pd.DataFrame:
+    summary = data_frame.groupby(group_columns, dropna=True).agg(**_GROUP_AGGREGATIONS)
+    return summary.round(2).reset_index()
+
+
+def _streak_summary(data_frame: pd.DataFrame) -> pd.DataFrame:
+    years = data_frame["No Years"].astype("float64")
+    rows = []
+    for label, low, high in STREAK_BUCKETS:
+        mask = years >= low
+        if high is not None:
+            mask &= years <= high
+        bucket = data_frame.loc[mask]
+        rows.append({
+            "Streak": label,
+            "Min Years": low,
+            "Max Years": high,
+            "Stocks": int(mask.sum()),
+            "Median Div Yield": bucket["Div Yield"].median(),
+            "Median DGR 5Y": bucket["DGR 5Y"].median(),
+        })
+    return pd.DataFrame(rows).round(2)
+
+
+def compute_summary_tables(data_frame: pd.DataFrame) -> dict:
+    """
+    Build every materialized summary table from the full dividend data in one
+    vectorized pass per grouping.
+
+    :param data_frame: dividend_data_table contents (at least SUMMARY_SOURCE_COLUMNS)
+
+    :return summaries: summary table name -> dataframe, keyed by its first column(s)
+    """
+    data_frame = data_frame.reindex(columns=SUMMARY_SOURCE_COLUMNS)
+    numeric = ["No Years", "Div Yield", "DGR 5Y", "Payout Ratio", "Chowder Number"]
+    data_frame[numeric] = data_frame[numeric].apply(pd.to_numeric, errors="coerce")
+    return {
+        SECTOR_SUMMARY_TABLE: _group_summary(data_frame, ["Sector"]),
+        INDUSTRY_SUMMARY_TABLE: _group_summary(data_frame, ["Industry", "Sector"]),
+        STREAK_SUMMARY_TABLE: _streak_summary(data_frame),
+    }
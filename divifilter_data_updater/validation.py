@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import logging
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from divifilter_data_updater.stock_record import records_to_columns
+
+logger = logging.getLogger(__name__)
+
+# How many offending symbols each report entry lists (the count covers them all).
+REPORT_EXAMPLES = 5
+
+
+def _object_array(values) -> np.ndarray:
+    """A column (Series or sequence) as an object array with None for missing."""
+    if hasattr(values, "to_numpy"):
+        return values.to_numpy(dtype=object, na_value=None)
+    return np.asarray(values, dtype=object)
+
+
+def _numeric_array(values) -> np.ndarray:
+    """A column as float64; None and anything non-numeric (e.g. 'n/a') become NaN."""
+    if hasattr(values, "dtype") and values.dtype.kind in "iuf":
+        return np.asarray(values, dtype="float64")
+    array = _object_array(values)
+    try:
+        return array.astype("float64")
+    except (TypeError, ValueError):
+        pass
+
+    def as_float(value):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+    return np.fromiter((np.nan if value is None else as_float(value) for value in array),
+                       dtype="float64", count=len(array))
+
+
+def _missing_array(values) -> np.ndarray:
+    if hasattr(values, "isna"):
+        return values.isna().to_numpy()
+    return np.fromiter((value is None or value != value for value in values), dtype=bool, count=len(values))
+
+
+class RangeRule(NamedTuple):
+    """
+    A numeric column must lie within [low, high]; None leaves that side open.
+    Out-of-range values are obviously-bad data and are nulled before persist.
+    Values that aren't numeric at all are left for the DB types to deal with.
+    """
+    column: str
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+    @property
+    def name(self):
+        return f"range:{self.column}"
+
+    def violations(self, columns) -> np.ndarray:
+        values = _numeric_array(columns[self.column])
+        mask = np.zeros(len(values), dtype=bool)
+        if self.low is not None:
+            mask |= values < self.low
+        if self.high is not None:
+            mask |= values > self.high
+        return mask
+
+
+class OrderRule(NamedTuple):
+    """
+    Columns that must be non-decreasing left to right within a row (e.g.
+    Low <= Price <= High). Rows missing any of them are not checked. Sources
+    refresh at different times, so violations are reported, not nulled.
+    """
+    columns: tuple
+
+    @property
+    def name(self):
+        return "order:" + "<=".join(self.columns)
+
+    def violations(self, columns) -> np.ndarray:
+        values = [_numeric_array(columns[column]) for column in self.columns]
+        mask = np.zeros(len(values[0]), dtype=bool)
+        for smaller, larger in zip(values, values[1:]):
+            mask |= smaller > larger
+        return mask
+
+
+class NullRateRule(NamedTuple):
+    """
+    At most max_null_rate of the rows may lack the column. A dataset-level
+    check: a spike in nulls usually means the source page layout changed.
+    """
+    column: str
+    max_null_rate: float
+
+    @property
+    def name(self):
+        return f"null_rate:{self.column}"
+
+    def violations(self, columns) -> np.ndarray:
+        missing = _missing_array(columns[self.column])
+        if missing.mean() <= self.max_null_rate:
+            return np.zeros(len(missing), dtype=bool)
+        return missing
+
+
+# The declared validation rules, applied in order. Range rules null the
+# offending cells; the other rules only report.
+VALIDATION_RULES = (
+    RangeRule("Price", low=0),              # a real stock price is positive
+    RangeRule("Low", low=0),
+    RangeRule("High", low=0),
+    RangeRule("Div Yield", low=0, high=100),  # a yield above 100% is a data glitch
+    RangeRule("5Y Avg Yield", low=0, high=100),
+    RangeRule("No Years", low=0, high=200),
+    RangeRule("Market Cap", low=0),
+    OrderRule(("Low", "Price", "High")),
+    NullRateRule("Price", max_null_rate=0.2),
+    NullRateRule("Div Yield", max_null_rate=0.2),
+    NullRateRule("Sector", max_null_rate=0.2),
+)
+
+
+def _rule_columns(rule):
+    return rule.columns if isinstance(rule, OrderRule) else (rule.column,)
+
+
+def _apply_rules(columns, symbols, rules, null_cells) -> dict:
+    """
+    Evaluate each rule as one vectorized mask over the columns (any mapping of
+    column name -> values, e.g. a dataframe), hand RangeRule violations to
+    null_cells(column, mask) before the next rule runs, and build the report.
+    """
+    report = {}
+    for rule in rules:
+        if not len(symbols) or not all(column in columns for column in _rule_columns(rule)):
+            continue
+        mask = rule.violations(columns)
+        count = int(mask.sum())
+        if not count:
+            continue
+        report[rule.name] = {"violations": count,
+                             "examples": [str(symbols[i]) for i in np.flatnonzero(mask)[:REPORT_EXAMPLES]]}
+        if isinstance(rule, RangeRule):
+            null_cells(rule.column, mask)
+    return report
+
+
+def validate_frame(data_frame, rules=VALIDATION_RULES):
+    """
+    Evaluate every rule as one vectorized mask over the dataframe, null the
+    cells that fail a RangeRule (in place), and summarize all violations.
+    Rules whose columns aren't in the dataframe are skipped.
+
+    :param data_frame: one row per symbol (the index is used in the report)
+    :param rules: the rules to apply, VALIDATION_RULES by default
+
+    :return data_frame: the same dataframe, with out-of-range values set to None
+    :return report: rule name -> {"violations": count, "examples": first few symbols}
+        for every rule that found something
+    """
+    def null_cells(column, mask):
+        data_frame[column] = data_frame[column].mask(mask)
+
+    return data_frame, _apply_rules(data_frame, data_frame.index, rules, null_cells)
+
+
+def validate_records(radar_dict: dict, rules=VALIDATION_RULES) -> dict:
+    """
+    validate_frame for ticker -> record mappings (StockRecords or dicts),
+    without building a dataframe: out-of-range cells are set to None in place.
+
+    :param radar_dict: ticker -> {column: value} mapping (modified in place)
+    :param rules: the rules to apply, VALIDATION_RULES by default
+
+    :return report: as for validate_frame
+    """
+    records = list(radar_dict.values())
+    columns = records_to_columns(records)
+
+    def null_cells(column, mask):
+        values = columns[column]
+        for index in np.flatnonzero(mask):
+            records[index][column] = None
+            values[index] = None
+
+    return _apply_rules(columns, list(radar_dict), rules, null_cells)
+
+
+def log_validation_report(report: dict, total_rows: int):
+    """Log one line per violated rule instead of one per bad cell."""
+    for rule_name, result in report.items():
+        logger.warning("Validation %s: %s of %s rows (e.g. %s)", rule_name, result["violations"], total_rows,
+                       ", ".join(result["examples"]))
@@ -1,40 +1,56 @@
 from __future__ import annotations
 
-import yfinance as yf
 from retrying import retry
 from datetime import datetime, timezone
 import requests
 import logging
 import json
-from divifilter_data_updater.helper_functions import clean_numeric_value
+from divifilter_data_updater.deadline import Deadline, DeadlineExceeded
+from divifilter_data_updater.helper_functions import clean_numeric_records
+from divifilter_data_updater.lazy_imports import LazyModule
+
+# yfinance pulls in pandas; only load it when Yahoo is actually queried
+yf = LazyModule("yfinance")
 
 logger = logging.getLogger(__name__)
 
 
+def _retry_unless_out_of_time(exception):
+    return not isinstance(exception, DeadlineExceeded)
+
 
-@retry(wait_exponential_multiplier=1000, wait_exponential_max=10000, stop_max_attempt_number=10)
-def get_yahoo_finance_data_for_tickers_tuple(tickers_tuple: tuple) -> tuple[datetime, dict]:
+@retry(wait_exponential_multiplier=1000, wait_exponential_max=10000, stop_max_attempt_number=10,
+       retry_on_exception=_retry_unless_out_of_time)
+def get_yahoo_finance_data_for_tickers_tuple(tickers_tuple: tuple, deadline: Deadline = None) -> tuple[datetime, dict]:
     """
     Takes a tuple of tickers and returns the relevant data for them from yahoo_finance, have to use tuple because of
     caching hating lists
 
     :param tickers_tuple: the tuple of tickers you want the data for
+    :param deadline: optional Deadline; once it expires no more tickers are queried and the ones fetched so far are
+        returned, and a retry that would start after it raises DeadlineExceeded instead
 
     :return yahoo_finance_query_date_time: the date and time in UTC yahoo finance was queried at
     :return filtered_radar_dict: A dict including all data for tickers requested
     """
 
+    deadline = deadline or Deadline()
+    deadline.check("Yahoo Finance fetch")
     filtered_radar_dict = {}
     tickers = yf.Tickers(list(tickers_tuple))
+    wanted_stock_dict = {
+        "Price": "currentPrice",
+        "Low": "fiftyTwoWeekLow",
+        "High": "fiftyTwoWeekHigh",
+        "P/BV": "priceToBook",
+        "Payout Ratio": "payoutRatio"
+    }
 
     for stock_ticker in tickers_tuple:
-        wanted_stock_dict = {
-            "Price": "currentPrice",
-            "Low": "fiftyTwoWeekLow",
-            "High": "fiftyTwoWeekHigh",
-            "P/BV": "priceToBook",
-            "Payout Ratio": "payoutRatio"
-        }
+        if deadline.expired():
+            logger.warning("Time budget exhausted; returning Yahoo data for %s of %s tickers",
+                           len(filtered_radar_dict), len(tickers_tuple))
+            break
         filtered_radar_dict[stock_ticker] = {}
         for wanted_stock_key, wanted_stock_value in wanted_stock_dict.items():
             try:
@@ -55,34 +71,34 @@ def get_yahoo_finance_data_for_tickers_tuple(tickers_tuple: tuple) -> tuple[date
             except (AttributeError, TypeError, requests.exceptions.HTTPError,
                     json.decoder.JSONDecodeError) as e:
                 logger.debug("Yahoo lookup failed for %s.%s: %s", stock_ticker, wanted_stock_value, e)
-            
-            # Clean numeric values
-            if wanted_stock_key in filtered_radar_dict[stock_ticker]:
-                raw_value = filtered_radar_dict[stock_ticker][wanted_stock_key]
-                # Yahoo returns payoutRatio as a fraction (0.65); drip scrape stores it as a percent (65.0).
-                # Normalize to percent before cleaning so rounding preserves precision.
-                if wanted_stock_key == "Payout Ratio" and raw_value is not None:
-                    try:
-                        raw_value = float(raw_value) * 100
-                    except (ValueError, TypeError):
-                        pass
-                filtered_radar_dict[stock_ticker][wanted_stock_key] = clean_numeric_value(raw_value)
+
+        # Yahoo returns payoutRatio as a fraction (0.65); drip scrape stores it as a percent (65.0).
+        # Normalize to percent before cleaning so rounding preserves precision.
+        raw_payout_ratio = filtered_radar_dict[stock_ticker].get("Payout Ratio")
+        if raw_payout_ratio is not None:
+            try:
+                filtered_radar_dict[stock_ticker]["Payout Ratio"] = float(raw_payout_ratio) * 100
+            except (ValueError, TypeError):
+                pass
+        clean_numeric_records([filtered_radar_dict[stock_ticker]], wanted_stock_dict)
+
     yahoo_finance_query_date_time = datetime.now(timezone.utc)
     return yahoo_finance_query_date_time, filtered_radar_dict
 
 
-def get_yahoo_finance_data_for_tickers_list(tickers_list: list) -> tuple[datetime, dict]:
+def get_yahoo_finance_data_for_tickers_list(tickers_list: list, deadline: Deadline = None) -> tuple[datetime, dict]:
     """
     A wrapper for get_yahoo_finance_data_for_tickers_tuple, only difference is it takes a list and turns it to tuple as
     an ugly but simple workaround for cache not liking lists
 
     :param tickers_list: the list of tickers you want the data for
+    :param deadline: optional Deadline, see get_yahoo_finance_data_for_tickers_tuple
 
     :return yahoo_finance_query_date_time: the date and time in UTC yahoo finance was queried at
     :return filtered_radar_dict: A dict including all data for tickers requested
     """
 
-    return get_yahoo_finance_data_for_tickers_tuple(tuple(tickers_list))
+    return get_yahoo_finance_data_for_tickers_tuple(tuple(tickers_list), deadline=deadline)
 
 
 def disable_yahoo_logs():
@@ -0,0 +1,44 @@
+import unittest
+
+from divifilter_data_updater.canary import canary_problems, field_coverage
+from divifilter_data_updater.schema import ESSENTIAL_COLUMNS
+
+
+class TestFieldCoverage(unittest.TestCase):
+
+    def test_fraction_of_records_with_a_value(self):
+        records = [{"Symbol": "AAPL", "Price": 1.0, "Sector": ""},
+                   {"Symbol": "KO", "Price": float("nan"), "Sector": "Staples"},
+                   {"Symbol": "MSFT", "Price": 2.0}]
+        self.assertEqual(field_coverage(records), {"Price": 2 / 3, "Sector": 1 / 3})
+
+    def test_no_records(self):
+        self.assertEqual(field_coverage([]), {})
+
+
+class TestCanaryProblems(unittest.TestCase):
+
+    BASELINE = {"Price": 1.0, "Sector": 0.95, "DGR 10Y": 0.4}
+
+    def test_healthy_sample_passes(self):
+        sample = [{"Symbol": f"S{i}", "Price": 1.0, "Sector": "Tech", "DGR 10Y": None} for i in range(10)]
+        self.assertEqual(canary_problems(sample, 10, self.BASELINE), [])
+
+    def test_field_the_parser_lost_is_reported(self):
+        sample = [{"Symbol": f"S{i}", "Price": 1.0, "Sector": None} for i in range(10)]
+        self.assertEqual(canary_problems(sample, 10, self.BASELINE),
+                         ["Sector: 0% filled, 95% in the last good run"])
+
+    def test_mostly_unparsed_sample_is_reported(self):
+        sample = [{"Symbol": "S1", "Price": 1.0, "Sector": "Tech"}]
+        self.assertEqual(canary_problems(sample, 10, self.BASELINE), ["only 1/10 sample pages parsed"])
+
+    def test_without_baseline_essential_columns_must_appear(self):
+        sample = [{"Symbol": "S1", **{column: "x" for column in ESSENTIAL_COLUMNS}}]
+        self.assertEqual(canary_problems(sample, 1, {}), [])
+        sample[0]["Price"] = None
+        self.assertEqual(canary_problems(sample, 1, {}), ["Price: empty in every sample page"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from divifilter_data_updater.change_detection import detect_changes, removal_looks_safe
+
+
+def _ticker(symbol):
+    return {"symbol": symbol, "url": f"https://example.com/{symbol}/"}
+
+
+class TestDetectChanges(unittest.TestCase):
+
+    def test_only_changed_and_new_pages_are_fetched(self):
+        tickers = [_ticker(s) for s in ("AAPL", "KO", "MSFT", "NEW")]
+        page_versions = {"https://example.com/AAPL/": "2026-06-01", "https://example.com/KO/": "2026-06-20",
+                         "https://example.com/MSFT/": None, "https://example.com/NEW/": "2026-06-20"}
+        known_versions = {"AAPL": "2026-06-01", "KO": "2026-06-01", "MSFT": None}
+
+        changes = detect_changes(tickers, page_versions, known_versions, ["AAPL", "KO", "MSFT", "GONE"])
+
+        self.assertEqual([t["symbol"] for t in changes.to_fetch], ["KO", "MSFT", "NEW"])
+        self.assertEqual(changes.added, ["NEW"])
+        self.assertEqual(changes.removed, ["GONE"])
+        self.assertEqual(changes.unchanged, 1)
+
+    def test_published_stock_without_a_recorded_version_is_fetched(self):
+        changes = detect_changes([_ticker("KO")], {"https://example.com/KO/": "2026-06-20"}, {}, ["KO"])
+        self.assertEqual([t["symbol"] for t in changes.to_fetch], ["KO"])
+        self.assertEqual(changes.added, [])
+
+    def test_removal_guard(self):
+        self.assertTrue(removal_looks_safe(["GONE"], 10))
+        self.assertFalse(removal_looks_safe(["A", "B"], 10))
+        self.assertTrue(removal_looks_safe([], 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
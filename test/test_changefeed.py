@@ -0,0 +1,85 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from divifilter_data_updater.changefeed import NdjsonFileSink, UnixSocketSink, diff_rows, open_sink
+
+
+class TestDiffRows(unittest.TestCase):
+
+    def test_only_changed_cells_are_listed(self):
+        before = {"AAPL": {"Symbol": "AAPL", "Price": 150.0, "Sector": "Tech"}}
+        after = {"AAPL": {"Symbol": "AAPL", "Price": 151.5, "Sector": "Tech"}}
+
+        self.assertEqual(diff_rows(before, after),
+                         [{"Symbol": "AAPL", "column": "Price", "op": "update", "old": 150.0, "new": 151.5}])
+
+    def test_inserted_and_deleted_rows(self):
+        before = {"GONE": {"Symbol": "GONE", "Price": 5.0, "Sector": None}}
+        after = {"NEW": {"Symbol": "NEW", "Price": 20.0, "Sector": "Energy"}}
+
+        self.assertEqual(diff_rows(before, after), [
+            {"Symbol": "GONE", "column": "Price", "op": "delete", "old": 5.0, "new": None},
+            {"Symbol": "NEW", "column": "Price", "op": "insert", "old": None, "new": 20.0},
+            {"Symbol": "NEW", "column": "Sector", "op": "insert", "old": None, "new": "Energy"},
+        ])
+
+    def test_nan_equals_null_and_freshness_stamps_are_ignored(self):
+        before = {"KO": {"Price": float("nan"), "Yahoo Updated": "2026-06-24 12:00:00"}}
+        after = {"KO": {"Price": None, "Yahoo Updated": "2026-06-24 13:00:00"}}
+
+        self.assertEqual(diff_rows(before, after), [])
+
+
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.entries = [{"version": 1, "seq": 1, "Symbol": "KO", "column": "Price", "old": 60.0, "new": 61.0}]
+
+    def test_open_sink(self):
+        self.assertIsNone(open_sink(""))
+        self.assertIsInstance(open_sink("/tmp/changes.ndjson"), NdjsonFileSink)
+        sink = open_sink("unix:/run/divifilter.sock")
+        self.assertIsInstance(sink, UnixSocketSink)
+        self.assertEqual(sink.path, "/run/divifilter.sock")
+
+    def test_file_sink_appends_ndjson(self):
+        path = os.path.join(self.directory.name, "changes.ndjson")
+        sink = NdjsonFileSink(path)
+        sink.emit(self.entries)
+        sink.emit(self.entries)
+
+        with open(path, encoding="utf-8") as feed_file:
+            self.assertEqual([json.loads(line) for line in feed_file], self.entries * 2)
+
+    def test_socket_sink_sends_ndjson(self):
+        path = os.path.join(self.directory.name, "feed.sock")
+        received = []
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(path)
+            server.listen(1)
+
+            def accept():
+                connection, _ = server.accept()
+                with connection, connection.makefile("r", encoding="utf-8") as lines:
+                    received.extend(json.loads(line) for line in lines)
+
+            consumer = threading.Thread(target=accept)
+            consumer.start()
+            UnixSocketSink(path).emit(self.entries)
+            consumer.join(5)
+
+        self.assertEqual(received, self.entries)
+
+    def test_socket_sink_without_listener_raises(self):
+        with self.assertRaises(OSError):
+            UnixSocketSink(os.path.join(self.directory.name, "nobody.sock")).emit(self.entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+from divifilter_data_updater.circuit_breaker import SymbolCircuitBreaker
+
+NOW = datetime(2026, 6, 24, 12, 0)
+
+
+def _breaker(failures=None, now=NOW):
+    store = MagicMock()
+    store.load_symbol_failures.return_value = dict(failures or {})
+    clock = MagicMock(return_value=now)
+    return SymbolCircuitBreaker(store, "yahoo", base_seconds=3600, max_seconds=4 * 3600, now=clock), store, clock
+
+
+class TestSymbolCircuitBreaker(unittest.TestCase):
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        breaker, _, _ = _breaker()
+        self.assertEqual([breaker.backoff_seconds(n) for n in range(1, 5)], [3600, 7200, 14400, 14400])
+
+    def test_suppressed_symbols_are_skipped_until_their_backoff_ends(self):
+        breaker, store, _ = _breaker({"DEAD": (2, "2026-06-24 13:00:00"), "BACK": (1, "2026-06-24 11:00:00")})
+
+        self.assertEqual(breaker.allowed(["AAPL", "DEAD", "BACK"]), ["AAPL", "BACK"])
+        self.assertEqual(breaker.suppressed_count, 1)
+        store.load_symbol_failures.assert_called_once_with("yahoo")
+
+    def test_failure_counts_and_success_resets(self):
+        breaker, store, _ = _breaker({"DEAD": (2, "2026-06-24 11:00:00"), "BACK": (1, "2026-06-24 11:00:00")})
+
+        self.assertFalse(breaker.record(["DEAD", "NEW"], ["BACK", "AAPL", "KO"]))
+
+        store.save_symbol_failures.assert_called_once_with("yahoo", {"DEAD": (3, "2026-06-24 16:00:00"),
+                                                                     "NEW": (1, "2026-06-24 13:00:00")})
+        store.clear_symbol_failures.assert_called_once_with("yahoo", ["BACK"])
+
+    def test_recorded_failures_are_suppressed_in_the_same_process(self):
+        breaker, _, clock = _breaker()
+        breaker.record(["NEW"], ["AAPL", "KO"])
+
+        self.assertEqual(breaker.allowed(["NEW", "AAPL"]), ["AAPL"])
+        clock.return_value = NOW + timedelta(hours=1)
+        self.assertEqual(breaker.allowed(["NEW", "AAPL"]), ["NEW", "AAPL"])
+
+    def test_mass_failure_is_an_outage_and_not_recorded(self):
+        breaker, store, _ = _breaker()
+
+        self.assertTrue(breaker.record(["AAPL", "KO"], ["MSFT"]))
+        store.save_symbol_failures.assert_not_called()
+        store.clear_symbol_failures.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,8 @@ class TestReadConfigurations(unittest.TestCase):
         config = read_configurations()
         self.assertEqual(config["dividend_radar_download_url"], "https://www.dripinvesting.org/stocks/")
         self.assertEqual(config["scrape_max_workers"], 4)
+        self.assertFalse(config["scheduler_enabled"])
+        self.assertEqual(config["drip_scrape_interval_seconds"], 300)
         # local_file_path is now commented out in configure.py
 
     def test_read_configurations_missing_key(self):
@@ -0,0 +1,96 @@
+import threading
+import time
+import unittest
+
+from divifilter_data_updater.db_writer import BatchedWriter, WriterClosed
+
+
+class TestBatchedWriter(unittest.TestCase):
+
+    def test_batches_on_size(self):
+        batches = []
+        with BatchedWriter(batches.append, batch_size=3, flush_seconds=60) as writer:
+            writer.submit_many(range(7))
+        self.assertEqual(batches[:2], [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(sum(batches, []), list(range(7)))
+
+    def test_partial_batch_is_written_after_flush_seconds(self):
+        batches = []
+        with BatchedWriter(batches.append, batch_size=100, flush_seconds=0.05) as writer:
+            writer.submit_many(["a", "b"])
+            self.assertTrue(writer.flush(timeout=5))
+            self.assertEqual(batches, [["a", "b"]])
+
+    def test_flush_writes_a_partial_batch_without_waiting_for_flush_seconds(self):
+        batches = []
+        with BatchedWriter(batches.append, batch_size=100, flush_seconds=60) as writer:
+            writer.submit_many(["a", "b"])
+            start = time.monotonic()
+            self.assertTrue(writer.flush(timeout=5))
+            self.assertLess(time.monotonic() - start, 2)
+            self.assertEqual(batches, [["a", "b"]])
+
+    def test_same_key_is_coalesced_last_one_winning(self):
+        batches = []
+        with BatchedWriter(batches.append, batch_size=3, flush_seconds=60, key=lambda item: item[0]) as writer:
+            writer.submit_many([("AAPL", 1), ("KO", 1), ("AAPL", 2)])
+            self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(batches, [[("AAPL", 2), ("KO", 1)]])
+
+    def test_full_queue_blocks_the_producer(self):
+        release = threading.Event()
+        batches = []
+
+        def slow_write(batch):
+            release.wait(5)
+            batches.append(batch)
+
+        writer = BatchedWriter(slow_write, batch_size=1, flush_seconds=0, queue_size=1).start()
+        writer.submit(1)
+        time.sleep(0.05)
+        writer.submit(2)
+        producer = threading.Thread(target=writer.submit, args=(3,))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+
+        release.set()
+        producer.join(5)
+        writer.close()
+        self.assertEqual(batches, [[1], [2], [3]])
+
+    def test_stop_event_writes_queued_items_without_waiting(self):
+        stop_event = threading.Event()
+        batches = []
+        writer = BatchedWriter(batches.append, batch_size=100, flush_seconds=60, stop_event=stop_event).start()
+        writer.submit_many(["a", "b"])
+        stop_event.set()
+
+        self.assertTrue(writer.flush(timeout=5))
+        writer.close()
+        self.assertEqual(sum(batches, []), ["a", "b"])
+
+    def test_close_writes_everything_then_rejects_new_items(self):
+        batches = []
+        writer = BatchedWriter(batches.append, batch_size=100, flush_seconds=60).start()
+        writer.submit_many(["a", "b"])
+        writer.close()
+
+        self.assertEqual(batches, [["a", "b"]])
+        with self.assertRaises(WriterClosed):
+            writer.submit("c")
+
+    def test_failed_batch_is_logged_and_counted(self):
+        def broken(batch):
+            raise RuntimeError("deadlock")
+
+        writer = BatchedWriter(broken, batch_size=2, flush_seconds=60).start()
+        with self.assertLogs("divifilter_data_updater.db_writer", level="WARNING"):
+            writer.submit_many(["a", "b"])
+            self.assertTrue(writer.flush(timeout=5))
+        writer.close()
+        self.assertEqual((writer.written, writer.failed), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
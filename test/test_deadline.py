@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+from divifilter_data_updater.deadline import Deadline, DeadlineExceeded
+
+
+class FakeClock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_unlimited_never_expires(self):
+        deadline = Deadline()
+        self.assertEqual(deadline.remaining(), float("inf"))
+        self.assertFalse(deadline.expired())
+        self.assertEqual(deadline.timeout(30), 30)
+        self.assertEqual(repr(deadline), "<Deadline unlimited>")
+
+    def test_zero_budget_means_unlimited(self):
+        self.assertFalse(Deadline(0).expired())
+
+    def test_counts_down_and_expires(self):
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        clock.now = 4
+        self.assertEqual(deadline.remaining(), 6)
+        deadline.check("scrape")
+        clock.now = 12
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertTrue(deadline.expired())
+        with self.assertRaisesRegex(DeadlineExceeded, "scrape"):
+            deadline.check("scrape")
+
+    def test_timeout_fits_all_attempts(self):
+        clock = FakeClock()
+        deadline = Deadline(100, clock=clock)
+        self.assertEqual(deadline.timeout(30), 30)
+        self.assertEqual(deadline.timeout(30, attempts=4), 25)
+        clock.now = 99.5
+        self.assertEqual(deadline.timeout(30), 1.0)
+
+    def test_reserve_ends_earlier(self):
+        clock = FakeClock()
+        deadline = Deadline(100, clock=clock)
+        stage = deadline.reserve(60)
+        clock.now = 50
+        self.assertTrue(stage.expired())
+        self.assertFalse(deadline.expired())
+        self.assertEqual(Deadline().reserve(60).remaining(), float("inf"))
+
+    def test_cancel_event_expires_deadline_and_its_reserves(self):
+        cancel_event = threading.Event()
+        deadline = Deadline(100, cancel_event=cancel_event)
+        stage = deadline.reserve(60)
+        self.assertFalse(stage.expired())
+        cancel_event.set()
+        self.assertTrue(deadline.cancelled())
+        self.assertTrue(stage.expired())
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertEqual(repr(deadline), "<Deadline cancelled>")
+        with self.assertRaisesRegex(DeadlineExceeded, "shutdown"):
+            stage.check("Yahoo Finance fetch")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import math
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from divifilter_data_updater.derived_fields import (
+    apply_derived_fields, derived_fields_update, required_columns, DERIVED_FIELDS
+)
+
+
+def _sample_frame():
+    return pd.DataFrame({
+        "Symbol": ["AAA", "ZERO", "NOPRICE", "NODGR"],
+        "Price": [50.0, 0.0, None, 25.0],
+        "Annualized": [2.0, 1.0, 1.0, 1.0],
+        "Fair Value": [40.0, 10.0, 10.0, 0.0],
+        "DGR 5Y": [7.0, 5.0, 3.0, None],
+        "Div Yield": [9.0, 9.0, 9.0, 9.0],
+        "FV %": [1.0, 1.0, 1.0, 1.0],
+        "Chowder Number": [0.0, 0.0, 0.0, 0.0],
+    })
+
+
+class TestApplyDerivedFields(unittest.TestCase):
+
+    def test_formulas(self):
+        df = apply_derived_fields(_sample_frame())
+        row = df.set_index("Symbol").loc["AAA"]
+        self.assertEqual(row["Div Yield"], 4.0)        # 2 / 50 * 100
+        self.assertEqual(row["FV %"], 25.0)            # 50 is 25% over a 40 fair value
+        self.assertEqual(row["Chowder Number"], 11.0)  # uses the recomputed yield
+
+    def test_missing_or_zero_inputs_keep_current_value(self):
+        df = apply_derived_fields(_sample_frame()).set_index("Symbol")
+        self.assertEqual(df.loc["ZERO", "Div Yield"], 9.0)
+        self.assertEqual(df.loc["NOPRICE", "Div Yield"], 9.0)
+        self.assertEqual(df.loc["NOPRICE", "FV %"], 1.0)
+        self.assertEqual(df.loc["NODGR", "Div Yield"], 4.0)
+        self.assertEqual(df.loc["NODGR", "FV %"], 1.0)       # zero fair value
+        self.assertEqual(df.loc["NODGR", "Chowder Number"], 0.0)
+
+    def test_rounds_to_two_decimals(self):
+        df = pd.DataFrame({"Price": [3.0], "Annualized": [1.0], "Fair Value": [7.0], "DGR 5Y": [1.0],
+                           "Div Yield": [None], "FV %": [None], "Chowder Number": [None]})
+        apply_derived_fields(df)
+        self.assertEqual(df.loc[0, "Div Yield"], 33.33)
+        self.assertEqual(df.loc[0, "FV %"], -57.14)
+
+    def test_string_inputs_are_coerced(self):
+        df = _sample_frame().astype({"Price": object})
+        df.loc[0, "Price"] = "50"
+        self.assertEqual(apply_derived_fields(df).loc[0, "Div Yield"], 4.0)
+
+
+class TestDerivedFieldsUpdate(unittest.TestCase):
+
+    def test_single_ordered_update(self):
+        sql = str(derived_fields_update().compile(dialect=mysql.dialect()))
+        self.assertTrue(sql.startswith("UPDATE dividend_data_table SET `Div Yield`="))
+        self.assertEqual(sql.count("nullif"), 3)  # yield inlined into chowder
+        self.assertLess(sql.index("`Div Yield`="), sql.index("`Chowder Number`="))
+
+    def test_required_columns(self):
+        self.assertEqual(required_columns(), {"Price", "Annualized", "Fair Value", "DGR 5Y",
+                                              "Div Yield", "FV %", "Chowder Number"})
+        self.assertTrue({name for name, _ in DERIVED_FIELDS} <= required_columns())
+
+    def test_sql_matches_dataframe_engine(self):
+        engine = create_engine("sqlite://")
+        _sample_frame().to_sql("dividend_data_table", engine, index=False)
+        with engine.begin() as conn:
+            conn.execute(derived_fields_update())
+        from_sql = pd.read_sql("SELECT * FROM dividend_data_table", engine)
+        from_frame = apply_derived_fields(_sample_frame())
+        for name, _ in DERIVED_FIELDS:
+            for sql_value, frame_value in zip(from_sql[name], from_frame[name]):
+                self.assertTrue(math.isclose(sql_value, frame_value), (name, sql_value, frame_value))
+
+
+if __name__ == '__main__':
+    unittest.main()
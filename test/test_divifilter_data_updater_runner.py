@@ -1,5 +1,7 @@
+import threading
 import unittest
-from unittest.mock import patch, MagicMock
+from datetime import datetime
+from unittest.mock import ANY, patch, MagicMock
 
 
 class BreakLoop(Exception):
@@ -16,6 +18,36 @@ def _default_config(**overrides):
         "max_random_delay_seconds": 0,
         "scrape_max_workers": 4,
         "scrape_min_expected_tickers": 1,
+        "scrape_canary_size": 0,
+        "yahoo_refresh_budget": 0,
+        "yahoo_popular_symbols": 100,
+        "yahoo_popular_max_age_seconds": 3600,
+        "yahoo_failure_backoff_seconds": 3600,
+        "yahoo_failure_max_backoff_seconds": 604800,
+        "scrape_incremental": False,
+        "scrape_hedge_requests": False,
+        "scrape_hedge_percentile": 95,
+        "scrape_hedge_budget_fraction": 0.05,
+        "store_history": False,
+        "history_retention_days": 1825,
+        "history_downsample_after_days": 365,
+        "cycle_time_budget_seconds": 0,
+        "scheduler_enabled": False,
+        "drip_version_check_interval_seconds": 1800,
+        "drip_scrape_interval_seconds": 300,
+        "drip_full_scrape_max_age_seconds": 7 * 86400,
+        "yahoo_enrichment_interval_seconds": 3600,
+        "yahoo_market_hours_only": False,
+        "journal_dir": "",
+        "journal_max_attempts": 5,
+        "changefeed_enabled": False,
+        "changefeed_sink": "",
+        "changefeed_keep_versions": 1000,
+        "db_writer_enabled": False,
+        "db_writer_batch_size": 500,
+        "db_writer_flush_seconds": 2,
+        "db_writer_queue_size": 5000,
+        "scheduler_jitter_fraction": 0.1,
     }
     config.update(overrides)
     return config
@@ -23,7 +55,7 @@ def _default_config(**overrides):
 
 @patch('divifilter_data_updater.divifilter_data_updater_runner.random_delay', side_effect=BreakLoop)
 @patch('divifilter_data_updater.divifilter_data_updater_runner.get_current_datetime_string', return_value="2026-02-16 12:00:00")
-@patch('divifilter_data_updater.divifilter_data_updater_runner.MysqlConnection')
+@patch('divifilter_data_updater.divifilter_data_updater_runner.connect_database')
 @patch('divifilter_data_updater.divifilter_data_updater_runner.DripInvestingScraper')
 @patch('divifilter_data_updater.divifilter_data_updater_runner.read_configurations')
 class TestInit(unittest.TestCase):
@@ -50,11 +82,14 @@ class TestInit(unittest.TestCase):
             # Scraper was called
             scraper.scrape_all_data.assert_called_once()
             # DB was updated
-            mysql.update_data_table_from_data_frame.assert_called_once()
+            mysql.update_data_table_from_records.assert_called_once()
             mysql.update_metadata_table.assert_called()
             # Yahoo was called
             mock_yahoo.assert_called_once()
             mysql.update_data_table.assert_called_once()
+            mysql.recompute_derived_fields.assert_called_once()
+            # Summaries refreshed after both the merge and the enrichment
+            self.assertEqual(mysql.refresh_summary_tables.call_count, 2)
             # Yahoo logs disabled
             mock_disable.assert_called_once()
 
@@ -71,7 +106,7 @@ class TestInit(unittest.TestCase):
             from divifilter_data_updater.divifilter_data_updater_runner import init
             init()
 
-        mysql.update_data_table_from_data_frame.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
 
     def test_scraper_exception_handled(self, mock_config, mock_scraper_cls,
                                         mock_mysql_cls, mock_datetime, mock_delay):
@@ -87,7 +122,7 @@ class TestInit(unittest.TestCase):
             init()
 
         # Exception is caught, DB write not called
-        mysql.update_data_table_from_data_frame.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
 
     def test_scraper_exception_rolls_back_connection(self, mock_config, mock_scraper_cls,
                                                       mock_mysql_cls, mock_datetime, mock_delay):
@@ -105,7 +140,27 @@ class TestInit(unittest.TestCase):
                 init()
 
         mysql.conn.rollback.assert_called_once()
-        mysql.get_tickers_from_db.assert_called_once()
+        mysql.get_refresh_candidates.assert_called_once_with("Yahoo Updated")
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner._utc_now',
+           return_value=datetime(2026, 6, 27, 12, 0))
+    def test_yahoo_waits_for_the_market_to_open(self, mock_now, mock_config, mock_scraper_cls,
+                                                mock_mysql_cls, mock_datetime, mock_delay):
+        mock_config.return_value = _default_config(scrape_yahoo_finance=True, yahoo_market_hours_only=True)
+        mock_scraper_cls.return_value.scrape_all_data.return_value = []
+        mysql = mock_mysql_cls.return_value
+        mysql.__enter__ = MagicMock(return_value=mysql)
+        mysql.__exit__ = MagicMock(return_value=False)
+        mock_delay.side_effect = [None, BreakLoop]
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   return_value=(None, {})) as mock_yahoo:
+            with self.assertRaises(BreakLoop):
+                from divifilter_data_updater.divifilter_data_updater_runner import init
+                init()
+
+        # Once at startup, then nothing until Monday's open
+        mock_yahoo.assert_called_once()
 
     def test_yahoo_disabled(self, mock_config, mock_scraper_cls,
                              mock_mysql_cls, mock_datetime, mock_delay):
@@ -171,7 +226,7 @@ class TestInit(unittest.TestCase):
             init()
 
         scraper.scrape_all_data.assert_not_called()
-        mysql.update_data_table_from_data_frame.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
 
     def test_scrapes_when_version_changed(self, mock_config, mock_scraper_cls,
                                           mock_mysql_cls, mock_datetime, mock_delay):
@@ -190,8 +245,8 @@ class TestInit(unittest.TestCase):
             init()
 
         scraper.scrape_all_data.assert_called_once()
-        mysql.update_data_table_from_data_frame.assert_called_once()
-        mysql.update_metadata_table.assert_any_call({"drip_updated_gmt": "2026-06-25 03:09:53"})
+        mysql.update_data_table_from_records.assert_called_once()
+        mysql.update_metadata_table.assert_any_call({"radar_file": ANY, "drip_updated_gmt": "2026-06-25 03:09:53"})
 
     def test_scrapes_when_version_unavailable(self, mock_config, mock_scraper_cls,
                                               mock_mysql_cls, mock_datetime, mock_delay):
@@ -231,7 +286,7 @@ class TestInit(unittest.TestCase):
             init()
 
         scraper.scrape_all_data.assert_called_once()
-        mysql.update_data_table_from_data_frame.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
 
     def test_scrape_at_threshold_updates_db(self, mock_config, mock_scraper_cls,
                                             mock_mysql_cls, mock_datetime, mock_delay):
@@ -252,7 +307,655 @@ class TestInit(unittest.TestCase):
             from divifilter_data_updater.divifilter_data_updater_runner import init
             init()
 
-        mysql.update_data_table_from_data_frame.assert_called_once()
+        mysql.update_data_table_from_records.assert_called_once()
+
+    def test_history_snapshots_written_when_enabled(self, mock_config, mock_scraper_cls,
+                                                    mock_mysql_cls, mock_datetime, mock_delay):
+        mock_config.return_value = _default_config(store_history=True, scrape_yahoo_finance=True)
+        scraper = mock_scraper_cls.return_value
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = mock_mysql_cls.return_value
+        mysql.__enter__ = MagicMock(return_value=mysql)
+        mysql.__exit__ = MagicMock(return_value=False)
+        yahoo_data = (MagicMock(), {"AAPL": {"Price": 151.0}})
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   return_value=yahoo_data):
+            with self.assertRaises(BreakLoop):
+                from divifilter_data_updater.divifilter_data_updater_runner import init
+                init()
+
+        self.assertEqual(mysql.write_history_snapshot.call_count, 2)
+        mysql.write_history_snapshot.assert_called_with({"AAPL": {"Price": 151.0, "Yahoo Updated": ANY}})
+        mysql.maintain_history.assert_called_once_with(1825, 365)
+
+    def test_failed_history_snapshot_does_not_block_the_publish(self, mock_config, mock_scraper_cls,
+                                                                mock_mysql_cls, mock_datetime, mock_delay):
+        mock_config.return_value = _default_config(store_history=True, scrape_yahoo_finance=True)
+        scraper = mock_scraper_cls.return_value
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = mock_mysql_cls.return_value
+        mysql.__enter__ = MagicMock(return_value=mysql)
+        mysql.__exit__ = MagicMock(return_value=False)
+        mysql.write_history_snapshot.side_effect = RuntimeError("Lock wait timeout exceeded")
+        yahoo_data = (MagicMock(), {"AAPL": {"Price": 151.0}})
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   return_value=yahoo_data), self.assertLogs(level="WARNING") as logs:
+            with self.assertRaises(BreakLoop):
+                from divifilter_data_updater.divifilter_data_updater_runner import init
+                init()
+
+        self.assertEqual(sum("History snapshot failed" in line for line in logs.output), 2)
+        self.assertEqual(mysql.conn.rollback.call_count, 2)
+        mysql.update_metadata_table.assert_any_call({"yahoo_finance": ANY})
+        self.assertEqual(mysql.refresh_summary_tables.call_count, 2)
+        mysql.maintain_history.assert_called_once_with(1825, 365)
+
+    def test_yahoo_enrichment_error_does_not_end_the_loop(self, mock_config, mock_scraper_cls,
+                                                          mock_mysql_cls, mock_datetime, mock_delay):
+        mock_config.return_value = _default_config(store_history=True, scrape_yahoo_finance=True)
+        scraper = mock_scraper_cls.return_value
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = mock_mysql_cls.return_value
+        mysql.__enter__ = MagicMock(return_value=mysql)
+        mysql.__exit__ = MagicMock(return_value=False)
+        mysql.update_data_table.side_effect = RuntimeError("MySQL server has gone away")
+        yahoo_data = (MagicMock(), {"AAPL": {"Price": 151.0}})
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   return_value=yahoo_data), self.assertLogs(level="ERROR"):
+            with self.assertRaises(BreakLoop):
+                from divifilter_data_updater.divifilter_data_updater_runner import init
+                init()
+
+        mysql.conn.rollback.assert_called_once()
+        mysql.maintain_history.assert_called_once_with(1825, 365)
+        mock_delay.assert_called_once()
+
+    def test_history_not_written_when_disabled(self, mock_config, mock_scraper_cls,
+                                               mock_mysql_cls, mock_datetime, mock_delay):
+        mock_config.return_value = _default_config(store_history=False)
+        scraper = mock_scraper_cls.return_value
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = mock_mysql_cls.return_value
+        mysql.__enter__ = MagicMock(return_value=mysql)
+        mysql.__exit__ = MagicMock(return_value=False)
+
+        with self.assertRaises(BreakLoop):
+            from divifilter_data_updater.divifilter_data_updater_runner import init
+            init()
+
+        mysql.write_history_snapshot.assert_not_called()
+        mysql.maintain_history.assert_not_called()
+
+    def test_scheduler_enabled_hands_over_to_run_scheduled(self, mock_config, mock_scraper_cls,
+                                                           mock_mysql_cls, mock_datetime, mock_delay):
+        mock_config.return_value = _default_config(scheduler_enabled=True)
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.run_scheduled') as mock_run_scheduled:
+            from divifilter_data_updater.divifilter_data_updater_runner import init
+            init()
+
+        mock_run_scheduled.assert_called_once_with(mock_config.return_value)
+        mock_mysql_cls.assert_not_called()
+        mock_delay.assert_not_called()
+
+
+class TestScheduledJobs(unittest.TestCase):
+
+    def _connection(self, update_dates, radar_age):
+        mysql = MagicMock()
+        mysql.check_db_update_dates.return_value = update_dates
+        mysql.get_update_age_seconds.return_value = radar_age
+        return mysql
+
+    def test_version_check_records_available_version(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _check_drip_version
+        scraper = MagicMock()
+        scraper.get_dataset_version.return_value = "2026-06-25 03:09:53"
+        mysql = MagicMock()
+
+        _check_drip_version(scraper, mysql)
+
+        mysql.update_metadata_table.assert_called_once_with({"drip_available_gmt": "2026-06-25 03:09:53"})
+
+    def test_scrapes_when_newer_version_available(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_if_due
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = self._connection({"drip_available_gmt": "v2", "drip_updated_gmt": "v1"}, 60)
+
+        _scrape_if_due(_default_config(), scraper, mysql)
+
+        mysql.update_data_table_from_records.assert_called_once()
+        mysql.update_metadata_table.assert_any_call({"radar_file": ANY, "drip_updated_gmt": "v2"})
+
+    def test_skips_scrape_when_published_version_is_current(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_if_due
+        scraper = MagicMock()
+        mysql = self._connection({"drip_available_gmt": "v1", "drip_updated_gmt": "v1"}, 60)
+
+        _scrape_if_due(_default_config(), scraper, mysql)
+
+        scraper.scrape_all_data.assert_not_called()
+
+    def test_scrapes_when_data_too_old(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_if_due
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = []
+        mysql = self._connection({}, 8 * 86400)
+
+        _scrape_if_due(_default_config(), scraper, mysql)
+
+        scraper.scrape_all_data.assert_called_once()
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.DripInvestingScraper')
+    def test_jobs_have_their_own_intervals(self, mock_scraper_cls):
+        from divifilter_data_updater.divifilter_data_updater_runner import scheduled_jobs
+        jobs = scheduled_jobs(_default_config(scrape_yahoo_finance=True))
+
+        self.assertEqual({job.name: job.interval_seconds for job in jobs},
+                         {"drip_version_check": 1800, "drip_scrape": 300, "yahoo_enrichment": 3600})
+        self.assertEqual([job.jitter_seconds for job in jobs], [180.0, 30.0, 360.0])
+        self.assertNotIn("yahoo_enrichment", [job.name for job in scheduled_jobs(_default_config())])
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.DripInvestingScraper')
+    def test_yahoo_job_follows_market_hours(self, mock_scraper_cls):
+        from divifilter_data_updater.divifilter_data_updater_runner import scheduled_jobs
+        jobs = scheduled_jobs(_default_config(scrape_yahoo_finance=True, yahoo_market_hours_only=True,
+                                              scheduler_jitter_fraction=0))
+        yahoo_job = jobs[-1]
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner._utc_now',
+                   return_value=datetime(2026, 6, 24, 14, 0)):
+            self.assertEqual(yahoo_job.next_delay(), 3600)
+        with patch('divifilter_data_updater.divifilter_data_updater_runner._utc_now',
+                   return_value=datetime(2026, 6, 27, 13, 30)):
+            # Saturday: next run at Monday's open
+            self.assertEqual(yahoo_job.next_delay(), 2 * 86400)
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.connect_database')
+    def test_merges_wait_for_the_merge_lock(self, mock_connect):
+        from divifilter_data_updater.divifilter_data_updater_runner import _merge_lock, _run_yahoo_enrichment
+        mysql = MagicMock()
+        mysql.update_data_table.side_effect = lambda data: self.assertTrue(_merge_lock.locked())
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   side_effect=lambda tickers, deadline: self.assertFalse(_merge_lock.locked()) or (None, {})):
+            _run_yahoo_enrichment(_default_config(), mysql)
+
+        mysql.update_data_table.assert_called_once()
+        self.assertFalse(_merge_lock.locked())
+
+    def test_yahoo_refresh_is_planned_stamped_and_recorded_after_the_write(self):
+        from datetime import datetime, timezone
+        from divifilter_data_updater.divifilter_data_updater_runner import _run_yahoo_enrichment
+        mysql = MagicMock()
+        mysql.get_refresh_candidates.return_value = [("AAPL", "2026-06-24 10:00:00", 3e12), ("KO", None, 2e11),
+                                                     ("MSFT", "2026-06-24 11:00:00", 3e12)]
+        yahoo_data = (datetime(2026, 6, 24, 12, 0, tzinfo=timezone.utc), {"KO": {"Price": 60.0}, "AAPL": {"Price": None}})
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   return_value=yahoo_data) as mock_yahoo:
+            _run_yahoo_enrichment(_default_config(yahoo_refresh_budget=2), mysql)
+
+        self.assertEqual(mock_yahoo.call_args.args[0], ["KO", "AAPL"])
+        self.assertEqual(yahoo_data[1], {"KO": {"Price": 60.0, "Yahoo Updated": "2026-06-24 12:00:00"},
+                                         "AAPL": {"Price": None}})
+        calls = [call[0] for call in mysql.method_calls]
+        self.assertLess(calls.index("update_data_table"), calls.index("update_metadata_table"))
+
+    def test_yahoo_skips_suppressed_tickers_and_records_failures(self):
+        from datetime import datetime, timezone
+        from divifilter_data_updater.divifilter_data_updater_runner import _run_yahoo_enrichment
+        mysql = MagicMock()
+        mysql.get_refresh_candidates.return_value = [("AAPL", None, None), ("DEAD", None, None),
+                                                     ("KO", None, None), ("GONE", None, None)]
+        mysql.load_symbol_failures.return_value = {"DEAD": (3, "2999-01-01 00:00:00"),
+                                                   "KO": (1, "2000-01-01 00:00:00")}
+        yahoo_data = (datetime(2026, 6, 24, 12, 0, tzinfo=timezone.utc),
+                      {"AAPL": {"Price": 150.0}, "KO": {"Price": 60.0}, "GONE": {"Price": None}})
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   return_value=yahoo_data) as mock_yahoo:
+            _run_yahoo_enrichment(_default_config(), mysql)
+
+        self.assertEqual(mock_yahoo.call_args.args[0], ["AAPL", "GONE", "KO"])
+        mysql.load_symbol_failures.assert_called_once_with("yahoo")
+        mysql.save_symbol_failures.assert_called_once_with("yahoo", {"GONE": (1, ANY)})
+        mysql.clear_symbol_failures.assert_called_once_with("yahoo", ["KO"])
+
+    def test_scrape_cut_short_is_upserted_without_pruning(self):
+        from divifilter_data_updater.deadline import Deadline
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = MagicMock()
+        clock = MagicMock(side_effect=[0] + [100] * 20)
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _scrape_and_publish(_default_config(scrape_min_expected_tickers=100), scraper, mysql, "v2",
+                                Deadline(90, clock=clock))
+
+        mysql.update_data_table_from_records.assert_called_once_with(
+            [{"Symbol": "AAPL", "Price": 150.0, "Drip Updated": ANY}], prune=False)
+        mysql.update_metadata_table.assert_not_called()
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.ScrapeCheckpoint')
+    def test_checkpointed_scrape_is_cleared_after_publishing(self, mock_checkpoint_cls):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        mysql = MagicMock()
+
+        _scrape_and_publish(_default_config(), scraper, mysql, "v2")
+
+        mock_checkpoint_cls.assert_called_once_with(mysql, "v2")
+        self.assertIs(scraper.scrape_all_data.call_args.kwargs["checkpoint"], mock_checkpoint_cls.return_value)
+        mock_checkpoint_cls.return_value.clear.assert_called_once()
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.connect_database')
+    def test_checkpoint_is_written_by_the_background_writer(self, mock_connect):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        records = [{"Symbol": "AAPL", "Price": 150.0}, {"Symbol": "KO", "Price": 60.0}]
+        scraper = MagicMock()
+        scraper.scrape_all_data.side_effect = \
+            lambda deadline, checkpoint, tickers: checkpoint.save(records) or records
+        mysql = MagicMock()
+        writer_connection = mock_connect.return_value
+
+        _scrape_and_publish(_default_config(db_writer_enabled=True), scraper, mysql, "v2")
+
+        # Everything queued was written on the writer's own connection before publishing
+        writer_connection.save_scrape_checkpoint.assert_called_once_with("v2", records)
+        writer_connection.__exit__.assert_called_once()
+        mysql.save_scrape_checkpoint.assert_not_called()
+        mysql.update_data_table_from_records.assert_called_once()
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.connect_database')
+    def test_canary_sample_queued_on_the_background_writer_is_not_fetched_again(self, mock_connect):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        from divifilter_data_updater.drip_investing_scraper import DripInvestingScraper
+        tickers = [{"symbol": s, "url": f"https://example.com/{s}"} for s in ("AAPL", "KO", "MSFT")]
+        sample = [{"Symbol": "KO", "Price": 60.0}]
+        saved = {}
+        writer_connection = mock_connect.return_value
+        writer_connection.save_scrape_checkpoint.side_effect = \
+            lambda version, records: saved.update({record["Symbol"]: record for record in records})
+        mysql = MagicMock()
+        mysql.load_scrape_checkpoint.side_effect = lambda version: dict(saved)
+        mysql.get_field_coverage.return_value = {"Price": 1.0}
+        scraper = DripInvestingScraper()
+
+        def fetched(to_fetch, deadline, checkpoint):
+            return {t["symbol"]: {"Symbol": t["symbol"], "Price": 1.0} for t in to_fetch}
+
+        with patch.object(scraper, 'get_tickers', return_value=tickers), \
+                patch.object(scraper, 'scrape_sample', return_value=sample), \
+                patch.object(scraper, 'scrape_tickers', side_effect=fetched) as mock_scrape_tickers:
+            _scrape_and_publish(_default_config(db_writer_enabled=True, db_writer_flush_seconds=30,
+                                                scrape_canary_size=1), scraper, mysql, "v2")
+
+        to_fetch = [t["symbol"] for t in mock_scrape_tickers.call_args.args[0]]
+        self.assertEqual(to_fetch, ["AAPL", "MSFT"])
+        published = mysql.update_data_table_from_records.call_args.args[0]
+        self.assertEqual(sorted(record["Symbol"] for record in published), ["AAPL", "KO", "MSFT"])
+
+    def test_failed_schema_maintenance_does_not_lose_the_dataset_version(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _publish_scrape
+        mysql = MagicMock()
+        mysql.apply_schema_spec.side_effect = RuntimeError("1170 BLOB/TEXT column used in key specification")
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _publish_scrape(_default_config(), mysql, {"AAPL": {"Symbol": "AAPL"}}, "v2", complete=True)
+
+        mysql.update_metadata_table.assert_called_once_with({"radar_file": ANY, "drip_updated_gmt": "v2"})
+        mysql.conn.rollback.assert_called_once()
+        mysql.refresh_summary_tables.assert_called_once()
+        mysql.check_filter_query_indexes.assert_not_called()
+
+    def test_failed_summary_refresh_is_logged_and_rolled_back(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _publish_scrape
+        mysql = MagicMock()
+        mysql.refresh_summary_tables.side_effect = RuntimeError("Table 'dividend_sector_summary_old' already exists")
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING") as logs:
+            _publish_scrape(_default_config(), mysql, {"AAPL": {"Symbol": "AAPL"}}, "v2", complete=True)
+
+        self.assertIn("Summary table refresh failed", logs.output[0])
+        mysql.update_metadata_table.assert_called_once_with({"radar_file": ANY, "drip_updated_gmt": "v2"})
+        mysql.conn.rollback.assert_called_once()
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner._filter_indexes_checked',
+           new_callable=threading.Event)
+    def test_filter_indexes_are_checked_once_per_process(self, checked):
+        from divifilter_data_updater.divifilter_data_updater_runner import _check_filter_indexes_once
+        mysql = MagicMock()
+
+        _check_filter_indexes_once(mysql)
+        _check_filter_indexes_once(mysql)
+
+        mysql.check_filter_query_indexes.assert_called_once()
+
+    def test_scrape_lost_to_a_db_outage_is_replayed_from_the_journal(self):
+        import tempfile
+        from divifilter_data_updater.divifilter_data_updater_runner import _replay_journal, _scrape_and_publish
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        configuration = _default_config(journal_dir=journal_dir.name)
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        scraper.dead_letters = []
+        broken = MagicMock()
+        broken.update_data_table_from_records.side_effect = ConnectionError("MySQL server has gone away")
+
+        with self.assertRaises(ConnectionError):
+            _scrape_and_publish(configuration, scraper, broken, "v2")
+
+        mysql = MagicMock()
+        _replay_journal(configuration, mysql)
+        _replay_journal(configuration, mysql)
+
+        mysql.update_data_table_from_records.assert_called_once_with(
+            [{"Symbol": "AAPL", "Price": 150.0, "Drip Updated": ANY}], prune=True)
+        mysql.update_metadata_table.assert_any_call({"radar_file": ANY, "drip_updated_gmt": "v2"})
+
+    def test_new_write_queues_behind_an_older_entry_that_still_fails(self):
+        import tempfile
+        from divifilter_data_updater.divifilter_data_updater_runner import _journal, _publish_scrape, _replay_journal
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        configuration = _default_config(journal_dir=journal_dir.name)
+        broken = MagicMock()
+        broken.update_data_table_from_records.side_effect = ConnectionError("MySQL server has gone away")
+        with self.assertRaises(ConnectionError):
+            _publish_scrape(configuration, broken, {"AAPL": {"Symbol": "AAPL", "Price": 150.0}}, "v1", complete=True)
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _publish_scrape(configuration, broken, {"AAPL": {"Symbol": "AAPL", "Price": 151.0}}, "v2", complete=True)
+
+        # The older scrape was retried first and nothing newer was written past it
+        self.assertEqual(broken.update_data_table_from_records.call_count, 2)
+        self.assertEqual([payload["version"] for _, _, payload in _journal(configuration).pending()], ["v1", "v2"])
+        mysql = MagicMock()
+        self.assertTrue(_replay_journal(configuration, mysql))
+        self.assertEqual([c.args[0][0]["Price"] for c in mysql.update_data_table_from_records.call_args_list],
+                         [150.0, 151.0])
+
+    def test_journal_entry_is_acknowledged_before_post_publish_maintenance(self):
+        import tempfile
+        from divifilter_data_updater.divifilter_data_updater_runner import _journal, _publish_scrape
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        configuration = _default_config(journal_dir=journal_dir.name)
+        pending_during_maintenance = []
+        mysql = MagicMock()
+        mysql.apply_schema_spec.side_effect = lambda: pending_during_maintenance.append(
+            _journal(configuration).pending())
+
+        _publish_scrape(configuration, mysql, {"AAPL": {"Symbol": "AAPL"}}, "v2", complete=True)
+
+        self.assertEqual(pending_during_maintenance, [[]])
+
+    def test_entry_that_keeps_failing_is_moved_aside(self):
+        import os
+        import tempfile
+        from divifilter_data_updater.divifilter_data_updater_runner import _journal, _publish_scrape, _replay_journal
+        from divifilter_data_updater.journal import Journal
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        configuration = _default_config(journal_dir=journal_dir.name, journal_max_attempts=2)
+        mysql = MagicMock()
+        mysql.update_data_table_from_records.side_effect = ValueError("Incorrect decimal value: 'n/a'")
+        with self.assertRaises(ValueError):
+            _publish_scrape(configuration, mysql, {"AAPL": {"Symbol": "AAPL", "Price": "n/a"}}, "v2", complete=True)
+
+        with self.assertLogs("divifilter_data_updater.journal", level="ERROR"):
+            self.assertTrue(_replay_journal(configuration, mysql))
+
+        journal = _journal(configuration)
+        self.assertEqual(journal.pending(), [])
+        self.assertTrue(os.path.exists(journal.failed_path))
+        self.assertEqual([payload["version"] for _, _, payload in Journal(journal.failed_path).pending()], ["v2"])
+
+    def test_publish_emits_its_changes_to_the_changelog_and_sink(self):
+        import json
+        import os
+        import tempfile
+        from divifilter_data_updater.divifilter_data_updater_runner import _publish_scrape
+        feed_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(feed_dir.cleanup)
+        sink_path = os.path.join(feed_dir.name, "changes.ndjson")
+        mysql = MagicMock()
+        mysql.get_data_rows.side_effect = [{"KO": {"Symbol": "KO", "Price": 60.0}},
+                                           {"KO": {"Symbol": "KO", "Price": 61.0}}]
+        mysql.append_changelog.side_effect = lambda source, changes, changed_at: [
+            dict(change, version=7, source=source) for change in changes]
+
+        _publish_scrape(_default_config(changefeed_enabled=True, changefeed_sink=sink_path), mysql,
+                        {"KO": {"Symbol": "KO", "Price": 61.0}}, None, complete=False)
+
+        self.assertEqual([c.args[0] for c in mysql.get_data_rows.call_args_list], [["KO"], ["KO"]])
+        mysql.append_changelog.assert_called_once_with(
+            "drip_scrape", [{"Symbol": "KO", "column": "Price", "op": "update", "old": 60.0, "new": 61.0}], ANY)
+        mysql.prune_changelog.assert_called_once_with(1000)
+        with open(sink_path, encoding="utf-8") as feed_file:
+            self.assertEqual([json.loads(line)["version"] for line in feed_file], [7])
+
+    def test_complete_publish_diffs_the_whole_table(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _publish_scrape
+        mysql = MagicMock()
+        mysql.get_data_rows.return_value = {}
+
+        _publish_scrape(_default_config(changefeed_enabled=True), mysql, {"KO": {"Symbol": "KO"}}, "v2", complete=True)
+
+        self.assertEqual([c.args[0] for c in mysql.get_data_rows.call_args_list], [None, None])
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.ScrapeCheckpoint')
+    def test_no_checkpoint_without_a_dataset_version(self, mock_checkpoint_cls):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = []
+
+        _scrape_and_publish(_default_config(), scraper, MagicMock(), None)
+
+        mock_checkpoint_cls.assert_not_called()
+        self.assertIsNone(scraper.scrape_all_data.call_args.kwargs["checkpoint"])
+
+    def test_complete_scrape_replaces_dead_letters(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        scraper = MagicMock()
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}]
+        scraper.dead_letters = [{"Symbol": "BAD", "url": "http://example.com/bad", "status": 503}]
+        mysql = MagicMock()
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _scrape_and_publish(_default_config(), scraper, mysql, "v2")
+
+        mysql.remove_dead_letters.assert_called_once_with(None)
+        mysql.save_dead_letters.assert_called_once_with(scraper.dead_letters)
+
+    def test_unchanged_version_retries_only_dead_letters(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_if_due
+        scraper = MagicMock()
+        scraper.scrape_symbols.return_value = [{"Symbol": "KO", "Price": 60.0}]
+        scraper.dead_letters = []
+        mysql = self._connection({"drip_available_gmt": "v1", "drip_updated_gmt": "v1"}, 60)
+        mysql.get_dead_letters.return_value = [{"Symbol": "KO", "url": "http://example.com/KO", "status": 503}]
+
+        _scrape_if_due(_default_config(), scraper, mysql)
+
+        scraper.scrape_all_data.assert_not_called()
+        self.assertEqual(scraper.scrape_symbols.call_args.args[0], [{"symbol": "KO", "url": "http://example.com/KO"}])
+        mysql.update_data_table_from_records.assert_called_once_with(
+            [{"Symbol": "KO", "Price": 60.0, "Drip Updated": ANY}], prune=False)
+        mysql.update_metadata_table.assert_not_called()
+        mysql.remove_dead_letters.assert_called_once_with(["KO"])
+
+    def _canary_scrape(self, sample, baseline):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_and_publish
+        scraper = MagicMock()
+        scraper.get_tickers.return_value = [{"symbol": s, "url": f"https://example.com/{s}"} for s in ("AAPL", "KO")]
+        scraper.scrape_sample.return_value = sample
+        scraper.scrape_all_data.return_value = [{"Symbol": "AAPL", "Price": 150.0}, {"Symbol": "KO", "Price": None}]
+        scraper.dead_letters = []
+        mysql = MagicMock()
+        mysql.get_field_coverage.return_value = baseline
+        checkpoint = MagicMock()
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.ScrapeCheckpoint', return_value=checkpoint):
+            _scrape_and_publish(_default_config(scrape_canary_size=20), scraper, mysql, "v2")
+        return scraper, mysql, checkpoint
+
+    def test_broken_canary_skips_the_full_scrape(self):
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="ERROR"):
+            scraper, mysql, _ = self._canary_scrape([{"Symbol": "KO", "Price": None}], {"Price": 1.0})
+
+        self.assertEqual(scraper.scrape_sample.call_args.args[1], 2)
+        scraper.scrape_all_data.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
+
+    def test_canary_counts_values_that_do_not_clean_to_a_number_as_empty(self):
+        sample = [{"Symbol": "KO", "Price": "N/A"}, {"Symbol": "AAPL", "Price": "--"}]
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="ERROR") as logs:
+            scraper, _, _ = self._canary_scrape(sample, {"Price": 1.0})
+
+        self.assertIn("Price: 0% filled", logs.output[0])
+        scraper.scrape_all_data.assert_not_called()
+        self.assertEqual(sample[0]["Price"], "N/A")
+
+    def test_healthy_canary_goes_on_to_the_full_scrape(self):
+        sample = [{"Symbol": "KO", "Price": "$60.00"}]
+        scraper, mysql, checkpoint = self._canary_scrape(sample, {"Price": 1.0})
+
+        self.assertIs(scraper.scrape_all_data.call_args.kwargs["tickers"], scraper.get_tickers.return_value)
+        checkpoint.save.assert_called_once_with(sample)
+        mysql.save_field_coverage.assert_called_once_with({"Price": 0.5})
+
+    def _incremental_scrape(self, tickers, page_versions, known_versions, published):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_if_due
+        scraper = MagicMock()
+        scraper.get_tickers.return_value = [{"symbol": s, "url": f"https://example.com/{s}"} for s in tickers]
+        scraper.get_page_versions.return_value = page_versions
+        scraper.scrape_symbols.side_effect = lambda to_fetch, deadline: [
+            {"Symbol": t["symbol"], "Price": 1.0} for t in to_fetch]
+        scraper.dead_letters = []
+        mysql = self._connection({"drip_available_gmt": "v2", "drip_updated_gmt": "v1"}, 60)
+        mysql.get_tickers_from_db.return_value = published
+        mysql.get_page_versions.return_value = known_versions
+        _scrape_if_due(_default_config(scrape_incremental=True), scraper, mysql)
+        return scraper, mysql
+
+    def test_incremental_scrape_fetches_only_changed_pages(self):
+        published = [f"S{i}" for i in range(20)]
+        tickers = published[:19] + ["NEW"]
+        page_versions = {f"https://example.com/{s}": "2026-06-01" for s in tickers}
+        page_versions["https://example.com/S1"] = "2026-06-20"
+        known_versions = {s: "2026-06-01" for s in published}
+
+        scraper, mysql = self._incremental_scrape(tickers, page_versions, known_versions, published)
+
+        scraper.scrape_all_data.assert_not_called()
+        self.assertEqual([t["symbol"] for t in scraper.scrape_symbols.call_args.args[0]], ["S1", "NEW"])
+        mysql.remove_stocks.assert_called_once_with(["S19"])
+        mysql.update_data_table_from_records.assert_called_once_with(
+            [{"Symbol": "S1", "Price": 1.0, "Drip Updated": ANY}, {"Symbol": "NEW", "Price": 1.0, "Drip Updated": ANY}],
+            prune=False)
+        mysql.save_page_versions.assert_called_once_with({"S1": "2026-06-20", "NEW": "2026-06-01"})
+        mysql.update_metadata_table.assert_called_once_with({"radar_file": ANY, "drip_updated_gmt": "v2"})
+
+    def test_incremental_scrape_does_not_mass_delete(self):
+        published = ["AAPL", "KO", "MSFT"]
+        versions = {"https://example.com/AAPL": "2026-06-01"}
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            scraper, mysql = self._incremental_scrape(["AAPL"], versions, {"AAPL": "2026-06-01"}, published)
+
+        mysql.remove_stocks.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
+        mysql.update_metadata_table.assert_called_once_with({"radar_file": ANY, "drip_updated_gmt": "v2"})
+
+    def test_no_dead_letters_means_no_targeted_scrape(self):
+        from divifilter_data_updater.divifilter_data_updater_runner import _scrape_if_due
+        scraper = MagicMock()
+        mysql = self._connection({"drip_available_gmt": "v1", "drip_updated_gmt": "v1"}, 60)
+        mysql.get_dead_letters.return_value = []
+
+        _scrape_if_due(_default_config(), scraper, mysql)
+
+        scraper.scrape_symbols.assert_not_called()
+        mysql.update_data_table_from_records.assert_not_called()
+
+
+@patch('divifilter_data_updater.divifilter_data_updater_runner._stop_event', new_callable=threading.Event)
+class TestShutdown(unittest.TestCase):
+
+    def test_cancelled_scrape_is_discarded(self, stop_event):
+        from divifilter_data_updater.divifilter_data_updater_runner import _cycle_deadline, _scrape_and_publish
+        scraper = MagicMock()
+        scraper.scrape_all_data.side_effect = lambda deadline, checkpoint, tickers: stop_event.set() or [{"Symbol": "AAPL"}]
+        mysql = MagicMock()
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _scrape_and_publish(_default_config(), scraper, mysql, "v2", _cycle_deadline(_default_config()))
+
+        mysql.update_data_table_from_records.assert_not_called()
+        mysql.update_metadata_table.assert_not_called()
+
+    def test_cancelled_yahoo_fetch_is_discarded(self, stop_event):
+        from divifilter_data_updater.divifilter_data_updater_runner import _cycle_deadline, _run_yahoo_enrichment
+        mysql = MagicMock()
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner.get_yahoo_finance_data_for_tickers_list',
+                   side_effect=lambda tickers, deadline: stop_event.set() or (None, {"AAPL": {}})), \
+                self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _run_yahoo_enrichment(_default_config(), mysql, _cycle_deadline(_default_config()))
+
+        mysql.update_data_table.assert_not_called()
+
+    def test_shutdown_after_merge_skips_maintenance_but_records_version(self, stop_event):
+        from divifilter_data_updater.divifilter_data_updater_runner import _publish_scrape
+        mysql = MagicMock()
+        mysql.update_data_table_from_records.side_effect = lambda records, prune: stop_event.set()
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="WARNING"):
+            _publish_scrape(_default_config(), mysql, {"AAPL": {"Symbol": "AAPL"}}, "v2", complete=True)
+
+        mysql.refresh_summary_tables.assert_not_called()
+        mysql.update_metadata_table.assert_called_once_with(
+            {"radar_file": ANY, "drip_updated_gmt": "v2"})
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner._shutdown_requested_at', None)
+    def test_shutdown_without_a_signal_is_logged(self, stop_event):
+        from divifilter_data_updater.divifilter_data_updater_runner import _log_shutdown_latency
+
+        with self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="INFO") as logs:
+            _log_shutdown_latency()
+
+        self.assertEqual(logs.records[-1].getMessage(), "Shutdown requested, exiting.")
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner._register_signal_handlers')
+    def test_default_loop_logs_the_shutdown_latency(self, mock_register, stop_event):
+        import time
+        from divifilter_data_updater.divifilter_data_updater_runner import init
+        stop_event.set()
+
+        with patch('divifilter_data_updater.divifilter_data_updater_runner._shutdown_requested_at',
+                   time.monotonic() - 2), \
+                self.assertLogs("divifilter_data_updater.divifilter_data_updater_runner", level="INFO") as logs:
+            init()
+
+        self.assertIn("after the signal", logs.records[-1].getMessage())
+
+    @patch('divifilter_data_updater.divifilter_data_updater_runner.connect_database', side_effect=OSError("down"))
+    def test_connect_backoff_is_interrupted_by_shutdown(self, mock_connect, stop_event):
+        from divifilter_data_updater.divifilter_data_updater_runner import _connect_with_retry
+        stop_event.set()
+
+        with self.assertRaises(OSError):
+            _connect_with_retry("sqlite://", base_delay=30)
+
+        mock_connect.assert_called_once()
 
 
 if __name__ == '__main__':
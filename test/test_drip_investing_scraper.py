@@ -1,6 +1,11 @@
+import threading
+import time
 import unittest
+from itertools import chain, repeat
 from unittest.mock import patch, MagicMock
-from divifilter_data_updater.drip_investing_scraper import DripInvestingScraper
+from divifilter_data_updater.deadline import Deadline
+from divifilter_data_updater.drip_investing_scraper import DripInvestingScraper, _CancellableRetry
+from divifilter_data_updater.hedging import HedgePolicy
 from divifilter_data_updater.helper_functions import clean_numeric_value
 
 
@@ -143,6 +148,11 @@ class TestDripInvestingScraper(unittest.TestCase):
 
 class TestScrapeAllData(unittest.TestCase):
 
+    def setUp(self):
+        backoff = patch.object(DripInvestingScraper, 'RETRY_PASS_BACKOFF_SECONDS', 0)
+        backoff.start()
+        self.addCleanup(backoff.stop)
+
     @patch('divifilter_data_updater.drip_investing_scraper.requests.Session')
     def test_all_succeed(self, mock_session):
         scraper = DripInvestingScraper(max_workers=2)
@@ -171,9 +181,70 @@ class TestScrapeAllData(unittest.TestCase):
                  {"Symbol": "AAPL", "Price": 150.0},
                  None,
                  {"Symbol": "MSFT", "Price": 300.0},
+                 None,
              ]):
             result = scraper.scrape_all_data()
             self.assertEqual(len(result), 2)
+            self.assertEqual([entry["Symbol"] for entry in scraper.dead_letters], ["BAD"])
+
+    def test_scrape_sample_and_reusing_listed_tickers(self):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": s, "url": f"http://example.com/{s}"} for s in ("AAPL", "KO", "MSFT")]
+        with patch.object(scraper, 'get_tickers') as mock_get_tickers, \
+             patch.object(scraper, 'get_stock_data',
+                          side_effect=lambda info, **kwargs: {"Symbol": info["symbol"], "Price": "$1.50"}):
+            sample = scraper.scrape_sample(tickers, 2)
+            result = scraper.scrape_all_data(tickers=tickers)
+
+        mock_get_tickers.assert_not_called()
+        self.assertEqual(len(sample), 2)
+        self.assertEqual(sample[0]["Price"], "$1.50")
+        self.assertEqual([record["Symbol"] for record in result], ["AAPL", "KO", "MSFT"])
+
+    @patch('divifilter_data_updater.drip_investing_scraper.requests.Session')
+    def test_retry_pass_recovers_failed_tickers(self, mock_session):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": s, "url": f"http://example.com/{s}"} for s in ("AAPL", "KO")]
+        attempts = {}
+
+        def flaky_fetch(stock_info, deadline=None):
+            attempts[stock_info["symbol"]] = attempts.get(stock_info["symbol"], 0) + 1
+            if stock_info["symbol"] == "KO" and attempts["KO"] == 1:
+                return None
+            return {"Symbol": stock_info["symbol"]}
+
+        with patch.object(scraper, 'get_tickers', return_value=tickers), \
+             patch.object(scraper, 'get_stock_data', side_effect=flaky_fetch):
+            result = scraper.scrape_all_data()
+
+        self.assertEqual(result, [{"Symbol": "AAPL"}, {"Symbol": "KO"}])
+        self.assertEqual(attempts, {"AAPL": 1, "KO": 2})
+        self.assertEqual(scraper.dead_letters, [])
+
+    def test_dead_letters_keep_last_status_and_truncated_body(self):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": "BAD", "url": "http://example.com/bad"}]
+        response = MagicMock(status_code=503, text="x" * 2000)
+        with patch.object(scraper, '_get_session') as mock_session:
+            mock_session.return_value.get.return_value = response
+            result = scraper.scrape_tickers(tickers)
+
+        self.assertIsNone(result["BAD"])
+        self.assertEqual(mock_session.return_value.get.call_count, 2)
+        self.assertEqual(len(scraper.dead_letters), 1)
+        entry = scraper.dead_letters[0]
+        self.assertEqual((entry["Symbol"], entry["url"], entry["status"]), ("BAD", "http://example.com/bad", 503))
+        self.assertEqual(len(entry["body"]), scraper.DEAD_LETTER_BODY_CHARS)
+
+    def test_scrape_symbols_targets_only_the_given_tickers(self):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": "KO", "url": "http://example.com/KO"}]
+        with patch.object(scraper, 'get_tickers') as mock_get_tickers, \
+             patch.object(scraper, 'get_stock_data', return_value={"Symbol": "KO", "Price": 60.0}):
+            result = scraper.scrape_symbols(tickers)
+
+        mock_get_tickers.assert_not_called()
+        self.assertEqual(result, [{"Symbol": "KO", "Price": 60.0}])
 
     @patch('divifilter_data_updater.drip_investing_scraper.requests.Session')
     def test_all_failures(self, mock_session):
@@ -196,7 +267,208 @@ class TestScrapeAllData(unittest.TestCase):
             self.assertEqual(len(result), 0)
             mock_get_data.assert_not_called()
 
+    @patch('divifilter_data_updater.drip_investing_scraper.requests.Session')
+    def test_expired_deadline_skips_unstarted_tickers(self, mock_session):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": "AAPL", "url": "http://example.com/aapl"}]
+        expired = Deadline(1, clock=chain([0], repeat(5)).__next__)
+        with patch.object(scraper, 'get_tickers', return_value=tickers) as mock_get_tickers, \
+             patch.object(scraper, 'get_stock_data') as mock_get_data, \
+             self.assertLogs(scraper.logger, level="WARNING"):
+            result = scraper.scrape_all_data(deadline=expired)
+
+        self.assertEqual(result, [])
+        mock_get_data.assert_not_called()
+        self.assertIs(mock_get_tickers.call_args.kwargs["deadline"], expired)
+
+    def test_request_timeout_shrinks_to_fit_the_deadline(self):
+        scraper = DripInvestingScraper()
+        self.assertEqual(scraper._timeout(Deadline()), 30)
+        # four attempts (first try plus three retries) share the 20 seconds left
+        self.assertEqual(scraper._timeout(Deadline(20, clock=lambda: 0)), 5)
+
+    def test_shutdown_cancels_queued_fetches_without_waiting_for_in_flight(self):
+        stop_event = threading.Event()
+        release = threading.Event()
+        scraper = DripInvestingScraper(max_workers=1, stop_event=stop_event)
+        scraper.CANCEL_POLL_SECONDS = 0.01
+        tickers = [{"symbol": s, "url": f"http://example.com/{s}"} for s in ("AAPL", "KO", "MSFT")]
+
+        def slow_fetch(stock_info, deadline=None):
+            stop_event.set()
+            release.wait(5)
+            return {"Symbol": stock_info["symbol"]}
+
+        with patch.object(scraper, 'get_tickers', return_value=tickers), \
+             patch.object(scraper, 'get_stock_data', side_effect=slow_fetch) as mock_get_data, \
+             self.assertLogs(scraper.logger, level="WARNING") as logs:
+            started = time.monotonic()
+            result = scraper.scrape_all_data(deadline=Deadline(cancel_event=stop_event))
+            elapsed = time.monotonic() - started
+            release.set()
+
+        self.assertLess(elapsed, 2)
+        self.assertEqual(result, [])
+        self.assertEqual(mock_get_data.call_count, 1)
+        self.assertIn("Shutdown requested; skipped 3 tickers", "\n".join(logs.output))
+
+    @patch('divifilter_data_updater.drip_investing_scraper.requests.Session')
+    def test_resumes_from_checkpoint_and_saves_new_stocks(self, mock_session):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": s, "url": f"http://example.com/{s}"} for s in ("AAPL", "KO", "MSFT")]
+        checkpoint = MagicMock()
+        checkpoint.load.return_value = {"KO": {"Symbol": "KO", "Price": 60.0}}
+        with patch.object(scraper, 'get_tickers', return_value=tickers), \
+             patch.object(scraper, 'get_stock_data',
+                          side_effect=lambda info, **kwargs: {"Symbol": info["symbol"], "Price": 1.5}) as mock_get_data:
+            result = scraper.scrape_all_data(checkpoint=checkpoint)
+
+        self.assertEqual([call.args[0]["symbol"] for call in mock_get_data.call_args_list], ["AAPL", "MSFT"])
+        self.assertEqual(result, [{"Symbol": "AAPL", "Price": 1.5}, {"Symbol": "KO", "Price": 60.0},
+                                  {"Symbol": "MSFT", "Price": 1.5}])
+        saved = [record["Symbol"] for call in checkpoint.save.call_args_list for record in call.args[0]]
+        self.assertEqual(sorted(saved), ["AAPL", "MSFT"])
+
+    @patch('divifilter_data_updater.drip_investing_scraper.requests.Session')
+    def test_checkpoint_errors_do_not_stop_the_scrape(self, mock_session):
+        scraper = DripInvestingScraper(max_workers=2)
+        tickers = [{"symbol": "AAPL", "url": "http://example.com/aapl"}]
+        checkpoint = MagicMock()
+        checkpoint.load.side_effect = OSError("db down")
+        checkpoint.save.side_effect = OSError("db down")
+        with patch.object(scraper, 'get_tickers', return_value=tickers), \
+             patch.object(scraper, 'get_stock_data', return_value={"Symbol": "AAPL"}), \
+             self.assertLogs(scraper.logger, level="WARNING"):
+            result = scraper.scrape_all_data(checkpoint=checkpoint)
+
+        self.assertEqual(result, [{"Symbol": "AAPL"}])
+
+
+class TestPageVersions(unittest.TestCase):
+
+    SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://www.dripinvesting.org/stock-sitemap.xml</loc></sitemap>
+</sitemapindex>"""
+    STOCK_SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://www.dripinvesting.org/stocks/ko/</loc><lastmod>2026-06-20T03:09:53+00:00</lastmod></url>
+  <url><loc>https://www.dripinvesting.org/stocks/no-lastmod/</loc></url>
+</urlset>"""
+
+    def _get(self, url, timeout):
+        content = {"https://www.dripinvesting.org/sitemap.xml": self.SITEMAP_INDEX,
+                   "https://www.dripinvesting.org/stock-sitemap.xml": self.STOCK_SITEMAP}[url]
+        return MagicMock(content=content)
+
+    def test_sitemap_lastmod_with_head_fallback(self):
+        scraper = DripInvestingScraper()
+        tickers = [{"symbol": "KO", "url": "https://www.dripinvesting.org/stocks/ko/"},
+                   {"symbol": "MSFT", "url": "https://www.dripinvesting.org/stocks/msft/"},
+                   {"symbol": "PEP", "url": "https://www.dripinvesting.org/stocks/pep/"}]
+        heads = {"https://www.dripinvesting.org/stocks/msft/": MagicMock(status_code=200, headers={"ETag": '"abc"'}),
+                 "https://www.dripinvesting.org/stocks/pep/": MagicMock(status_code=200, headers={})}
+        with patch.object(scraper, '_get_session') as mock_session:
+            mock_session.return_value.get.side_effect = self._get
+            mock_session.return_value.head.side_effect = lambda url, **kwargs: heads[url]
+            versions = scraper.get_page_versions(tickers)
+
+        self.assertEqual(versions, {"https://www.dripinvesting.org/stocks/ko/": "2026-06-20T03:09:53+00:00",
+                                    "https://www.dripinvesting.org/stocks/msft/": '"abc"',
+                                    "https://www.dripinvesting.org/stocks/pep/": None})
+
+    def test_unreadable_sitemap_falls_back_to_head(self):
+        scraper = DripInvestingScraper()
+        tickers = [{"symbol": "KO", "url": "https://www.dripinvesting.org/stocks/ko/"}]
+        with patch.object(scraper, '_get_session') as mock_session, \
+             self.assertLogs(scraper.logger, level="WARNING"):
+            mock_session.return_value.get.return_value = MagicMock(content=b"<html>not a sitemap")
+            mock_session.return_value.head.return_value = MagicMock(
+                status_code=200, headers={"Last-Modified": "Sat, 20 Jun 2026 03:09:53 GMT"})
+            versions = scraper.get_page_versions(tickers)
+
+        self.assertEqual(versions, {"https://www.dripinvesting.org/stocks/ko/": "Sat, 20 Jun 2026 03:09:53 GMT"})
+
+
+class TestHedgedFetch(unittest.TestCase):
+
+    def test_slow_stock_page_is_hedged(self):
+        policy = HedgePolicy(min_samples=1, min_delay=0.01, budget_fraction=1)
+        policy.note_call()
+        policy.record(0.01)
+        scraper = DripInvestingScraper(max_workers=1, hedge_policy=policy)
+        release = threading.Event()
+        responses = iter([MagicMock(status_code=503, text="stuck"), MagicMock(status_code=404, text="gone")])
+
+        def get(url, timeout):
+            response = next(responses)
+            if response.text == "stuck":
+                release.wait(5)
+            return response
+
+        with patch.object(scraper, '_get_session') as mock_session, \
+             self.assertLogs(scraper.logger, level="WARNING") as logs:
+            mock_session.return_value.get.side_effect = get
+            result = scraper.get_stock_data({"symbol": "KO", "url": "http://example.com/KO"})
+            release.set()
+
+        self.assertIsNone(result)
+        self.assertIn("Failed to fetch data for KO: 404", "\n".join(logs.output))
+        self.assertEqual((policy.hedges, policy.hedges_won), (1, 1))
+
+    def test_hedge_executor_is_shut_down_after_each_scrape(self):
+        policy = HedgePolicy(min_samples=1, min_delay=0.01, budget_fraction=1)
+        scraper = DripInvestingScraper(max_workers=1, hedge_policy=policy)
+        tickers = [{"symbol": "KO", "url": "http://example.com/KO"}]
+        executors = []
+
+        def fetch(stock_info, deadline=None):
+            scraper._get_page(stock_info["url"], deadline)
+            executors.append(scraper._hedge_executor)
+            return {"Symbol": stock_info["symbol"]}
+
+        with patch.object(scraper, '_get_session'), patch.object(scraper, 'get_stock_data', side_effect=fetch):
+            scraper.scrape_tickers(tickers)
+            scraper.scrape_tickers(tickers)
+
+        self.assertIsNone(scraper._hedge_executor)
+        self.assertEqual(len(executors), 2)
+        self.assertIsNot(executors[0], executors[1])
+        self.assertTrue(all(executor._shutdown for executor in executors))
+
+    def test_no_hedging_without_a_policy(self):
+        scraper = DripInvestingScraper()
+        with patch.object(scraper, '_get_session') as mock_session, \
+             patch('divifilter_data_updater.drip_investing_scraper.hedged_call') as mock_hedged_call:
+            scraper._get_page("http://example.com/KO", Deadline())
+
+        mock_hedged_call.assert_not_called()
+        mock_session.return_value.get.assert_called_once_with("http://example.com/KO", timeout=30)
+
+
+class TestCancellableRetry(unittest.TestCase):
+
+    def test_stops_retrying_once_stop_event_is_set(self):
+        stop_event = threading.Event()
+        retry = _CancellableRetry(total=3, backoff_factor=1)
+        retry.stop_event = stop_event
+        retry = retry.new(total=2)
+        self.assertIs(retry.stop_event, stop_event)
+        self.assertFalse(retry.is_exhausted())
+
+        stop_event.set()
+        self.assertTrue(retry.is_exhausted())
+        with patch('urllib3.util.retry.time.sleep') as mock_sleep:
+            retry.new(total=1, history=(None,) * 3).sleep()
+        mock_sleep.assert_not_called()
+
+    def test_session_uses_cancellable_retries(self):
+        stop_event = threading.Event()
+        scraper = DripInvestingScraper(stop_event=stop_event)
+        retries = scraper._get_session().get_adapter("https://www.dripinvesting.org").max_retries
+        self.assertIsInstance(retries, _CancellableRetry)
+        self.assertIs(retries.stop_event, stop_event)
+
 
 if __name__ == '__main__':
     unittest.main()
-
@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from divifilter_data_updater.hedging import HedgePolicy, hedged_call
+
+
+def _warm_policy(latency=0.01, samples=20, **kwargs):
+    policy = HedgePolicy(min_samples=samples, min_delay=0.01, **kwargs)
+    for _ in range(samples):
+        policy.note_call()
+        policy.record(latency)
+    return policy
+
+
+class TestHedgePolicy(unittest.TestCase):
+
+    def test_no_hedging_until_enough_samples(self):
+        policy = HedgePolicy(min_samples=3)
+        policy.record(1.0)
+        policy.record(2.0)
+        self.assertIsNone(policy.delay())
+        policy.record(3.0)
+        self.assertEqual(policy.delay(), 3.0)
+
+    def test_delay_is_the_latency_percentile(self):
+        policy = HedgePolicy(percentile=90, min_samples=1, min_delay=0)
+        for seconds in range(1, 101):
+            policy.record(seconds / 100)
+        self.assertEqual(policy.delay(), 0.91)
+
+    def test_delay_has_a_floor(self):
+        policy = HedgePolicy(min_samples=1, min_delay=1.0)
+        policy.record(0.1)
+        self.assertEqual(policy.delay(), 1.0)
+
+    def test_budget_caps_hedges(self):
+        policy = HedgePolicy(budget_fraction=0.1)
+        for _ in range(20):
+            policy.note_call()
+        self.assertEqual([policy.try_acquire() for _ in range(3)], [True, True, False])
+
+    def test_reset_forgets_latencies_and_budget(self):
+        policy = _warm_policy()
+        policy.try_acquire()
+        policy.reset()
+        self.assertIsNone(policy.delay())
+        self.assertEqual((policy.calls, policy.hedges), (0, 0))
+
+
+class TestHedgedCall(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_fast_call_is_not_hedged(self):
+        policy = _warm_policy(budget_fraction=1)
+        calls = []
+
+        self.assertEqual(hedged_call(self.executor, lambda: calls.append(1) or "page", policy), "page")
+        self.assertEqual((len(calls), policy.hedges), (1, 0))
+
+    def test_slow_call_is_hedged_and_the_first_answer_wins(self):
+        policy = _warm_policy(budget_fraction=1)
+        release = threading.Event()
+        attempts = []
+
+        def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                release.wait(5)
+                return "stuck"
+            return "hedge"
+
+        self.assertEqual(hedged_call(self.executor, call, policy), "hedge")
+        release.set()
+        self.assertEqual((policy.hedges, policy.hedges_won), (1, 1))
+
+    def test_no_hedge_without_budget(self):
+        policy = _warm_policy(budget_fraction=0)
+        attempts = []
+
+        def call():
+            attempts.append(1)
+            time.sleep(0.1)
+            return "slow"
+
+        self.assertEqual(hedged_call(self.executor, call, policy), "slow")
+        self.assertEqual(len(attempts), 1)
+
+    def test_failed_copy_falls_back_to_the_other(self):
+        policy = _warm_policy(budget_fraction=1)
+        release = threading.Event()
+        attempts = []
+
+        def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                release.wait(0.2)
+                return "primary"
+            raise ConnectionError("reset")
+
+        self.assertEqual(hedged_call(self.executor, call, policy), "primary")
+        self.assertEqual(policy.hedges_won, 0)
+
+    def test_raises_when_both_copies_fail(self):
+        policy = _warm_policy(budget_fraction=1)
+        release = threading.Event()
+        attempts = []
+
+        def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                release.wait(0.2)
+                raise TimeoutError("primary timed out")
+            raise ConnectionError("reset")
+
+        with self.assertRaisesRegex(TimeoutError, "primary"):
+            hedged_call(self.executor, call, policy)
+
+
+if __name__ == '__main__':
+    unittest.main()
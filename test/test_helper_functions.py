@@ -4,8 +4,10 @@ from datetime import datetime
 import pandas as pd
 from divifilter_data_updater.helper_functions import (
     clean_numeric_value, radar_dict_to_table, remove_unneeded_columns,
-    get_current_datetime_string, random_delay, validate_radar_data
+    get_current_datetime_string, random_delay, validate_radar_data,
+    clean_numeric_series, clean_numeric_records
 )
+import numpy as np
 
 
 class TestHelperFunctions(unittest.TestCase):
@@ -54,6 +56,59 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertEqual(clean_numeric_value("$99.999"), 100.0)
         self.assertEqual(clean_numeric_value("5.678%"), 5.68)
 
+
+class TestCleanNumericSeries(unittest.TestCase):
+
+    CASES = ["123.45", 123.45, "1,234.56", "$123.45", "-$123.45", "5.5%", "0.65%", "1.5M", "2.3B", "850M",
+             "1.2T", "12.5K", "15x", "56.8x", "", None, "N/A", "-", "None", "abc", "1.2.3", "123.456",
+             "123.454", "1,234.5678", 123.456789, "$99.999", "5.678%", "$34,005.3M", "40.8x", "1.5b",
+             " 3 K ", True, "1.005", "0.285", "2.675"]
+
+    def _assert_matches_scalar(self, raw_values, cleaned):
+        for raw, value in zip(raw_values, cleaned):
+            expected = clean_numeric_value(raw)
+            if expected is None:
+                self.assertTrue(np.isnan(value), raw)
+            else:
+                self.assertEqual(value, expected, raw)
+
+    def test_matches_clean_numeric_value_on_array(self):
+        cleaned = clean_numeric_series(np.array(self.CASES, dtype=object))
+        self.assertIsInstance(cleaned, np.ndarray)
+        self._assert_matches_scalar(self.CASES, cleaned)
+
+    def test_series_keeps_index(self):
+        series = pd.Series(["$1.5K", "N/A"], index=["A", "B"])
+        cleaned = clean_numeric_series(series)
+        self.assertEqual(list(cleaned.index), ["A", "B"])
+        self.assertEqual(cleaned["A"], 1500.0)
+        self.assertTrue(np.isnan(cleaned["B"]))
+
+    def test_numeric_input_is_only_rounded(self):
+        cleaned = clean_numeric_series(pd.Series([1.23456, np.nan, 2.675]))
+        self._assert_matches_scalar([1.23456, None, 2.675], cleaned)
+
+    def test_matches_clean_numeric_value_on_random_inputs(self):
+        rng = np.random.default_rng(7)
+        raw = [f"{prefix}{number:,.{decimals}f}{suffix}" for prefix, number, decimals, suffix in zip(
+            rng.choice(["", "$", "-$"], 2000), rng.uniform(0, 1e4, 2000), rng.integers(0, 5, 2000),
+            rng.choice(["", "%", "x", "K", "M", "B", "T"], 2000))]
+        self._assert_matches_scalar(raw, clean_numeric_series(np.array(raw, dtype=object)))
+
+
+class TestCleanNumericRecords(unittest.TestCase):
+
+    def test_cleans_columns_in_place(self):
+        records = [{"Price": "$1.50", "Sector": "Tech"}, {"Price": "N/A"}, {"Sector": "X"}]
+        result = clean_numeric_records(records, ["Price", "Div Yield"])
+        self.assertIs(result, records)
+        self.assertEqual(records, [{"Price": 1.5, "Sector": "Tech"}, {"Price": None}, {"Sector": "X"}])
+        self.assertIsInstance(records[0]["Price"], float)
+
+    def test_empty_records(self):
+        self.assertEqual(clean_numeric_records([], ["Price"]), [])
+
+
 class TestValidateRadarData(unittest.TestCase):
 
     def test_nulls_out_of_range_values(self):
@@ -77,6 +132,18 @@ class TestValidateRadarData(unittest.TestCase):
         self.assertIsNone(result["AAPL"]["Price"])
         self.assertEqual(result["AAPL"]["Div Yield"], "n/a")  # untouched (not numeric)
 
+    def test_only_offending_cells_change(self):
+        data = {"AAPL": {"Price": -1.0, "Sector": "Tech"}, "MSFT": {"Price": 300.0}}
+        result = validate_radar_data(data)
+        self.assertEqual(result, {"AAPL": {"Price": None, "Sector": "Tech"}, "MSFT": {"Price": 300.0}})
+
+    @patch('divifilter_data_updater.validation.logger')
+    def test_logs_aggregated_report(self, mock_logger):
+        data = {f"S{i}": {"Price": -1.0} for i in range(50)}
+        validate_radar_data(data)
+        # one line for the range rule and one for the resulting null rate, not one per cell
+        self.assertEqual(mock_logger.warning.call_count, 2)
+
     def test_unvalidated_fields_untouched(self):
         data = {"AAPL": {"P/E": -10.0, "Chowder Number": 999.0}}
         result = validate_radar_data(data)
@@ -105,6 +172,19 @@ class TestRadarDictToTable(unittest.TestCase):
         df = radar_dict_to_table(data)
         self.assertEqual(df.shape[0], 1)
 
+    def test_registered_columns_get_schema_dtypes(self):
+        data = {
+            "AAPL": {"Symbol": "AAPL", "No Years": 12.0, "Price": 150, "Sector": "Tech", "Yield": "x"},
+            "MSFT": {"Symbol": "MSFT", "No Years": None, "Price": None, "Sector": None, "Yield": "y"},
+        }
+        df = radar_dict_to_table(data)
+        self.assertEqual(str(df["No Years"].dtype), "Int16")
+        self.assertEqual(df.loc["AAPL", "No Years"], 12)
+        self.assertTrue(pd.isna(df.loc["MSFT", "No Years"]))
+        self.assertEqual(df["Price"].dtype, "float64")
+        self.assertFalse(pd.api.types.is_numeric_dtype(df["Sector"]))
+        self.assertEqual(list(df["Yield"]), ["x", "y"])  # unregistered: untouched
+
 
 class TestRemoveUnneededColumns(unittest.TestCase):
 
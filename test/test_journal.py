@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+from divifilter_data_updater.journal import COMPACT_AFTER_ACKS, Journal
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "journal", "updates.journal")
+
+    def test_pending_entries_survive_reopening(self):
+        journal = Journal(self.path)
+        first = journal.append("drip_scrape", {"records": {"AAPL": {"Price": 150.0}}})
+        journal.append("yahoo", {"tickers": {"KO": {"Price": 60.0}}})
+        journal.ack(first)
+
+        self.assertEqual([(kind, payload) for _, kind, payload in Journal(self.path).pending()],
+                         [("yahoo", {"tickers": {"KO": {"Price": 60.0}}})])
+
+    def test_file_is_emptied_once_nothing_is_pending(self):
+        journal = Journal(self.path)
+        journal.ack(journal.append("yahoo", {"tickers": {}}))
+
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertEqual(Journal(self.path).pending(), [])
+
+    def test_torn_tail_is_dropped(self):
+        journal = Journal(self.path)
+        journal.append("yahoo", {"tickers": {"KO": {"Price": 60.0}}})
+        intact = os.path.getsize(self.path)
+        journal.append("yahoo", {"tickers": {"AAPL": {"Price": 150.0}}})
+        with open(self.path, "r+b") as journal_file:
+            journal_file.truncate(os.path.getsize(self.path) - 3)
+
+        with self.assertLogs("divifilter_data_updater.journal", level="WARNING"):
+            reopened = Journal(self.path)
+        self.assertEqual(len(reopened.pending()), 1)
+        self.assertEqual(os.path.getsize(self.path), intact)
+        reopened.append("yahoo", {"tickers": {}})
+        self.assertEqual(len(Journal(self.path).pending()), 2)
+
+    def test_corrupt_record_fails_its_checksum(self):
+        journal = Journal(self.path)
+        journal.append("yahoo", {"tickers": {"KO": {"Price": 60.0}}})
+        with open(self.path, "r+b") as journal_file:
+            journal_file.seek(-1, os.SEEK_END)
+            last = journal_file.read(1)
+            journal_file.seek(-1, os.SEEK_END)
+            journal_file.write(bytes([last[0] ^ 0xFF]))
+
+        with self.assertLogs("divifilter_data_updater.journal", level="WARNING"):
+            self.assertEqual(Journal(self.path).pending(), [])
+
+    def test_acknowledged_entries_are_compacted_away(self):
+        journal = Journal(self.path)
+        journal.append("drip_scrape", {"records": {}})
+        pending_only = os.path.getsize(self.path)
+        for _ in range(COMPACT_AFTER_ACKS):
+            journal.ack(journal.append("yahoo", {"tickers": {"KO": {"Price": 60.0}}}))
+
+        self.assertEqual(os.path.getsize(self.path), pending_only)
+        self.assertEqual([kind for _, kind, _ in Journal(self.path).pending()], ["drip_scrape"])
+
+    def test_replay_applies_in_order_and_stops_at_a_failure(self):
+        journal = Journal(self.path)
+        for n in range(3):
+            journal.append("yahoo", {"n": n})
+        applied = []
+
+        def handler(payload, ack):
+            if payload["n"] == 1 and not applied[1:]:
+                applied.append("failed")
+                raise ConnectionError("MySQL server has gone away")
+            applied.append(payload["n"])
+
+        with self.assertRaises(ConnectionError):
+            journal.replay({"yahoo": handler})
+        self.assertEqual([payload["n"] for _, _, payload in journal.pending()], [1, 2])
+
+        self.assertEqual(journal.replay({"yahoo": handler}), 2)
+        self.assertEqual(applied, [0, "failed", 1, 2])
+        self.assertEqual(Journal(self.path).pending(), [])
+
+    def test_entry_failing_max_attempts_times_is_set_aside(self):
+        journal = Journal(self.path)
+        poisoned = journal.append("yahoo", {"n": 0})
+        journal.append("yahoo", {"n": 1})
+        applied = []
+
+        def handler(payload, ack):
+            if payload["n"] == 0:
+                raise ValueError("Incorrect decimal value")
+            applied.append(payload["n"])
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                journal.replay({"yahoo": handler}, max_attempts=3)
+        # Attempts survive a restart
+        journal = Journal(self.path)
+        with self.assertLogs("divifilter_data_updater.journal", level="ERROR"):
+            self.assertEqual(journal.replay({"yahoo": handler}, max_attempts=3), 1)
+
+        self.assertEqual(applied, [1])
+        self.assertEqual(Journal(self.path).pending(), [])
+        set_aside = Journal(journal.failed_path).pending()
+        self.assertEqual(set_aside, [(poisoned, "yahoo", {"n": 0})])
+
+    def test_handler_can_acknowledge_before_it_fails(self):
+        journal = Journal(self.path)
+        journal.append("yahoo", {"n": 0})
+
+        def handler(payload, ack):
+            ack()
+            raise RuntimeError("summary refresh failed")
+
+        with self.assertRaises(RuntimeError):
+            journal.replay({"yahoo": handler}, max_attempts=1)
+        self.assertEqual(Journal(self.path).pending(), [])
+        self.assertFalse(os.path.exists(journal.failed_path))
+
+    def test_unknown_kinds_are_dropped(self):
+        journal = Journal(self.path)
+        journal.append("retired_kind", {})
+
+        with self.assertLogs("divifilter_data_updater.journal", level="WARNING"):
+            self.assertEqual(journal.replay({}), 0)
+        self.assertEqual(journal.pending(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from divifilter_data_updater.lazy_imports import LazyModule, lazy_callable
+
+
+class TestLazyModule(unittest.TestCase):
+
+    def test_imports_on_first_attribute_access(self):
+        lazy_json = LazyModule("json")
+        self.assertIn("not loaded", repr(lazy_json))
+        self.assertEqual(lazy_json.dumps([1]), "[1]")
+        self.assertIn("loaded", repr(lazy_json))
+
+    def test_attributes_can_be_patched(self):
+        lazy_json = LazyModule("json")
+        with patch.object(lazy_json, "dumps", return_value="patched"):
+            self.assertEqual(lazy_json.dumps([1]), "patched")
+        self.assertEqual(lazy_json.dumps([1]), "[1]")
+
+    def test_lazy_callable_imports_on_first_call(self):
+        dumps = lazy_callable("json", "dumps")
+        self.assertEqual(dumps.__name__, "dumps")
+        self.assertEqual(dumps([1], separators=(",", ":")), "[1]")
+
+    def test_entry_point_import_defers_heavy_dependencies(self):
+        heavy = ("pandas", "numpy", "yfinance", "bs4", "sqlalchemy", "requests")
+        check = f"import sys, update_divifilter_data; print(*[name in sys.modules for name in {heavy!r}])"
+        output = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+        self.assertEqual(dict(zip(heavy, output.split())), dict.fromkeys(heavy, "False"))
+
+
+if __name__ == '__main__':
+    unittest.main()
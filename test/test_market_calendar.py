@@ -0,0 +1,55 @@
+import unittest
+from datetime import date, datetime
+
+from divifilter_data_updater.market_calendar import MarketCalendar
+
+
+class TestMarketCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.calendar = MarketCalendar()
+
+    def test_session_follows_new_york_daylight_saving(self):
+        # 09:30-16:00 New York is 13:30-20:00 UTC in summer, 14:30-21:00 UTC in winter
+        self.assertEqual(self.calendar.session(date(2026, 6, 24)),
+                         (datetime(2026, 6, 24, 13, 30), datetime(2026, 6, 24, 20, 0)))
+        self.assertEqual(self.calendar.session(date(2026, 1, 6)),
+                         (datetime(2026, 1, 6, 14, 30), datetime(2026, 1, 6, 21, 0)))
+
+    def test_weekends_and_holidays_have_no_session(self):
+        self.assertIsNone(self.calendar.session(date(2026, 6, 27)))
+        self.assertIsNone(self.calendar.session(date(2026, 11, 26)))
+
+    def test_early_close(self):
+        self.assertEqual(self.calendar.session(date(2026, 11, 27))[1], datetime(2026, 11, 27, 18, 0))
+
+    def test_is_open(self):
+        self.assertTrue(self.calendar.is_open(datetime(2026, 6, 24, 15, 0)))
+        self.assertFalse(self.calendar.is_open(datetime(2026, 6, 24, 20, 0)))
+        self.assertFalse(self.calendar.is_open(datetime(2026, 6, 27, 15, 0)))
+
+    def test_next_open_skips_weekends_and_holidays(self):
+        # Thanksgiving Thursday 2026 is a holiday; the Friday after opens as usual
+        self.assertEqual(self.calendar.next_open(datetime(2026, 11, 25, 22, 0)), datetime(2026, 11, 27, 14, 30))
+        self.assertEqual(self.calendar.next_open(datetime(2026, 6, 26, 21, 0)), datetime(2026, 6, 29, 13, 30))
+
+    def test_refresh_every_interval_during_the_session(self):
+        self.assertEqual(self.calendar.next_refresh(datetime(2026, 6, 24, 14, 0), 3600),
+                         datetime(2026, 6, 24, 15, 0))
+
+    def test_refresh_once_after_the_close_then_wait_for_the_open(self):
+        after_close = self.calendar.next_refresh(datetime(2026, 6, 24, 19, 30), 3600)
+        self.assertEqual(after_close, datetime(2026, 6, 24, 20, 15))
+        self.assertEqual(self.calendar.next_refresh(after_close, 3600), datetime(2026, 6, 25, 13, 30))
+
+    def test_no_refresh_over_the_weekend(self):
+        self.assertEqual(self.calendar.next_refresh(datetime(2026, 6, 27, 12, 0), 3600),
+                         datetime(2026, 6, 29, 13, 30))
+
+    def test_uncovered_years_fall_back_to_weekdays(self):
+        self.assertFalse(self.calendar.covers(date(2030, 1, 1)))
+        self.assertIsNotNone(self.calendar.session(date(2030, 1, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from datetime import datetime
+
+from divifilter_data_updater.refresh_planner import plan_refresh
+
+NOW = datetime(2026, 6, 24, 12, 0, 0)
+
+
+class TestPlanRefresh(unittest.TestCase):
+
+    CANDIDATES = [
+        ("BIG", "2026-06-24 10:30:00", 3e12),
+        ("MID", "2026-06-24 11:30:00", 2e11),
+        ("TAIL", "2026-06-20 00:00:00", 1e9),
+        ("NEW", None, None),
+        ("ODD", "not a time", 5e8),
+    ]
+
+    def test_stalest_first_with_never_refreshed_leading(self):
+        self.assertEqual(plan_refresh(self.CANDIDATES, NOW), ["NEW", "ODD", "TAIL", "BIG", "MID"])
+
+    def test_budget_keeps_the_stalest(self):
+        self.assertEqual(plan_refresh(self.CANDIDATES, NOW, budget=2), ["NEW", "ODD"])
+
+    def test_popular_symbols_past_their_max_age_jump_the_queue(self):
+        plan = plan_refresh(self.CANDIDATES, NOW, budget=2, popular_count=2, popular_max_age_seconds=3600)
+        # BIG is 90 minutes old; MID (30 minutes) isn't due yet and waits its turn
+        self.assertEqual(plan, ["BIG", "NEW"])
+
+    def test_long_tail_progresses_over_cycles(self):
+        candidates = [(f"S{i}", "2026-06-24 00:00:00", None) for i in range(4)]
+        first = plan_refresh(candidates, NOW, budget=2)
+        refreshed = [(s, "2026-06-24 12:00:00" if s in first else t, p) for s, t, p in candidates]
+        second = plan_refresh(refreshed, NOW, budget=2)
+        self.assertEqual(sorted(first + second), ["S0", "S1", "S2", "S3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
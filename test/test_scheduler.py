@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from divifilter_data_updater.scheduler import ScheduledJob, Scheduler
+
+
+class TestScheduledJob(unittest.TestCase):
+
+    def test_failed_run_is_logged_and_counted(self):
+        job = ScheduledJob("broken", MagicMock(side_effect=RuntimeError("boom")), 10)
+        with self.assertLogs("divifilter_data_updater.scheduler", level="ERROR"):
+            job.run_once()
+        self.assertEqual((job.runs, job.failures), (1, 1))
+
+    def test_next_delay_adds_jitter_within_bounds(self):
+        job = ScheduledJob("jittered", MagicMock(), 100, jitter_seconds=10)
+        delays = [job.next_delay() for _ in range(50)]
+        self.assertTrue(all(100 <= delay <= 110 for delay in delays))
+
+    def test_schedule_replaces_the_fixed_interval(self):
+        job = ScheduledJob("market_hours", MagicMock(), 100, jitter_seconds=0, schedule=lambda: 7200)
+        self.assertEqual(job.next_delay(), 7200)
+
+    def test_runs_until_stopped(self):
+        stop_event = threading.Event()
+        action = MagicMock(side_effect=lambda: stop_event.set() if action.call_count == 3 else None)
+        job = ScheduledJob("repeating", action, 0)
+        job.run_forever(stop_event, max_run_seconds=60)
+        self.assertEqual(action.call_count, 3)
+
+    def test_is_overdue_after_max_run_time(self):
+        job = ScheduledJob("slow", MagicMock(), 10)
+        self.assertFalse(job.is_overdue())
+        job.due_by = time.monotonic() - 1
+        self.assertTrue(job.is_overdue())
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_slow_job_does_not_hold_back_others(self):
+        stop_event = threading.Event()
+        release = threading.Event()
+        fast_runs = []
+
+        def fast():
+            fast_runs.append(1)
+            if len(fast_runs) == 3:
+                release.set()
+                stop_event.set()
+
+        jobs = [ScheduledJob("slow", lambda: release.wait(5), 0), ScheduledJob("fast", fast, 0)]
+        Scheduler(jobs, stop_event, heartbeat_interval=0.01).run()
+
+        self.assertEqual(len(fast_runs), 3)
+        self.assertTrue(release.is_set())
+
+    def test_heartbeat_skipped_while_a_job_is_hung(self):
+        stop_event = threading.Event()
+        heartbeat = MagicMock(side_effect=lambda: stop_event.set())
+        scheduler = Scheduler([], stop_event, heartbeat=heartbeat, heartbeat_interval=0.01)
+        with patch.object(scheduler, "overdue_jobs", side_effect=[["scrape"], []]), \
+                self.assertLogs("divifilter_data_updater.scheduler", level="ERROR"):
+            scheduler.run()
+        heartbeat.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from sqlalchemy import Float, Double, SmallInteger, String
+from divifilter_data_updater.schema import (
+    DIVIDEND_DATA_SCHEMA, COLUMN_TYPES, NUMERIC_COLUMNS, ESSENTIAL_COLUMNS, PANDAS_DTYPES,
+    is_numeric, pandas_dtype, python_converter,
+)
+
+
+class TestSchema(unittest.TestCase):
+
+    def test_ttr_columns_are_numeric_everywhere(self):
+        for column in ("TTR 1Y", "TTR 3Y"):
+            self.assertIn(column, NUMERIC_COLUMNS)
+            self.assertIsInstance(COLUMN_TYPES[column], Float)
+            self.assertEqual(PANDAS_DTYPES[column], "float64")
+
+    def test_derived_views_cover_the_registry(self):
+        self.assertEqual(set(COLUMN_TYPES), set(DIVIDEND_DATA_SCHEMA))
+        self.assertEqual(set(PANDAS_DTYPES), set(DIVIDEND_DATA_SCHEMA))
+        self.assertTrue(set(NUMERIC_COLUMNS) <= set(DIVIDEND_DATA_SCHEMA))
+        self.assertTrue(set(ESSENTIAL_COLUMNS) <= set(DIVIDEND_DATA_SCHEMA))
+
+    def test_symbol_is_neither_numeric_nor_filled(self):
+        self.assertNotIn("Symbol", NUMERIC_COLUMNS)
+        self.assertNotIn("Symbol", ESSENTIAL_COLUMNS)
+
+    def test_text_columns_are_not_numeric(self):
+        for column in ("Company", "Sector", "Industry", "Payouts/ Year"):
+            self.assertNotIn(column, NUMERIC_COLUMNS)
+            self.assertIn(column, ESSENTIAL_COLUMNS)
+
+    def test_optional_page_fields_stay_text(self):
+        for column in ("Price Change", "Price Change %", "Previous Div", "Fair Value (P/E 10)", "FV (P/E 10) %",
+                       "Fair Value (Peter Lynch)", "FV (Peter Lynch) %"):
+            self.assertNotIn(column, NUMERIC_COLUMNS)
+            self.assertEqual(str(COLUMN_TYPES[column]), "VARCHAR(32)")
+
+    def test_is_numeric(self):
+        self.assertTrue(is_numeric(SmallInteger()))
+        self.assertTrue(is_numeric(Double()))
+        self.assertFalse(is_numeric(String(32)))
+
+    def test_pandas_dtype_picks_most_specific(self):
+        self.assertEqual(pandas_dtype(SmallInteger()), "Int16")
+        self.assertEqual(pandas_dtype(Double()), "float64")
+        self.assertEqual(pandas_dtype(String(8)), "object")
+
+
+class TestPythonConverter(unittest.TestCase):
+
+    def test_numeric_types(self):
+        self.assertEqual(python_converter(SmallInteger())(62.0), 62)
+        self.assertIsInstance(python_converter(SmallInteger())(62.0), int)
+        self.assertEqual(python_converter(Float)("1.5"), 1.5)
+
+    def test_missing_and_unparseable_become_none(self):
+        to_float = python_converter(Float())
+        self.assertIsNone(to_float(None))
+        self.assertIsNone(to_float(float("nan")))
+        self.assertIsNone(to_float("n/a"))
+        self.assertIsNone(python_converter(String(32))(float("nan")))
+
+    def test_strings(self):
+        self.assertEqual(python_converter(String(32))(4), "4")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import pickle
+import unittest
+
+import pandas as pd
+
+from divifilter_data_updater.helper_functions import radar_dict_to_table, remove_unneeded_columns
+from divifilter_data_updater.stock_record import StockRecord, records_to_columns
+
+
+class TestStockRecord(unittest.TestCase):
+
+    def test_schema_and_extra_fields(self):
+        record = StockRecord(Symbol="KO", Price=60.0)
+        record["Website"] = "https://example.com"
+        self.assertEqual(record["Price"], 60.0)
+        self.assertEqual(record["Website"], "https://example.com")
+        self.assertEqual(list(record), ["Symbol", "Price", "Website"])
+        self.assertEqual(len(record), 3)
+
+    def test_missing_is_distinct_from_none(self):
+        record = StockRecord(Symbol="KO", Sector=None)
+        self.assertIn("Sector", record)
+        self.assertIsNone(record["Sector"])
+        self.assertNotIn("Industry", record)
+        with self.assertRaises(KeyError):
+            record["Industry"]
+        self.assertEqual(record.get("Industry", "n/a"), "n/a")
+
+    def test_delete_and_pop(self):
+        record = StockRecord(Symbol="KO", Price=1.0, Website="x")
+        del record["Price"]
+        self.assertNotIn("Price", record)
+        self.assertEqual(record.pop("Website"), "x")
+        self.assertIsNone(record.pop(None, None))
+        with self.assertRaises(KeyError):
+            del record["Price"]
+
+    def test_compares_equal_to_dict(self):
+        self.assertEqual(StockRecord(Symbol="KO", Price=1.0), {"Symbol": "KO", "Price": 1.0})
+
+    def test_has_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            StockRecord().__dict__
+
+    def test_pickles(self):
+        record = StockRecord(Symbol="KO", Website="x")
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+    def test_works_with_remove_unneeded_columns(self):
+        radar_dict = {"KO": StockRecord(Symbol="KO", Website="x", Price=1.0)}
+        remove_unneeded_columns(radar_dict, ["Website", None])
+        self.assertEqual(dict(radar_dict["KO"]), {"Symbol": "KO", "Price": 1.0})
+
+
+class TestRecordsToColumns(unittest.TestCase):
+
+    def test_transposes_records(self):
+        records = [StockRecord(Symbol="KO", Price=60.0, Website="a"), StockRecord(Symbol="PEP", Sector="Staples")]
+        columns = records_to_columns(records)
+        self.assertEqual(columns, {"Symbol": ["KO", "PEP"], "Sector": [None, "Staples"],
+                                   "Price": [60.0, None], "Website": ["a", None]})
+
+    def test_empty(self):
+        self.assertEqual(records_to_columns([]), {})
+
+    def test_radar_dict_to_table_from_records_is_typed(self):
+        radar_dict = {"KO": StockRecord(Symbol="KO", Price=60.0, **{"No Years": 62.0}),
+                      "PEP": StockRecord(Symbol="PEP", Price=None)}
+        frame = radar_dict_to_table(radar_dict)
+        self.assertEqual(list(frame.index), ["KO", "PEP"])
+        self.assertEqual(str(frame["No Years"].dtype), "Int16")
+        self.assertTrue(pd.api.types.is_float_dtype(frame["Price"]))
+        self.assertEqual(frame.loc["KO", "No Years"], 62)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+import importlib.util
+import unittest
+from unittest.mock import patch
+from datetime import date, timedelta
+
+import pandas as pd
+
+from divifilter_data_updater.stock_record import StockRecord
+
+from divifilter_data_updater.db_functions import (
+    connect_database, DuckdbConnection, MysqlConnection, SqliteConnection, ScrapeCheckpoint, CANONICAL_FILTER_QUERIES,
+    HISTORY_TABLE
+)
+
+
+def _frame(symbols=("AAPL", "KO")):
+    rows = {
+        "AAPL": {"Company": "Apple", "Sector": "Tech", "Industry": "Hardware", "No Years": 12,
+                 "Price": 200.0, "Div Yield": 0.5, "Annualized": 1.0, "Fair Value": 180.0,
+                 "FV %": 11.1, "DGR 5Y": 5.0, "Chowder Number": 5.5, "Payout Ratio": 15.0},
+        "KO": {"Company": "Coca-Cola", "Sector": "Staples", "Industry": "Beverages", "No Years": 62,
+               "Price": 60.0, "Div Yield": 3.2, "Annualized": 1.94, "Fair Value": 55.0,
+               "FV %": 9.1, "DGR 5Y": 4.0, "Chowder Number": 7.2, "Payout Ratio": 70.0},
+        "MSFT": {"Company": "Microsoft", "Sector": "Tech", "Industry": "Software", "No Years": 20,
+                 "Price": 400.0, "Div Yield": 0.8, "Annualized": 3.32, "Fair Value": 350.0,
+                 "FV %": 14.3, "DGR 5Y": 10.0, "Chowder Number": 10.8, "Payout Ratio": 25.0},
+    }
+    frame = pd.DataFrame([dict(rows[s], Symbol=s) for s in symbols])
+    return frame[["Symbol"] + [c for c in frame.columns if c != "Symbol"]]
+
+
+class BackendFlowMixin:
+    """The runner's publish/enrich/history flow against a real embedded engine."""
+
+    uri = None
+
+    def setUp(self):
+        self.db = connect_database(self.uri)
+
+    def tearDown(self):
+        self.db.close()
+
+    def _prices(self):
+        rows = self.db.run_sql_query("SELECT Symbol, Price FROM dividend_data_table ORDER BY Symbol")
+        return {symbol: price for symbol, price in rows}
+
+    def test_publish_merges_and_removes_missing_symbols(self):
+        self.db.update_data_table_from_data_frame(_frame(("AAPL", "KO")))
+        self.db.update_data_table_from_data_frame(_frame(("KO", "MSFT")))
+
+        self.assertEqual(self._prices(), {"KO": 60.0, "MSFT": 400.0})
+
+    def test_publish_from_records_without_dataframe(self):
+        records = [StockRecord(row) for row in _frame(("AAPL", "KO")).to_dict("records")]
+        records[0]["No Years"] = 12.0
+        records[1]["Website"] = "https://example.com"
+        self.db.update_data_table_from_records(records)
+        self.db.update_data_table_from_records(records[1:])
+
+        self.assertEqual(self._prices(), {"KO": 60.0})
+        rows = self.db.run_sql_query('SELECT "No Years", Website FROM dividend_data_table')
+        self.assertEqual([tuple(row) for row in rows], [(62, "https://example.com")])
+
+    def test_partial_publish_keeps_missing_symbols(self):
+        records = [StockRecord(row) for row in _frame(("AAPL", "KO")).to_dict("records")]
+        self.db.update_data_table_from_records(records)
+        records[1]["Price"] = 61.0
+        self.db.update_data_table_from_records(records[1:], prune=False)
+
+        self.assertEqual(self._prices(), {"AAPL": 200.0, "KO": 61.0})
+
+    def test_scrape_checkpoint_round_trip(self):
+        stale = ScrapeCheckpoint(self.db, "v1")
+        stale.save([StockRecord(Symbol="OLD", Price="$1")])
+        checkpoint = ScrapeCheckpoint(self.db, "v2")
+        checkpoint.save([StockRecord(Symbol="AAPL", Price="$200.00"), {"Symbol": "KO", "Price": None}])
+        checkpoint.save([StockRecord(Symbol="AAPL", Price="$201.00")])
+
+        loaded = checkpoint.load()
+        self.assertEqual({symbol: dict(record) for symbol, record in loaded.items()},
+                         {"AAPL": {"Symbol": "AAPL", "Price": "$201.00"}, "KO": {"Symbol": "KO", "Price": None}})
+        self.assertIsInstance(loaded["AAPL"], StockRecord)
+        # Loading v2 dropped the stale v1 checkpoint
+        self.assertEqual(stale.load(), {})
+
+        checkpoint.clear()
+        self.assertEqual(checkpoint.load(), {})
+
+    def test_dead_letters_round_trip(self):
+        self.assertEqual(self.db.get_dead_letters(), [])
+        self.db.save_dead_letters([{"Symbol": "BAD", "url": "http://example.com/bad", "status": 503, "body": "busy"},
+                                   {"Symbol": "KO", "error": "timed out"}])
+        self.db.save_dead_letters([{"Symbol": "BAD", "url": "http://example.com/bad", "status": 404}])
+
+        entries = {entry["Symbol"]: entry for entry in self.db.get_dead_letters()}
+        self.assertEqual(sorted(entries), ["BAD", "KO"])
+        self.assertEqual((entries["BAD"]["status"], entries["BAD"]["body"]), (404, None))
+        self.assertEqual(entries["KO"]["error"], "timed out")
+        self.assertTrue(entries["KO"]["failed_at"])
+
+        self.db.remove_dead_letters(["KO"])
+        self.assertEqual([entry["Symbol"] for entry in self.db.get_dead_letters()], ["BAD"])
+        self.db.remove_dead_letters()
+        self.assertEqual(self.db.get_dead_letters(), [])
+
+    def test_refresh_candidates_carry_per_row_freshness(self):
+        self.assertEqual(self.db.get_refresh_candidates("Yahoo Updated"), [])
+        self.db.update_data_table_from_data_frame(_frame(("AAPL", "KO")))
+        self.assertEqual(sorted(self.db.get_refresh_candidates("Yahoo Updated")),
+                         [("AAPL", None, None), ("KO", None, None)])
+
+        self.db.update_data_table(("now", {"AAPL": {"Market Cap": 3e12, "Yahoo Updated": "2026-06-24 12:00:00"}}))
+
+        self.assertEqual(sorted(self.db.get_refresh_candidates("Yahoo Updated")),
+                         [("AAPL", "2026-06-24 12:00:00", 3e12), ("KO", None, None)])
+
+    def test_field_coverage_is_replaced_by_each_full_scrape(self):
+        self.assertEqual(self.db.get_field_coverage(), {})
+        self.db.save_field_coverage({"Price": 1.0, "DGR 10Y": 0.5})
+        self.db.save_field_coverage({"Price": 0.75})
+        self.assertEqual(self.db.get_field_coverage(), {"Price": 0.75})
+
+    def test_changelog_versions_publishes_and_reads_back_deltas(self):
+        from divifilter_data_updater.changefeed import diff_rows
+        self.assertEqual(self.db.get_data_rows(), {})
+        self.db.update_data_table_from_data_frame(_frame(("AAPL", "KO")))
+        before = self.db.get_data_rows(["KO"])
+        self.assertEqual(list(before), ["KO"])
+        self.db.update_data_table(("now", {"KO": {"Price": 61.5}}))
+
+        changes = diff_rows(before, self.db.get_data_rows(["KO"]))
+        self.assertEqual(changes, [{"Symbol": "KO", "column": "Price", "op": "update", "old": 60.0, "new": 61.5}])
+        self.assertEqual(self.db.append_changelog("yahoo", [], "2026-06-24 12:00:00"), [])
+        first = self.db.append_changelog("yahoo", changes, "2026-06-24 12:00:00")
+        second = self.db.append_changelog("drip_scrape", changes * 2, "2026-06-24 13:00:00")
+
+        self.assertEqual([entry["version"] for entry in first + second], [1, 2, 2])
+        self.assertEqual(self.db.get_changelog(), first + second)
+        self.assertEqual(self.db.get_changelog(after_version=1), second)
+        self.db.prune_changelog(1)
+        self.assertEqual(self.db.get_changelog(), second)
+
+    def test_changelog_version_taken_by_another_writer_is_not_reused(self):
+        changes = [{"Symbol": "KO", "column": "Price", "op": "update", "old": 60.0, "new": 61.5}]
+        execute = self.db.conn.execute
+        raced = []
+
+        def racing_execute(statement, *args, **kwargs):
+            # Another updater commits the version this one just read as next, before it inserts
+            if not raced and getattr(statement, "is_insert", False) and statement.table is self.db.changelog:
+                raced.append(args[0][0]["version"])
+                execute(statement, *args, **kwargs)
+                self.db.conn.commit()
+            return execute(statement, *args, **kwargs)
+
+        with patch.object(self.db.conn, "execute", side_effect=racing_execute):
+            entries = self.db.append_changelog("yahoo", changes, "2026-06-24 12:00:00")
+
+        self.assertEqual(raced, [1])
+        self.assertEqual([entry["version"] for entry in entries], [2])
+        self.assertEqual([entry["version"] for entry in self.db.get_changelog()], [1, 2])
+
+    def test_symbol_failures_are_kept_per_source(self):
+        self.assertEqual(self.db.load_symbol_failures("yahoo"), {})
+        self.db.clear_symbol_failures("yahoo", ["BAD"])
+        self.db.save_symbol_failures("yahoo", {"BAD": (1, "2026-06-24 13:00:00"), "ODD": (1, "2026-06-24 13:00:00")})
+        self.db.save_symbol_failures("yahoo", {"BAD": (2, "2026-06-24 14:00:00")})
+        self.db.save_symbol_failures("other", {"BAD": (5, "2026-06-30 00:00:00")})
+
+        self.assertEqual(self.db.load_symbol_failures("yahoo"),
+                         {"BAD": (2, "2026-06-24 14:00:00"), "ODD": (1, "2026-06-24 13:00:00")})
+        self.db.clear_symbol_failures("yahoo", ["ODD"])
+        self.assertEqual(self.db.load_symbol_failures("yahoo"), {"BAD": (2, "2026-06-24 14:00:00")})
+        self.assertEqual(self.db.load_symbol_failures("other"), {"BAD": (5, "2026-06-30 00:00:00")})
+
+    def test_page_versions_and_removing_delisted_stocks(self):
+        self.assertEqual(self.db.get_page_versions(), {})
+        self.db.update_data_table_from_data_frame(_frame(("AAPL", "KO")))
+        self.db.save_page_versions({"AAPL": "2026-06-01", "KO": None})
+        self.db.save_page_versions({"AAPL": "2026-06-20"})
+        self.assertEqual(self.db.get_page_versions(), {"AAPL": "2026-06-20", "KO": None})
+
+        self.db.remove_stocks(["KO"])
+
+        self.assertEqual(sorted(self.db.get_tickers_from_db()), ["AAPL"])
+        self.assertEqual(self.db.get_page_versions(), {"AAPL": "2026-06-20"})
+
+    def test_enrichment_keeps_values_for_null_cells_and_recomputes_derived(self):
+        self.db.update_data_table_from_data_frame(_frame())
+        self.db.update_data_table(("now", {"AAPL": {"Price": 100.0, "Market Cap": 3e12},
+                                           "KO": {"Price": None}}))
+        self.db.recompute_derived_fields()
+
+        rows = self.db.run_sql_query(
+            'SELECT Symbol, Price, "Div Yield", "Market Cap" FROM dividend_data_table ORDER BY Symbol')
+        self.assertEqual(rows[0][:3], ("AAPL", 100.0, 1.0))
+        self.assertAlmostEqual(rows[0][3], 3e12)
+        self.assertEqual(rows[1][1], 60.0)
+
+    def test_metadata_upsert(self):
+        self.db.update_metadata_table({"drip": "2026-01-01 00:00:00"})
+        self.db.update_metadata_table({"drip": "2026-01-02 00:00:00", "yahoo": "2026-01-02 00:00:00"})
+
+        self.assertEqual(self.db.check_db_update_dates(),
+                         {"drip": "2026-01-02 00:00:00", "yahoo": "2026-01-02 00:00:00"})
+
+    def test_schema_spec_creates_filter_indexes(self):
+        self.db.update_data_table_from_data_frame(_frame())
+        self.db.apply_schema_spec()
+        self.db.apply_schema_spec()
+
+        self.assertIn("ix_sector_years_yield", self.db._existing_index_names("dividend_data_table"))
+        self.assertEqual(set(self.db.check_filter_query_indexes()), set(CANONICAL_FILTER_QUERIES))
+
+    def test_history_snapshot_merge_and_downsample(self):
+        old_monday = date.today() - timedelta(days=406 + date.today().weekday())
+        for offset in range(3):
+            self.db.write_history_snapshot({"KO": {"Price": 50.0 + offset}},
+                                           snapshot_date=old_monday + timedelta(days=offset))
+        self.db.write_history_snapshot({"KO": {"Price": 61.0}})
+        self.db.write_history_snapshot({"KO": {"Price": None, "Div Yield": 3.1}})
+
+        self.db.maintain_history(retention_days=1825, downsample_after_days=365)
+
+        history = self.db.get_symbol_history("KO")
+        self.assertEqual([row["Price"] for row in history], [52.0, 61.0])
+        self.assertAlmostEqual(history[-1]["Div Yield"], 3.1, places=4)
+
+    def test_summary_tables_refresh_twice(self):
+        self.db.update_data_table_from_data_frame(_frame(("AAPL", "KO", "MSFT")))
+        self.db.refresh_summary_tables()
+        self.db.refresh_summary_tables()
+
+        rows = self.db.run_sql_query('SELECT Sector, Stocks FROM dividend_sector_summary ORDER BY Sector')
+        self.assertEqual([tuple(row) for row in rows], [("Staples", 1), ("Tech", 2)])
+
+
+class TestSqliteBackend(BackendFlowMixin, unittest.TestCase):
+    uri = "sqlite://"
+
+
+@unittest.skipUnless(importlib.util.find_spec("duckdb_engine"), "duckdb_engine not installed")
+class TestDuckdbBackend(BackendFlowMixin, unittest.TestCase):
+    uri = "duckdb:///:memory:"
+
+
+class TestConnectDatabase(unittest.TestCase):
+
+    def test_dispatches_on_scheme(self):
+        with connect_database("sqlite://") as db:
+            self.assertIsInstance(db, SqliteConnection)
+        if importlib.util.find_spec("duckdb_engine"):
+            with connect_database("duckdb:///:memory:") as db:
+                self.assertIsInstance(db, DuckdbConnection)
+
+    def test_other_schemes_are_mysql(self):
+        from unittest.mock import patch
+        with patch('divifilter_data_updater.db_functions.create_engine'):
+            self.assertIsInstance(connect_database("mysql://u:p@host/db"), MysqlConnection)
+
+    def test_history_table_name(self):
+        with connect_database("sqlite://") as db:
+            db.create_history_table()
+            self.assertTrue(db.engine.dialect.has_table(db.conn, HISTORY_TABLE))
@@ -0,0 +1,57 @@
+import unittest
+import pandas as pd
+from divifilter_data_updater.summaries import (
+    compute_summary_tables, SECTOR_SUMMARY_TABLE, INDUSTRY_SUMMARY_TABLE, STREAK_SUMMARY_TABLE
+)
+
+
+def _sample_frame():
+    return pd.DataFrame({
+        "Symbol": ["AAA", "BBB", "CCC", "DDD", "EEE"],
+        "Sector": ["Utilities", "Utilities", "Utilities", "Energy", None],
+        "Industry": ["Electric", "Electric", "Water", "Oil", "Misc"],
+        "No Years": [55, 30, 12, 6, 3],
+        "Div Yield": [3.0, 4.0, 5.0, "6.5", None],
+        "DGR 5Y": [2.0, 4.0, 6.0, 8.0, 1.0],
+        "Payout Ratio": [60.0, 70.0, 80.0, 50.0, None],
+        "Chowder Number": [5.0, 8.0, 11.0, 14.5, None],
+        "Company": ["ignored"] * 5,
+    })
+
+
+class TestComputeSummaryTables(unittest.TestCase):
+
+    def test_returns_all_tables(self):
+        summaries = compute_summary_tables(_sample_frame())
+        self.assertEqual(set(summaries), {SECTOR_SUMMARY_TABLE, INDUSTRY_SUMMARY_TABLE, STREAK_SUMMARY_TABLE})
+
+    def test_sector_summary(self):
+        sectors = compute_summary_tables(_sample_frame())[SECTOR_SUMMARY_TABLE].set_index("Sector")
+        self.assertEqual(list(sectors.index), ["Energy", "Utilities"])  # null sector dropped
+        self.assertEqual(sectors.loc["Utilities", "Stocks"], 3)
+        self.assertEqual(sectors.loc["Utilities", "Median Div Yield"], 4.0)
+        self.assertEqual(sectors.loc["Utilities", "DGR 5Y P25"], 3.0)
+        self.assertEqual(sectors.loc["Utilities", "DGR 5Y P75"], 5.0)
+        self.assertEqual(sectors.loc["Energy", "Median Div Yield"], 6.5)  # string coerced
+
+    def test_industry_summary_keyed_by_industry_and_sector(self):
+        industries = compute_summary_tables(_sample_frame())[INDUSTRY_SUMMARY_TABLE]
+        electric = industries[industries["Industry"] == "Electric"].iloc[0]
+        self.assertEqual(electric["Sector"], "Utilities")
+        self.assertEqual(electric["Stocks"], 2)
+        self.assertEqual(electric["Median No Years"], 42.5)
+
+    def test_streak_summary_counts(self):
+        streaks = compute_summary_tables(_sample_frame())[STREAK_SUMMARY_TABLE].set_index("Streak")
+        self.assertEqual(streaks.loc["Kings", "Stocks"], 1)
+        self.assertEqual(streaks.loc["Champions", "Stocks"], 1)
+        self.assertEqual(streaks.loc["Contenders", "Stocks"], 1)
+        self.assertEqual(streaks.loc["Challengers", "Stocks"], 1)
+
+    def test_missing_columns_tolerated(self):
+        summaries = compute_summary_tables(pd.DataFrame({"Symbol": ["A"], "Sector": ["X"]}))
+        self.assertEqual(summaries[SECTOR_SUMMARY_TABLE].loc[0, "Stocks"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
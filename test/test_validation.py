@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from divifilter_data_updater.stock_record import StockRecord
+
+from divifilter_data_updater.validation import (
+    RangeRule, OrderRule, NullRateRule, VALIDATION_RULES, validate_frame, validate_records, log_validation_report
+)
+
+
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = pd.DataFrame({
+            "Price": [10.0, -1.0, 30.0, None],
+            "Low": [5.0, 1.0, 35.0, 2.0],
+            "High": [20.0, 2.0, 40.0, 3.0],
+            "Div Yield": [2.0, "n/a", 150.0, 1.0],
+        }, index=["A", "B", "C", "D"])
+
+    def test_range_rule_open_bounds(self):
+        self.assertEqual(list(RangeRule("Price", low=0).violations(self.frame)), [False, True, False, False])
+        self.assertEqual(list(RangeRule("Price", high=20).violations(self.frame)), [False, False, True, False])
+
+    def test_range_rule_ignores_non_numeric(self):
+        mask = RangeRule("Div Yield", low=0, high=100).violations(self.frame)
+        self.assertEqual(list(mask), [False, False, True, False])
+
+    def test_order_rule_skips_missing(self):
+        mask = OrderRule(("Low", "Price", "High")).violations(self.frame)
+        self.assertEqual(list(mask), [False, True, True, False])
+
+    def test_null_rate_rule(self):
+        self.assertFalse(NullRateRule("Price", max_null_rate=0.25).violations(self.frame).any())
+        self.assertEqual(list(NullRateRule("Price", max_null_rate=0.2).violations(self.frame)),
+                         [False, False, False, True])
+
+    def test_rule_names(self):
+        self.assertEqual(RangeRule("Price").name, "range:Price")
+        self.assertEqual(OrderRule(("Low", "Price", "High")).name, "order:Low<=Price<=High")
+        self.assertEqual(NullRateRule("Sector", 0.1).name, "null_rate:Sector")
+
+
+class TestValidateFrame(unittest.TestCase):
+
+    def test_nulls_range_violations_and_reports_the_rest(self):
+        frame = pd.DataFrame({
+            "Price": [10.0, -1.0, 30.0],
+            "Low": [5.0, 1.0, 35.0],
+            "High": [20.0, 2.0, 40.0],
+        }, index=["A", "B", "C"])
+
+        frame, report = validate_frame(frame)
+
+        self.assertTrue(np.isnan(frame.loc["B", "Price"]))
+        self.assertEqual(frame.loc["C", "Price"], 30.0)          # order violations are only reported
+        self.assertEqual(report["range:Price"], {"violations": 1, "examples": ["B"]})
+        self.assertEqual(report["order:Low<=Price<=High"], {"violations": 1, "examples": ["C"]})
+        # the nulled price counts toward the null rate (1 of 3 rows > 20%)
+        self.assertEqual(report["null_rate:Price"], {"violations": 1, "examples": ["B"]})
+
+    def test_skips_rules_for_missing_columns(self):
+        frame, report = validate_frame(pd.DataFrame({"P/E": [-10.0]}, index=["A"]))
+        self.assertEqual(report, {})
+        self.assertEqual(frame.loc["A", "P/E"], -10.0)
+
+    def test_empty_frame(self):
+        self.assertEqual(validate_frame(pd.DataFrame())[1], {})
+
+    def test_examples_are_capped(self):
+        frame = pd.DataFrame({"Price": [-1.0] * 20}, index=[f"S{i}" for i in range(20)])
+        _, report = validate_frame(frame, [RangeRule("Price", low=0)])
+        self.assertEqual(report["range:Price"]["violations"], 20)
+        self.assertEqual(len(report["range:Price"]["examples"]), 5)
+
+    def test_default_rules_cover_the_original_bounds(self):
+        names = {rule.name for rule in VALIDATION_RULES}
+        self.assertTrue({"range:Price", "range:Div Yield", "range:5Y Avg Yield"} <= names)
+
+    def test_validate_records_matches_frame(self):
+        radar_dict = {"A": StockRecord(Symbol="A", Price=10.0, Low=5.0, High=20.0),
+                      "B": StockRecord(Symbol="B", Price=-1.0, Low=1.0, High=2.0),
+                      "C": {"Symbol": "C", "Price": 30.0, "Low": 35.0, "High": 40.0}}
+        frame = pd.DataFrame.from_dict({k: dict(v) for k, v in radar_dict.items()}, orient="index")
+
+        report = validate_records(radar_dict)
+
+        self.assertEqual(report, validate_frame(frame)[1])
+        self.assertIsNone(radar_dict["B"]["Price"])
+        self.assertEqual(radar_dict["C"]["Price"], 30.0)
+
+    def test_validate_records_leaves_non_numeric_text(self):
+        radar_dict = {"A": {"Div Yield": "n/a"}, "B": {"Div Yield": 150.0}}
+        validate_records(radar_dict)
+        self.assertEqual(radar_dict, {"A": {"Div Yield": "n/a"}, "B": {"Div Yield": None}})
+
+    @patch('divifilter_data_updater.validation.logger')
+    def test_report_logs_one_line_per_rule(self, mock_logger):
+        log_validation_report({"range:Price": {"violations": 3, "examples": ["A", "B"]},
+                               "null_rate:Sector": {"violations": 9, "examples": ["C"]}}, 10)
+        self.assertEqual(mock_logger.warning.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
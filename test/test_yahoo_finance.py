@@ -1,5 +1,6 @@
 import unittest
 import logging
+from itertools import chain, repeat
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 from divifilter_data_updater.yahoo_finance import (
@@ -7,6 +8,7 @@ from divifilter_data_updater.yahoo_finance import (
     get_yahoo_finance_data_for_tickers_list,
     disable_yahoo_logs,
 )
+from divifilter_data_updater.deadline import Deadline, DeadlineExceeded
 
 
 class TestYahooFinance(unittest.TestCase):
@@ -112,3 +114,25 @@ class TestYahooFinance(unittest.TestCase):
         logger = logging.getLogger('yfinance')
         self.assertTrue(logger.disabled)
 
+
+class TestYahooFinanceDeadline(unittest.TestCase):
+
+    @patch('divifilter_data_updater.yahoo_finance.yf.Tickers')
+    def test_expired_deadline_raises_without_retrying(self, mock_tickers):
+        with self.assertRaises(DeadlineExceeded):
+            get_yahoo_finance_data_for_tickers_tuple(("PG",), deadline=Deadline(1, clock=chain([0], repeat(5)).__next__))
+        mock_tickers.assert_not_called()
+
+    @patch('divifilter_data_updater.yahoo_finance.yf.Tickers')
+    def test_returns_tickers_fetched_before_the_deadline(self, mock_tickers):
+        ticker = MagicMock()
+        ticker.info = {'currentPrice': 150.0, 'fiftyTwoWeekLow': 120.0, 'fiftyTwoWeekHigh': 160.0,
+                       'priceToBook': 5.5, 'payoutRatio': 0.65}
+        mock_tickers.return_value.tickers = {'PG': ticker, 'KO': ticker}
+        # created at 0, checked at 1 (start) and 2 (PG), expired when reaching KO
+        clock = chain([0, 1, 2], repeat(10)).__next__
+
+        _, data = get_yahoo_finance_data_for_tickers_list(["PG", "KO"], deadline=Deadline(5, clock=clock))
+
+        self.assertEqual(list(data), ["PG"])
+        self.assertEqual(data["PG"]["Price"], 150.0)